@@ -1,11 +1,15 @@
 import os
 import platform
+import queue
 import subprocess
+import sys
 import tkinter as tk
 from collections.abc import Callable, Sequence
+from concurrent.futures import ThreadPoolExecutor
 from tkinter import messagebox, ttk
+from typing import TypeVar
 
-from filminfo.app.gallery import Gallery
+from filminfo.app.gallery import Gallery, GalleryRenderer
 from filminfo.app.metadata_add import AddMetadataForm as FormAdd
 from filminfo.app.metadata_export_import import Choice, MetadaExportImport
 from filminfo.app.metadata_remove import RemoveMetadaForm as FormRemove
@@ -19,14 +23,29 @@ from filminfo.configuration import (
     PADDING_BIG,
     ensure_database,
     get_app_dir,
+    get_backup_dir,
+    get_bool_option,
     get_exiftool,
+    get_float_option,
     get_int_option,
+    get_metadata_cache_file,
     get_string_option,
+    get_thumbnail_cache_dir,
     load_config,
 )
 from filminfo.controllers.database_controller import DatabaseController
 from filminfo.controllers.exiftool_controller import ExifToolController
-from filminfo.models.exiftool import ExifToolReply
+from filminfo.models.exiftool import BackupPolicy, ExifToolReply, SidecarMode
+from filminfo.models.exiftool_session import Batch, BatchCancelled, FileStatus
+from filminfo.models.images import Quality
+from filminfo.models.metadata_cache import Metadata
+from filminfo.models.thumbnail_cache import ThumbnailCache
+
+
+T = TypeVar("T")
+
+# how often a running batch is checked for progress and results, in ms
+_POLL_INTERVAL = 100
 
 
 class App(ttk.Frame):
@@ -38,24 +57,61 @@ class App(ttk.Frame):
         database_controller: DatabaseController,
         exiftool_controller: ExifToolController,
         *args,
+        virtual_gallery: bool = True,
+        gallery_renderer: GalleryRenderer = GalleryRenderer.WIDGETS,
+        thumbnail_workers: int = 0,
+        thumbnail_processes: bool = False,
+        thumbnail_quality: Quality = Quality.BALANCED,
+        thumbnail_cache: ThumbnailCache | None = None,
+        embedded_previews: bool = False,
+        thumbnail_memory: int = 0,
+        preview_tile_cache: int = 64 * 1024 * 1024,
+        watch_settle_time: float = 2.0,
+        watch_polling: bool = False,
+        metadata_token_index: bool = False,
         **kwargs,
     ) -> None:
         super().__init__(parent, *args, **kwargs)
         self._exiftool_controller = exiftool_controller
+        # one operation at a time, off the Tk thread
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._batch: Batch | None = None
 
         self._gallery = Gallery(
-            self, thumbnail_size=thumbnail_size, preview_size=preview_size
+            self,
+            thumbnail_size=thumbnail_size,
+            preview_size=preview_size,
+            virtual=virtual_gallery,
+            renderer=gallery_renderer,
+            thumbnail_workers=thumbnail_workers,
+            thumbnail_processes=thumbnail_processes,
+            thumbnail_quality=thumbnail_quality,
+            thumbnail_cache=thumbnail_cache,
+            thumbnail_memory=thumbnail_memory,
+            preview_tile_cache=preview_tile_cache,
+            preview_provider=self._read_previews if embedded_previews else None,
+            watch_settle_time=watch_settle_time,
+            watch_polling=watch_polling,
         )
         self._notebook = ShiftScrollNotebook(self)
         self._form_add_metadata = FormAdd(self._notebook, database_controller)
         self._form_remove_metadata = FormRemove(self._notebook)
-        self._metadata_view = MetadataView(self._notebook)
+        self._metadata_view = MetadataView(
+            self._notebook, token_index=metadata_token_index
+        )
         self._metadata_export_import = MetadaExportImport(self._notebook)
         self._separator = ttk.Separator(self)
         self._button_open_dir = ttk.Button(
             self, text="Application folder", command=self._on_folder_open
         )
-        self._button_execute = ttk.Button(self, text="Execute")
+        self._frame_buttons = ttk.Frame(self)
+        self._button_cancel = ttk.Button(
+            self._frame_buttons,
+            text="Cancel",
+            state="disabled",
+            command=self._on_cancel,
+        )
+        self._button_execute = ttk.Button(self._frame_buttons, text="Execute")
 
         self._layout()
         self.__configure()
@@ -67,9 +123,11 @@ class App(ttk.Frame):
         self._button_open_dir.grid(
             row=2, column=0, sticky="w", padx=PADDING_BIG, pady=PADDING_BIG
         )
-        self._button_execute.grid(
+        self._frame_buttons.grid(
             row=2, column=1, sticky="e", padx=PADDING_BIG, pady=PADDING_BIG
         )
+        self._button_cancel.grid(row=0, column=0, padx=(0, PADDING_BIG))
+        self._button_execute.grid(row=0, column=1)
 
         self.columnconfigure(0, weight=1, minsize=500)
         self.columnconfigure(1, weight=0, minsize=530)
@@ -81,6 +139,7 @@ class App(ttk.Frame):
         self._notebook.add(self._metadata_view, text="View")
         self._notebook.add(self._metadata_export_import, text="Export/Import")
         self._notebook.bind("<<NotebookTabChanged>>", self._on_tab_change)
+        self._form_remove_metadata.bind("<<CleanBackups>>", self._on_clean_backups)
 
     def _add_metadata(self) -> None:
         images = self.selected_images
@@ -94,10 +153,12 @@ class App(ttk.Frame):
         ):
             return None
 
+        metadata = self.form_data
         self._call_exiftool(
-            lambda: self._exiftool_controller.add_metadata(
-                images=images, metadata=self.form_data
-            )
+            images,
+            lambda images, batch: self._exiftool_controller.add_metadata(
+                images=images, metadata=metadata, batch=batch
+            ),
         )
 
     def _remove_metadata(self) -> None:
@@ -112,20 +173,75 @@ class App(ttk.Frame):
         ):
             return None
 
+        tags = self.tags_to_remove
         self._call_exiftool(
-            lambda: self._exiftool_controller.remove_metadata(
-                images=images, tags=self.tags_to_remove
-            )
+            images,
+            lambda images, batch: self._exiftool_controller.remove_metadata(
+                images=images, tags=tags, batch=batch
+            ),
         )
 
-    def _display_metadata(self) -> None:
-        error, data = self._call_exiftool(
-            lambda: self._exiftool_controller.get_metadata(images=self.selected_images),
-            showmessage=False,
+    def _clean_backups(self) -> None:
+        if self._batch:
+            return None
+
+        images = self.selected_images
+        archive = self._form_remove_metadata.archive_backups
+        action = "archive" if archive else "delete"
+
+        if not messagebox.askyesno(
+            "Confirm",
+            (
+                f"Are you sure you want to {action} backup files of "
+                f"{len(images)} selected images?"
+            ),
+        ):
+            return None
+
+        self._call_exiftool(
+            images,
+            lambda images, batch: self._exiftool_controller.clean_backups(
+                images=images, archive=archive, batch=batch
+            ),
         )
 
-        if not error:
-            self._metadata_view.display_metadata(data)
+    def _display_metadata(self) -> None:
+        images = self.selected_images
+        self._metadata_view.clear()
+        chunks: queue.Queue[list[Metadata]] = queue.Queue()
+
+        def stream(batch: Batch) -> Exception | None:
+            batch.add_total(len(images))
+            replies = self._exiftool_controller.stream_metadata(images, batch)
+            for error, metadata in replies:
+                if error:
+                    return error
+                chunks.put(metadata)
+                batch.advance(len(metadata))
+                if batch.cancelled:
+                    break
+            return None
+
+        def show_chunks() -> None:
+            while not chunks.empty():
+                self._metadata_view.add_metadata(chunks.get())
+
+        def done(error: Exception | None) -> None:
+            show_chunks()
+            if error:
+                messagebox.showerror("ExifTool Error", str(error), icon="error")
+            elif errors := self._file_errors(batch):
+                messagebox.showwarning(
+                    "ExifTool Warning",
+                    f"Metadata of {len(errors)} files could not be read:\n\n"
+                    f"{_first_lines(errors)}",
+                    icon="warning",
+                )
+            if stats := self._exiftool_controller.metadata_cache_stats():
+                self._metadata_view.set_cache_stats(stats.hits, stats.misses)
+
+        batch = Batch()
+        self._run_in_background(stream, done, show_chunks, batch)
 
     def _export_metadata(self) -> None:
         filepath = self._metadata_export_import.path
@@ -145,15 +261,17 @@ class App(ttk.Frame):
         ):
             return None
 
-        error, _ = self._call_exiftool(
-            lambda: self._exiftool_controller.export_metadata(
-                images=images, output_file=filepath
-            )
-        )
-
-        if not error:
+        def show_exported() -> None:
             messagebox.showinfo("Info", f"Metadata exported to {filepath}")
 
+        self._call_exiftool(
+            images,
+            lambda images, batch: self._exiftool_controller.export_metadata(
+                images=images, output_file=filepath, batch=batch
+            ),
+            on_success=show_exported,
+        )
+
     def _import_metadata(self) -> None:
         filepath = self._metadata_export_import.path
 
@@ -173,8 +291,9 @@ class App(ttk.Frame):
             return None
 
         self._call_exiftool(
-            lambda: self._exiftool_controller.import_metadata(
-                images=images, input_file=filepath
+            images,
+            lambda images, batch: self._exiftool_controller.import_metadata(
+                images=images, input_file=filepath, batch=batch
             ),
         )
 
@@ -185,11 +304,52 @@ class App(ttk.Frame):
             self._import_metadata()
 
     def _call_exiftool(
-        self, action: Callable[[], ExifToolReply], showmessage: bool = True
-    ) -> ExifToolReply:
-        self._button_execute.configure(state="disabled")
+        self,
+        images: Sequence[str],
+        action: Callable[[Sequence[str], Batch], ExifToolReply],
+        showmessage: bool = True,
+        on_success: Callable[[], None] | None = None,
+    ) -> None:
+        def done(reply: ExifToolReply) -> None:
+            self._show_reply(reply, showmessage)
+            if reply[0]:
+                return None
+
+            if failed := self._exiftool_controller.failed_images(images, batch):
+                self._offer_retry(failed, batch, action, showmessage, on_success)
+            elif on_success:
+                on_success()
+
+        batch = Batch()
+        self._run_in_background(lambda batch: action(images, batch), done, batch=batch)
+
+    def _offer_retry(
+        self,
+        failed: Sequence[str],
+        batch: Batch,
+        action: Callable[[Sequence[str], Batch], ExifToolReply],
+        showmessage: bool,
+        on_success: Callable[[], None] | None,
+    ) -> None:
+        details = _first_lines(self._file_errors(batch))
+        if messagebox.askyesno(
+            "Retry",
+            (
+                f"{len(failed)} files failed:\n\n{details}\n\n"
+                "Do you want to retry only the failed files?"
+            ),
+            icon="warning",
+        ):
+            self._call_exiftool(failed, action, showmessage, on_success)
 
-        reply = action()
+    def _file_errors(self, batch: Batch) -> list[str]:
+        return [
+            f"{os.path.basename(result.path)}: {result.message}"
+            for result in self._exiftool_controller.file_results(batch)
+            if result.status is FileStatus.ERROR
+        ]
+
+    def _show_reply(self, reply: ExifToolReply, showmessage: bool) -> None:
         error, message = reply
         text_limit = 2_000
         msg = str(error) if error else message
@@ -198,7 +358,9 @@ class App(ttk.Frame):
             if len(msg) > text_limit
             else msg
         )
-        if error:
+        if isinstance(error, BatchCancelled):
+            messagebox.showinfo("ExifTool Info", msg, icon="info")
+        elif error:
             messagebox.showerror("ExifTool Error", msg, icon="error")
         elif message:
             if showmessage:
@@ -210,11 +372,50 @@ class App(ttk.Frame):
                 icon="warning",
             )
 
-        self._button_execute.configure(state="!disabled")
-
-        return reply
+    def _run_in_background(
+        self,
+        task: Callable[[Batch], T],
+        on_done: Callable[[T], None],
+        on_poll: Callable[[], None] | None = None,
+        batch: Batch | None = None,
+    ) -> Batch:
+        """Run `task` on the worker thread, hand its result to `on_done`.
+
+        The Tk thread polls the task with `after()`, updating the progress
+        in the gallery status bar and calling `on_poll` each time. The task
+        runs with `batch`, or a new one.
+        """
+        batch = batch if batch is not None else Batch()
+        self._batch = batch
+        self._button_execute.configure(state="disabled")
+        self._button_cancel.configure(state="!disabled")
+        self._form_remove_metadata.set_busy(True)
+        future = self._executor.submit(task, batch)
+
+        def poll() -> None:
+            if on_poll:
+                on_poll()
+            self._gallery.set_progress(*batch.progress)
+            if not future.done():
+                self.after(_POLL_INTERVAL, poll)
+                return None
+
+            self._batch = None
+            self._gallery.clear_progress()
+            self._button_cancel.configure(state="disabled")
+            self._button_execute.configure(state="!disabled")
+            self._form_remove_metadata.set_busy(False)
+            on_done(future.result())
+
+        self.after(_POLL_INTERVAL, poll)
+        return batch
 
     # --- Callbacks ---
+    def _read_previews(self, images: Sequence[str]) -> dict[str, list[bytes]]:
+        # called from a thumbnail worker, the images are decoded on failure
+        _, previews = self._exiftool_controller.get_previews(images)
+        return previews
+
     def _on_tab_change(self, event: tk.Event) -> None:
         tab_id = self._notebook.select()
         tab_index = self._notebook.index(tab_id)
@@ -231,6 +432,14 @@ class App(ttk.Frame):
 
         self._button_execute.configure(command=callback)
 
+    def _on_cancel(self) -> None:
+        if self._batch:
+            self._batch.cancel()
+            self._button_cancel.configure(state="disabled")
+
+    def _on_clean_backups(self, event: tk.Event) -> None:
+        self._clean_backups()
+
     def _on_folder_open(self) -> None:
         system = platform.system()
         folder = get_app_dir()
@@ -254,6 +463,28 @@ class App(ttk.Frame):
     def tags_to_remove(self) -> Sequence[str]:
         return self._form_remove_metadata.selected_items
 
+    def open(self, path: str) -> None:
+        """Add a folder recursively, or the images listed in a file."""
+        if os.path.isdir(path):
+            self._gallery.add_folder(path)
+        else:
+            self._gallery.add_manifest(path)
+
+    def shutdown(self) -> None:
+        """Cancel the running operation and wait for it to stop."""
+        if self._batch:
+            self._batch.cancel()
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._gallery.close()
+        self._metadata_view.close()
+
+
+def _first_lines(lines: Sequence[str], shown: int = 10) -> str:
+    details = "\n".join(lines[:shown])
+    if len(lines) > shown:
+        details += f"\n... and {len(lines) - shown} more"
+    return details
+
 
 def main():
     root = tk.Tk()
@@ -276,18 +507,56 @@ def main():
     tree_highlight_color = get_string_option("tree_highlight_color")
     style.map("Treeview", background=[("selected", tree_highlight_color)])
 
+    exiftool_controller = ExifToolController(
+        get_exiftool(),
+        workers=get_int_option("exiftool_workers"),
+        chunk_size=get_int_option("exiftool_chunk_size"),
+        metadata_cache=get_metadata_cache_file(),
+        metadata_cache_size=get_int_option("metadata_cache_mb") * 1024 * 1024,
+        changes_only=get_bool_option("write_changes_only"),
+        sidecar_mode=SidecarMode(get_string_option("sidecar_mode")),
+        backup_policy=BackupPolicy(get_string_option("backup_policy")),
+        backup_dir=get_backup_dir(),
+    )
+    thumbnail_cache_size = get_int_option("thumbnail_cache_mb") * 1024 * 1024
+    thumbnail_cache = (
+        ThumbnailCache(get_thumbnail_cache_dir(), thumbnail_cache_size)
+        if thumbnail_cache_size > 0
+        else None
+    )
     app = App(
         root,
         thumbnail_size=get_int_option("thumbnail_size"),
         preview_size=get_int_option("preview_size"),
         database_controller=database_controller,
-        exiftool_controller=ExifToolController(get_exiftool()),
+        exiftool_controller=exiftool_controller,
+        virtual_gallery=get_bool_option("virtual_gallery"),
+        gallery_renderer=GalleryRenderer(get_string_option("gallery_renderer")),
+        thumbnail_workers=get_int_option("thumbnail_workers"),
+        thumbnail_processes=get_bool_option("thumbnail_processes"),
+        thumbnail_quality=Quality(get_string_option("thumbnail_quality")),
+        thumbnail_cache=thumbnail_cache,
+        embedded_previews=get_bool_option("embedded_previews"),
+        thumbnail_memory=get_int_option("thumbnail_memory_mb") * 1024 * 1024,
+        preview_tile_cache=get_int_option("preview_tile_cache_mb") * 1024 * 1024,
+        watch_settle_time=get_float_option("watch_settle_time"),
+        watch_polling=get_bool_option("watch_polling"),
+        metadata_token_index=get_bool_option("metadata_token_index"),
     )
     app.grid(row=0, column=0, sticky="nsew")
+    # folders or image lists given on the command line
+    for path in sys.argv[1:]:
+        app.open(path)
 
     root.columnconfigure(0, weight=1)
     root.rowconfigure(0, weight=1)
     root.minsize(*MIN_WIN_SIZE)
     root.geometry(f"{DEFAULT_WIN_SIZE[0]}x{DEFAULT_WIN_SIZE[1]}")
 
-    root.mainloop()
+    try:
+        root.mainloop()
+    finally:
+        app.shutdown()
+        exiftool_controller.close()
+        if thumbnail_cache:
+            thumbnail_cache.close()
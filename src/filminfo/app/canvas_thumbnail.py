@@ -0,0 +1,173 @@
+import os
+import tkinter as tk
+
+from PIL import Image, ImageTk
+
+from filminfo.app.thumbnail import (
+    HIGHLIGHT_THICKNESS,
+    thumbnail_image_size,
+    thumbnail_label,
+)
+from filminfo.configuration import PADDING_SMALL, get_string_option
+
+
+class CanvasThumbnail:
+    """A thumbnail drawn as items onto the canvas of the gallery.
+
+    Looks and behaves like `Thumbnail` without being a widget, so thousands
+    of them don't slow Tk down. Events are handled by the canvas, `items`
+    tells which canvas items belong to the thumbnail.
+    """
+
+    def __init__(
+        self,
+        canvas: tk.Canvas,
+        image_path: str,
+        size: int,
+    ):
+        self._canvas = canvas
+        self._image_path = image_path
+        self._image_name = os.path.basename(image_path)
+        self._size = size
+        self._highlightthickness = HIGHLIGHT_THICKNESS
+        self._highlight_color = (
+            get_string_option("thumbnail_highlight_color") or "SystemHighlight"
+        )
+        self._pady = PADDING_SMALL
+        self._selected = False
+        self._thumbnail: ImageTk.PhotoImage | None = None
+        self._placed = False
+
+        self._create_items()
+
+    def _create_items(self) -> None:
+        canvas = self._canvas
+        # filled, so that the whole tile is found by hit-testing
+        self._frame = canvas.create_rectangle(
+            0,
+            0,
+            0,
+            0,
+            width=self._highlightthickness,
+            outline="",
+            fill=canvas.cget("background"),
+            state="hidden",
+        )
+        self._image = canvas.create_image(0, 0, anchor="center", state="hidden")
+        # placeholder until the decoded image arrives, see set_image()
+        self._placeholder = canvas.create_text(0, 0, text="...", state="hidden")
+        self._name = canvas.create_text(
+            0,
+            0,
+            text=thumbnail_label(self._image_path),
+            width=self.image_size[0],
+            anchor="n",
+            justify="center",
+            state="hidden",
+        )
+
+    def _update_items(self) -> None:
+        state = "normal" if self._placed else "hidden"
+        self._canvas.itemconfigure(self._frame, state=state)
+        self._canvas.itemconfigure(self._name, state=state)
+        if self._thumbnail is None:
+            self._canvas.itemconfigure(self._image, state="hidden")
+            self._canvas.itemconfigure(self._placeholder, state=state)
+        else:
+            self._canvas.itemconfigure(self._image, state=state)
+            self._canvas.itemconfigure(self._placeholder, state="hidden")
+
+    def _select(self) -> None:
+        self._selected = True
+        self._canvas.itemconfigure(self._frame, outline=self._highlight_color)
+
+    def _deselect(self) -> None:
+        self._selected = False
+        self._canvas.itemconfigure(self._frame, outline="")
+
+    # --- Public methods ---
+    @property
+    def file_path(self) -> str:
+        return self._image_path
+
+    @property
+    def image_name(self) -> str:
+        return self._image_name
+
+    @property
+    def selected(self) -> bool:
+        return self._selected
+
+    @property
+    def image_size(self) -> tuple[int, int]:
+        return thumbnail_image_size(self._size)
+
+    @property
+    def items(self) -> tuple[int, ...]:
+        return self._frame, self._image, self._placeholder, self._name
+
+    def winfo_reqwidth(self) -> int:
+        return self._size
+
+    def place(self, x: int, y: int) -> None:
+        inset = self._highlightthickness / 2
+        _, image_height = self.image_size
+        center_x = x + self._size / 2
+        image_y = y + self._highlightthickness + self._pady + image_height / 2
+
+        canvas = self._canvas
+        canvas.coords(
+            self._frame,
+            x + inset,
+            y + inset,
+            x + self._size - inset,
+            y + self._size - inset,
+        )
+        canvas.coords(self._image, center_x, image_y)
+        canvas.coords(self._placeholder, center_x, image_y)
+        canvas.coords(self._name, center_x, image_y + image_height / 2 + self._pady)
+        self._placed = True
+        self._update_items()
+
+    def place_forget(self) -> None:
+        self._placed = False
+        self._update_items()
+
+    def destroy(self) -> None:
+        self._canvas.delete(*self.items)
+
+    def rebind(self, image_path: str, label: str, selected: bool) -> None:
+        self._image_path = image_path
+        self._image_name = os.path.basename(image_path)
+        self._thumbnail = None
+        self._canvas.itemconfigure(self._image, image="")
+        self._canvas.itemconfigure(self._placeholder, text="...")
+        self._canvas.itemconfigure(self._name, text=label)
+        self.select() if selected else self.deselect()
+        self._update_items()
+
+    def set_image(self, image: Image.Image | None) -> None:
+        if image is None:
+            self._canvas.itemconfigure(self._placeholder, text="No preview")
+            return
+
+        self._thumbnail = ImageTk.PhotoImage(image)
+        self._canvas.itemconfigure(self._image, image=self._thumbnail)
+        self._update_items()
+
+    def drop_image(self) -> ImageTk.PhotoImage | None:
+        """Stop showing the image until it is set again, returns its photo."""
+        photo, self._thumbnail = self._thumbnail, None
+        self._canvas.itemconfigure(self._image, image="")
+        self._canvas.itemconfigure(self._placeholder, text="...")
+        self._update_items()
+        return photo
+
+    def select(self) -> None:
+        self._select()
+
+    def deselect(self) -> None:
+        self._deselect()
+
+    def toggle(self) -> None:
+        self.deselect() if self.selected else self.select()
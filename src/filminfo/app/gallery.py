@@ -1,17 +1,80 @@
 import platform
+import queue
 import re
+import threading
 import tkinter as tk
 from collections.abc import Iterable, Sequence
-from tkinter import filedialog, ttk
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from enum import Enum
+from functools import partial
+from tkinter import filedialog, messagebox, ttk
+
+from PIL import Image, ImageTk
 
 from filminfo.app import add_bindtag, find_ancestor
+from filminfo.app.canvas_thumbnail import CanvasThumbnail
+from filminfo.app.preview import PreviewWindow
 from filminfo.app.scrollable_frame import ScrollableFrame
-from filminfo.app.thumbnail import Thumbnail
+from filminfo.app.selection import Selection
+from filminfo.app.thumbnail import Thumbnail, thumbnail_label
+from filminfo.app.thumbnail_loader import PreviewProvider, ThumbnailLoader
+from filminfo.app.thumbnail_memory import ThumbnailMemory
 from filminfo.app.types import AnyWidget
 from filminfo.configuration import PADDING_MEDIUM, PADDING_SMALL
+from filminfo.models.folder_watcher import FolderWatcher
+from filminfo.models.image_files import IMAGE_EXTENSIONS, read_manifest, scan_images
+from filminfo.models.images import Quality
+from filminfo.models.thumbnail_cache import ThumbnailCache
+
+
+Tile = Thumbnail | CanvasThumbnail
+
+
+class GalleryRenderer(Enum):
+    WIDGETS = "widgets"  # a Thumbnail widget per tile
+    CANVAS = "canvas"  # tiles drawn onto a single canvas
+
+
+# how long resizing has to pause before the tiles are laid out again, in ms
+_RELAYOUT_DELAY = 150
+
+# Loaded images kept for rebinding tiles without a reload, per tile in use.
+_KEPT_IMAGES_PER_TILE = 3
+
+# Imported paths are handed over in batches of this many, and picked up
+# every few ms.
+_IMPORT_BATCH = 500
+_IMPORT_POLL = 100
+
+
+@dataclass(slots=True)
+class _ImageRecord:
+    path: str
+    label: str
 
 
 class Gallery(ttk.Frame):
+    """Thumbnails of the images to work on.
+
+    The images and their labels are plain records, their selection is kept
+    by position in a `Selection`; tiles are placed onto the records. With
+    `virtual` there are only tiles for the rows in view, rebound to other
+    records while scrolling. Otherwise every image gets a tile of its own.
+    Tiles are `Thumbnail` widgets or, with the canvas renderer,
+    `CanvasThumbnail` items which are hit-tested on clicks.
+
+    Folders and image lists are read and sorted on a background thread, the
+    images found are then added in batches. Watched folders feed new images
+    into the same batches.
+
+    With a `thumbnail_memory` budget, tiles far from the view drop their
+    photo images once it is exceeded, and get them back, from the thumbnail
+    cache or compressed in memory, when scrolled near again. With `virtual`
+    all tiles are in view, the images kept for rebinding are dropped
+    instead, those of the records farthest from the view first.
+    """
+
     TAG = "Gallery"
 
     def __init__(
@@ -20,18 +83,66 @@ class Gallery(ttk.Frame):
         thumbnail_size: int,
         preview_size: int,
         *args,
+        virtual: bool = True,
+        renderer: GalleryRenderer = GalleryRenderer.WIDGETS,
+        thumbnail_workers: int = 0,
+        thumbnail_processes: bool = False,
+        thumbnail_quality: Quality = Quality.BALANCED,
+        thumbnail_cache: ThumbnailCache | None = None,
+        thumbnail_memory: int = 0,
+        preview_tile_cache: int = 64 * 1024 * 1024,
+        preview_provider: PreviewProvider | None = None,
+        watch_settle_time: float = 2.0,
+        watch_polling: bool = False,
         **kwargs,
     ):
         super().__init__(parent, *args, takefocus=True, **kwargs)
         self._thumbnail_size = thumbnail_size
         self._preview_size = preview_size
-        self._thumbnails: list[Thumbnail] = []
-        self._selected = 0
+        self._preview_tile_cache = preview_tile_cache
+        self._virtual = virtual
+        self._renderer = renderer
+        self._records: list[_ImageRecord] = []
+        self._paths: set[str] = set()  # of the records, to skip duplicates
+        self._selection = Selection()
+        self._anchor: int | None = None  # last clicked, for range selection
+        # path -> tile showing it and the record index it is placed for
+        self._tiles: dict[str, tuple[Tile, int]] = {}
+        self._spare_tiles: list[Tile] = []
+        self._tile_items: dict[int, CanvasThumbnail] = {}  # canvas item -> tile
+        self._memory = ThumbnailMemory(thumbnail_memory)
+        self._dropped: set[str] = set()  # paths of tiles without their photo
+        self._cache = thumbnail_cache
+        self._quality = thumbnail_quality
+        self._loader = ThumbnailLoader(
+            self,
+            self._visible_images,
+            thumbnail_workers,
+            thumbnail_processes,
+            thumbnail_cache,
+            thumbnail_quality,
+            preview_provider,
+        )
         self._columns = 0
+        self._relayout_job: str | None = None
+        self._preview: PreviewWindow | None = None
+        self._preview_index = 0  # where the previewed image was last found
+        self._importer = ThreadPoolExecutor(max_workers=1)
+        self._imports: list[Future[None]] = []
+        self._imported: queue.Queue[list[str]] = queue.Queue()
+        self._import_job: str | None = None
+        self._closing = threading.Event()
+        self._watch_settle_time = watch_settle_time
+        self._watch_polling = watch_polling
+        self._watcher: FolderWatcher | None = None
 
         self._toolbar = _Toolbar(self)
         self._statusbar = _StatusBar(self)
-        self._scrollable = ScrollableFrame(self, horizontal=False)
+        self._scrollable = ScrollableFrame(
+            self,
+            horizontal=False,
+            embed_container=renderer is GalleryRenderer.WIDGETS,
+        )
         self._container = self._scrollable.container
 
         self._layout()
@@ -61,144 +172,540 @@ class Gallery(ttk.Frame):
         self.bind(f"<{asterisk_key}>", self._on_invert_selection)
         self.bind(f"<{delete_key}>", self._on_remove_images)
         self.bind_all(f"<{control_key}-o>", self._on_add_images)
+        self._scrollable.bind("<<Scrolled>>", self._on_scroll)
+        self._scrollable.canvas.bind("<Button-3>", self._on_canvas_right_click)
 
         self.bind_class(Gallery.TAG, "<Button-1>", self._on_gallery_click, add="+")
+        self.bind_class(
+            Gallery.TAG, "<Shift-Button-1>", self._on_gallery_shift_click, add="+"
+        )
         self.bind_class(Thumbnail.TAG, "<Button-1>", self._on_thumbnail_left_click)
+        self.bind_class(
+            Thumbnail.TAG, "<Shift-Button-1>", self._on_thumbnail_shift_click
+        )
         self.bind_class(Thumbnail.TAG, "<Button-3>", self._on_thumbnail_right_click)
 
         self._toolbar.button_add.configure(command=self._on_add_images)
+        self._toolbar.button_add_folder.configure(command=self._on_add_folder)
+        self._toolbar.button_add_list.configure(command=self._on_add_list)
+        self._toolbar.check_watch.configure(command=self._on_watch_toggle)
         self._toolbar.button_pattern_apply.configure(command=self._on_pattern_apply)
         self._toolbar.entry_pattern.bind("<Return>", self._on_pattern_apply)
 
-    def _draw_thumbnails(self, columns: int, sort: bool = False) -> None:
-        if not self._thumbnails:
+    def _draw_thumbnails(self, columns: int, first: int = 0) -> None:
+        """Put tiles onto the records in view, release the others.
+
+        Only tiles whose cell changed are moved. Records before `first` are
+        known to be in place already, e.g. when images were appended.
+        """
+        previous = self._columns or columns
+        if columns != previous:
+            first = 0
+        self._columns = columns
+        if not self._records:
+            self._scrollable.set_content_height(0)
+            for path in list(self._tiles):
+                self._release_tile(path)
             return
 
-        for thumbnail in self._thumbnails:
-            thumbnail.grid_remove()
+        pitch = self._get_thumbnail_size() + 2 * PADDING_SMALL
+        rows = -(-len(self._records) // columns)
+        self._scrollable.set_content_height(rows * pitch)
+
+        start, end = self._tile_range()
+        in_view = {
+            self._records[index].path: index for index in range(max(start, first), end)
+        }
+        if not first:
+            for path in [path for path in self._tiles if path not in in_view]:
+                self._release_tile(path)
+
+        for path, index in in_view.items():
+            cell = divmod(index, columns)
+            if (bound := self._tiles.get(path)) is None:
+                tile, moved = self._bind_tile(index), True
+            else:
+                tile, placed_at = bound
+                moved = divmod(placed_at, previous) != cell
+
+            self._tiles[path] = (tile, index)
+            if moved:
+                row, column = cell
+                tile.place(
+                    x=column * pitch + PADDING_SMALL, y=row * pitch + PADDING_SMALL
+                )
 
-        thumbnails = (
-            sorted(self._thumbnails, key=lambda t: t.file_path)
-            if sort
-            else self._thumbnails
-        )
-        for idx, thumbnail in enumerate(thumbnails):
-            row, column = divmod(idx, columns)
-            thumbnail.grid(
-                row=row,
-                column=column,
-                padx=PADDING_SMALL,
-                pady=PADDING_SMALL,
-                sticky="n",
+    def _bind_tile(self, index: int) -> Tile:
+        record = self._records[index]
+        if self._spare_tiles:
+            tile = self._spare_tiles.pop()
+            tile.rebind(record.path, record.label, self._selection[index])
+        else:
+            tile = self._create_tile(index)
+
+        if (image := self._memory.kept(record.path)) is not None:
+            self._set_tile_image(record.path, tile, image)
+        else:
+            self._loader.request(
+                record.path,
+                *tile.image_size,
+                partial(self._on_thumbnail_loaded, record.path),
             )
-        self._columns = columns
+        return tile
+
+    def _release_tile(self, path: str) -> None:
+        tile, _ = self._tiles.pop(path)
+        self._loader.cancel(path)
+        self._memory.hide(path)
+        self._dropped.discard(path)
+        if self._virtual:
+            tile.place_forget()
+            self._spare_tiles.append(tile)
+            return
+
+        tile.destroy()
+        if isinstance(tile, CanvasThumbnail):
+            for item in tile.items:
+                del self._tile_items[item]
+
+    def _create_tile(self, index: int) -> Tile:
+        record = self._records[index]
+        tile: Tile
+        if self._renderer is GalleryRenderer.CANVAS:
+            tile = CanvasThumbnail(
+                self._scrollable.canvas,
+                record.path,
+                size=self._thumbnail_size,
+            )
+            self._tile_items.update(dict.fromkeys(tile.items, tile))
+        else:
+            tile = Thumbnail(
+                self._container,
+                record.path,
+                size=self._thumbnail_size,
+            )
+        if self._selection[index]:
+            tile.select()
+        return tile
+
+    def _set_tile_image(self, path: str, tile: Tile, image: Image.Image | None) -> None:
+        tile.set_image(image)
+        if image is not None:
+            self._memory.show(path, image)
+        self._dropped.discard(path)
+
+    def _drop_image(self, path: str, image: Image.Image | None = None) -> None:
+        tile, _ = self._tiles[path]
+        photo = tile.drop_image()
+        self._memory.hide(path)
+        self._dropped.add(path)
+        if self._cache is None:
+            # nothing to reload it from
+            if image is None and photo is not None:
+                image = ImageTk.getimage(photo)
+            if image is not None:
+                self._memory.stash(path, image)
+
+    def _enforce_budget(self) -> None:
+        """Drop the photos of the tiles farthest from the view while over budget."""
+        if not self._memory.over:
+            return None
+
+        start, end = self._near_range()
+        middle = (start + end) // 2
+        if self._virtual:
+            # all tiles are in view, only the kept images can go
+            self._memory.trim(middle)
+            return None
+
+        far = sorted(
+            (
+                (abs(index - middle), path)
+                for path, (_, index) in self._tiles.items()
+                if self._memory.is_shown(path) and not start <= index < end
+            ),
+            reverse=True,
+        )
+        for _, path in far:
+            if not self._memory.over:
+                break
+            self._drop_image(path)
+
+    def _restore_images(self) -> None:
+        """Give the tiles near the view back the photos they dropped."""
+        if not self._dropped:
+            return None
+
+        start, end = self._near_range()
+        for record in self._records[start:end]:
+            path = record.path
+            if path not in self._dropped or (bound := self._tiles.get(path)) is None:
+                continue
+
+            tile = bound[0]
+            if (image := self._memory.unstash(path)) is not None:
+                self._set_tile_image(path, tile, image)
+            else:
+                self._dropped.discard(path)
+                self._loader.request(
+                    path, *tile.image_size, partial(self._on_thumbnail_loaded, path)
+                )
+        self._enforce_budget()
+        self._update_memory_status()
+
+    def _near_range(self) -> tuple[int, int]:
+        """Records in view and a screen's worth on either side."""
+        if not self._columns or not self._records:
+            return 0, 0
+
+        first_row, last_row = self._visible_rows()
+        rows = last_row - first_row + 1
+        start = max(0, (first_row - rows) * self._columns)
+        end = min(len(self._records), (last_row + 1 + rows) * self._columns)
+        return start, end
+
+    def _refresh_tiles(self) -> None:
+        for tile, index in self._tiles.values():
+            tile.select() if self._selection[index] else tile.deselect()
+
+    def _tile_at(self, event: tk.Event) -> CanvasThumbnail | None:
+        canvas = self._scrollable.canvas
+        if event.widget is not canvas:
+            return None
+
+        x, y = canvas.canvasx(event.x), canvas.canvasy(event.y)
+        for item in reversed(canvas.find_overlapping(x, y, x, y)):
+            if (tile := self._tile_items.get(item)) is not None:
+                return tile
+        return None
+
+    def _toggle_tile(self, tile: Tile) -> None:
+        if (index := self._index_of(tile)) is not None:
+            self._selection.toggle(index)
+            self._anchor = index
+            tile.toggle()
+            self._update_status_bar()
+
+    def _select_range_to(self, tile: Tile) -> None:
+        if (index := self._index_of(tile)) is None:
+            return None
+        if self._anchor is None or self._anchor >= len(self._records):
+            self._toggle_tile(tile)
+            return None
+
+        start, stop = sorted((self._anchor, index))
+        self._selection.select_range(start, stop + 1)
+        self._refresh_tiles()
+        self._update_status_bar()
+
+    def _show_preview(self, path: str) -> None:
+        if self._preview:
+            self._preview.show(path)
+            return None
+
+        def on_preview_close():
+            self._preview = None
+
+        self._preview = PreviewWindow(
+            path,
+            self._preview_size,
+            self._cache,
+            self._quality,
+            on_preview_close,
+            navigate=self._neighbour,
+            thumbnail=self._thumbnail,
+            tile_cache=self._preview_tile_cache,
+        )
+
+    def _thumbnail(self, path: str) -> Image.Image | None:
+        """The image's thumbnail if it is kept or cached, for a first paint."""
+        if (image := self._memory.kept(path)) is not None:
+            return image
+
+        tiles = [tile for tile, _ in self._tiles.values()] + self._spare_tiles
+        if self._cache is None or not tiles:
+            return None
+        return self._cache.get(path, *tiles[0].image_size, self._quality)
+
+    def _neighbour(self, path: str, step: int) -> str | None:
+        """The image `step` places from the given one, in gallery order."""
+        if (index := self._find_record(path, self._preview_index)) is None:
+            return None
+
+        self._preview_index = index
+        if 0 <= index + step < len(self._records):
+            return self._records[index + step].path
+        return None
+
+    def _find_record(self, path: str, near: int) -> int | None:
+        # previews mostly move by one image, so look around the last one first
+        for index in (near, near + 1, near - 1):
+            if 0 <= index < len(self._records) and self._records[index].path == path:
+                return index
+        records = self._records
+        return next(
+            (i for i, record in enumerate(records) if record.path == path), None
+        )
+
+    def _index_of(self, tile: Tile) -> int | None:
+        if (bound := self._tiles.get(tile.file_path)) is None:
+            return None
+        return bound[1]
+
+    def _add_images(self, images: Iterable[str]) -> None:
+        images = [image for image in dict.fromkeys(images) if image not in self._paths]
+        if not images:
+            return None
+
+        first = len(self._records)
+        self._load_thumbnails(images)
+        self._draw_thumbnails(self._get_number_of_columns(), first)
+        self._update_status_bar()
 
     def _load_thumbnails(self, images: Iterable[str]) -> None:
-        thumbnails = []
+        records = [_ImageRecord(image, thumbnail_label(image)) for image in images]
+        records.sort(key=lambda r: r.path)
+        self._records.extend(records)
+        self._paths.update(record.path for record in records)
+        self._selection.extend(len(records))
+
+    def _import(self, images: Iterable[str]) -> None:
+        self._imports.append(self._importer.submit(self._collect, images))
+        self._schedule_imports()
+
+    def _schedule_imports(self) -> None:
+        if self._import_job is None:
+            self._import_job = self.after(_IMPORT_POLL, self._poll_imports)
+
+    def _collect(self, images: Iterable[str]) -> None:
+        # runs on the import thread, Tk is only touched in _poll_imports();
+        # the whole scan is sorted first, as batches are only sorted within
+        found: list[str] = []
         for image in images:
-            thumbnails.append(
-                Thumbnail(
-                    self._container,
-                    image,
-                    size=self._thumbnail_size,
-                    preview_size=self._preview_size,
-                )
-            )
-        thumbnails.sort(key=lambda t: t.file_path)
-        self._thumbnails.extend(thumbnails)
+            if self._closing.is_set():
+                return
+            found.append(image)
+        found.sort()
+        for start in range(0, len(found), _IMPORT_BATCH):
+            self._imported.put(found[start : start + _IMPORT_BATCH])
+
+    def _poll_imports(self) -> None:
+        self._import_job = None
+
+        images: list[str] = []
+        while not self._imported.empty():
+            images.extend(self._imported.get())
+        self._add_images(images)
+
+        for future in [future for future in self._imports if future.done()]:
+            self._imports.remove(future)
+            if error := future.exception():
+                messagebox.showerror("Import Error", str(error))
+
+        # a finished import may have left a batch after the queue was emptied
+        if self._imports or self._watcher or not self._imported.empty():
+            self._schedule_imports()
+
+    def _tile_range(self) -> tuple[int, int]:
+        if not self._virtual:
+            return 0, len(self._records)
+
+        # a row beyond either edge, so that scrolling doesn't uncover gaps
+        first_row, last_row = self._visible_rows()
+        start = max(0, (first_row - 1) * self._columns)
+        end = min(len(self._records), (last_row + 2) * self._columns)
+        return start, end
+
+    def _visible_rows(self) -> tuple[int, int]:
+        canvas = self._scrollable.canvas
+        pitch = self._get_thumbnail_size() + 2 * PADDING_SMALL
+        first_row = int(canvas.canvasy(0)) // pitch
+        last_row = int(canvas.canvasy(canvas.winfo_height())) // pitch
+        return first_row, last_row
+
+    def _visible_images(self) -> list[str]:
+        if not self._columns or not self._records:
+            return []
+
+        first_row, last_row = self._visible_rows()
+        start = first_row * self._columns
+        end = (last_row + 1) * self._columns
+        return [record.path for record in self._records[start:end]]
 
     def _get_images(self) -> Iterable[str]:
-        images = filedialog.askopenfilenames(
+        return filedialog.askopenfilenames(
             title="Select an images",
             filetypes=[
-                ("Image files", "*.png *.jpg *.jpeg *.gif *.bmp *.tif *.tiff"),
+                ("Image files", " ".join(f"*{ext}" for ext in IMAGE_EXTENSIONS)),
                 ("All files", "*.*"),
             ],
         )
 
-        in_gallery = set(self.all_images)
-
-        return [image for image in images if image not in in_gallery]
+    def _update_memory_status(self) -> None:
+        self._statusbar.set_memory(self._memory.used, self._memory.max_bytes)
 
     def _update_status_bar(self) -> None:
-        self._statusbar.set_image_counts(
-            len(self.selected_images), len(self._thumbnails)
-        )
+        self._statusbar.set_image_counts(self._selection.count, len(self._records))
 
     def _get_number_of_columns(self) -> int:
-        self.update_idletasks()
         thumbnail_width = self._get_thumbnail_size()
         if thumbnail_width:
-            columns = max(
-                1,
-                self._container.winfo_width() // (thumbnail_width + 2 * PADDING_SMALL),
-            )
+            canvas_width = self._scrollable.canvas.winfo_width()
+            columns = max(1, canvas_width // (thumbnail_width + 2 * PADDING_SMALL))
             return columns
         return 0
 
     def _get_thumbnail_size(self) -> int:
-        if self._thumbnails:
-            return self._thumbnails[0].winfo_reqwidth()
-        return 0
+        if not self._tiles and not self._spare_tiles:
+            if not self._records:
+                return 0
+            self._spare_tiles.append(self._create_tile(0))
+
+        tile = next(iter(self._tiles.values()))[0] if self._tiles else None
+        return (tile or self._spare_tiles[0]).winfo_reqwidth()
+
+    def _on_thumbnail_loaded(self, path: str, image: Image.Image | None) -> None:
+        if (bound := self._tiles.get(path)) is not None:
+            tile, index = bound
+            if image is not None and self._virtual:
+                limit = _KEPT_IMAGES_PER_TILE * len(self._tiles)
+                self._memory.keep(path, image, limit, index)
+                self._enforce_budget()
+            start, end = self._near_range()
+            if image is not None and not self._memory.fits(image):
+                if start <= index < end:
+                    self._set_tile_image(path, tile, image)
+                    self._enforce_budget()
+                else:
+                    # far from the view, not worth a photo for now
+                    self._drop_image(path, image)
+            else:
+                self._set_tile_image(path, tile, image)
+        self._update_memory_status()
+        if self._cache:
+            stats = self._cache.stats
+            self._statusbar.set_cache_stats(stats.hits, stats.misses)
 
     def _on_thumbnail_left_click(self, event: tk.Event) -> None:
         thumbnail = find_ancestor(event.widget, Thumbnail)
         if thumbnail:
-            thumbnail.toggle()
-            self._update_status_bar()
+            self._toggle_tile(thumbnail)
+        self.focus_set()
+
+    def _on_thumbnail_shift_click(self, event: tk.Event) -> None:
+        thumbnail = find_ancestor(event.widget, Thumbnail)
+        if thumbnail:
+            self._select_range_to(thumbnail)
         self.focus_set()
 
     def _on_thumbnail_right_click(self, event: tk.Event) -> None:
+        self.focus_set()
         thumbnail = find_ancestor(event.widget, Thumbnail)
         if thumbnail:
-            thumbnail.show_preview()
+            self._show_preview(thumbnail.file_path)
+
+    def _on_canvas_right_click(self, event: tk.Event) -> None:
+        self.focus_set()
+        if tile := self._tile_at(event):
+            self._show_preview(tile.file_path)
+
+    def _on_gallery_shift_click(self, event: tk.Event) -> None:
+        if tile := self._tile_at(event):
+            self._select_range_to(tile)
         self.focus_set()
 
     def _on_gallery_click(self, event: tk.Event) -> None:
-        self._on_deselect_all()
+        if tile := self._tile_at(event):
+            self._toggle_tile(tile)
+        else:
+            self._on_deselect_all()
         self.focus_set()
 
     def _on_add_images(self, event: tk.Event | None = None) -> None:
-        images = self._get_images()
-        if images:
-            self._load_thumbnails(images)
-            self._draw_thumbnails(self._get_number_of_columns())
+        self._add_images(self._get_images())
         self._update_status_bar()
         self.focus_set()
 
-    def _on_remove_images(self, event: tk.Event | None = None) -> None:
-        selected = [thumbnail for thumbnail in self._thumbnails if thumbnail.selected]
-        self._thumbnails = [
-            thumbnail for thumbnail in self._thumbnails if not thumbnail.selected
-        ]
+    def _on_add_folder(self) -> None:
+        directory = filedialog.askdirectory(title="Select a folder", mustexist=True)
+        if directory:
+            self.add_folder(directory)
+        self.focus_set()
 
-        for thumbnail in selected:
-            thumbnail.destroy()
+    def _on_watch_toggle(self) -> None:
+        if not self._toolbar.watching:
+            self.stop_watching()
+        elif directory := filedialog.askdirectory(
+            title="Select a folder to watch", mustexist=True
+        ):
+            self.watch([directory])
+        else:
+            self._toolbar.watching = False
+        self.focus_set()
+
+    def _on_add_list(self) -> None:
+        manifest = filedialog.askopenfilename(
+            title="Select an image list",
+            filetypes=[
+                ("Image lists", "*.txt *.csv"),
+                ("All files", "*.*"),
+            ],
+        )
+        if manifest:
+            self.add_manifest(manifest)
+        self.focus_set()
+
+    def _on_remove_images(self, event: tk.Event | None = None) -> None:
+        for record in self._selection.selected(self._records):
+            self._paths.discard(record.path)
+            self._memory.forget(record.path)
+            if record.path in self._tiles:
+                self._release_tile(record.path)
+        self._records = list(self._selection.unselected(self._records))
+        self._memory.reposition(
+            {record.path: index for index, record in enumerate(self._records)}
+        )
+        self._selection.reset(len(self._records))
+        self._anchor = None
 
         self._draw_thumbnails(self._get_number_of_columns())
         self._update_status_bar()
         self.focus_set()
 
     def _on_select_all(self, event: tk.Event | None = None) -> None:
-        if self._thumbnails:
+        if self._records:
             self.select_all()
             self._update_status_bar()
 
     def _on_deselect_all(self, event: tk.Event | None = None) -> None:
-        if self._thumbnails:
+        if self._records:
             self.deselect_all()
             self._update_status_bar()
 
     def _on_invert_selection(self, event: tk.Event | None = None) -> None:
-        for thumbnail in self._thumbnails:
-            thumbnail.toggle()
+        self._selection.invert()
+        self._refresh_tiles()
         self._update_status_bar()
 
     def _on_resize(self, event: tk.Event) -> None:
-        if (columns := self._get_number_of_columns()) != self._columns:
-            self._draw_thumbnails(columns)
+        # <Configure> comes in bursts while the window is being resized
+        if self._relayout_job:
+            self.after_cancel(self._relayout_job)
+        self._relayout_job = self.after(_RELAYOUT_DELAY, self._relayout)
         self.focus_set()
 
+    def _relayout(self) -> None:
+        self._relayout_job = None
+        columns = self._get_number_of_columns()
+        if columns != self._columns or self._virtual:
+            self._draw_thumbnails(columns)
+        self._restore_images()
+
+    def _on_scroll(self, event: tk.Event) -> None:
+        if self._virtual and self._columns:
+            self._draw_thumbnails(self._columns)
+        self._restore_images()
+
     def _on_pattern_apply(self, event: tk.Event | None = None) -> None:
         self._scrollable.scroll_to_top()
         self._scrollable.scroll_to_left()
@@ -216,27 +723,78 @@ class Gallery(ttk.Frame):
             return None
 
         self._toolbar.entry_pattern.configure(style="TEntry")
-        self.deselect_all()
-        for thumbnail in self._thumbnails:
-            if pattern.search(thumbnail.file_path):
-                thumbnail.select()
+        self._selection.assign(
+            pattern.search(record.path) is not None for record in self._records
+        )
+        self._refresh_tiles()
         self._update_status_bar()
 
+    def close(self) -> None:
+        if self._relayout_job:
+            self.after_cancel(self._relayout_job)
+            self._relayout_job = None
+        if self._import_job:
+            self.after_cancel(self._import_job)
+            self._import_job = None
+        self._closing.set()
+        self._importer.shutdown(wait=False, cancel_futures=True)
+        if self._watcher:
+            self._watcher.stop()
+            self._watcher = None
+        self._loader.close()
+        if self._preview:
+            self._preview.close()
+
+    def add_folder(self, directory: str) -> None:
+        """Add the images in the folder and its subfolders."""
+        self._import(scan_images(directory))
+
+    def add_manifest(self, path: str) -> None:
+        """Add the images listed in a text or CSV file, see `read_manifest`."""
+        self._import(read_manifest(path))
+
+    def watch(self, directories: Sequence[str]) -> None:
+        """Add new images appearing below the folders, until stopped."""
+        self.stop_watching()
+        self._watcher = FolderWatcher(
+            directories,
+            self._imported.put,
+            settle_time=self._watch_settle_time,
+            polling=self._watch_polling,
+        )
+        self._watcher.start()
+        self._toolbar.watching = True
+        self._statusbar.set_watched(directories)
+        self._schedule_imports()
+
+    def stop_watching(self) -> None:
+        if self._watcher:
+            self._watcher.stop()
+            self._watcher = None
+        self._toolbar.watching = False
+        self._statusbar.set_watched([])
+
+    def set_progress(self, done: int, total: int) -> None:
+        self._statusbar.set_progress(done, total)
+
+    def clear_progress(self) -> None:
+        self._statusbar.set_progress(0, 0)
+
     def deselect_all(self) -> None:
-        for thumbnail in self._thumbnails:
-            thumbnail.deselect()
+        self._selection.clear()
+        self._refresh_tiles()
 
     def select_all(self) -> None:
-        for thumbnail in self._thumbnails:
-            thumbnail.select()
+        self._selection.select_all()
+        self._refresh_tiles()
 
     @property
     def all_images(self) -> Sequence[str]:
-        return [t.file_path for t in self._thumbnails]
+        return [record.path for record in self._records]
 
     @property
     def selected_images(self) -> Sequence[str]:
-        return [t.file_path for t in self._thumbnails if t.selected]
+        return [record.path for record in self._selection.selected(self._records)]
 
 
 class _Toolbar(ttk.Frame):
@@ -244,6 +802,12 @@ class _Toolbar(ttk.Frame):
         super().__init__(parent, *args, **kwargs)
 
         self.button_add = ttk.Button(self, text="Add images")
+        self.button_add_folder = ttk.Button(self, text="Add folder (recursive)")
+        self.button_add_list = ttk.Button(self, text="Add list")
+        self._watch_var = tk.BooleanVar(value=False)
+        self.check_watch = ttk.Checkbutton(
+            self, text="Watch folder", variable=self._watch_var
+        )
         self._pattern_var = tk.StringVar()
         self._label_pattern = ttk.Label(self, text="Select by regex:")
         self.entry_pattern = ttk.Entry(self, textvariable=self._pattern_var)
@@ -253,9 +817,12 @@ class _Toolbar(ttk.Frame):
 
     def _layout(self) -> None:
         self.button_add.grid(row=0, column=0, sticky="w")
-        self._label_pattern.grid(row=0, column=1, sticky="e")
-        self.entry_pattern.grid(row=0, column=2, sticky="ew")
-        self.button_pattern_apply.grid(row=0, column=3, sticky="w")
+        self.button_add_folder.grid(row=0, column=1, sticky="w")
+        self.button_add_list.grid(row=0, column=2, sticky="w")
+        self.check_watch.grid(row=0, column=3, sticky="w")
+        self._label_pattern.grid(row=0, column=4, sticky="e")
+        self.entry_pattern.grid(row=0, column=5, sticky="ew")
+        self.button_pattern_apply.grid(row=0, column=6, sticky="w")
 
         for widget in self.winfo_children():
             widget.grid_configure(padx=PADDING_MEDIUM, pady=PADDING_SMALL)
@@ -264,17 +831,56 @@ class _Toolbar(ttk.Frame):
     def pattern(self) -> str:
         return self._pattern_var.get().strip()
 
+    @property
+    def watching(self) -> bool:
+        return self._watch_var.get()
+
+    @watching.setter
+    def watching(self, value: bool) -> None:
+        self._watch_var.set(value)
+
 
 class _StatusBar(ttk.Frame):
     def __init__(self, parent: AnyWidget, *args, **kwargs):
         super().__init__(parent, *args, **kwargs)
+        self._progress_var = tk.StringVar()
+        self._progress = ttk.Label(self, textvariable=self._progress_var)
+        self._watched_var = tk.StringVar()
+        self._watched = ttk.Label(self, textvariable=self._watched_var)
+        self._cache_var = tk.StringVar()
+        self._cache = ttk.Label(self, textvariable=self._cache_var)
+        self._memory_var = tk.StringVar()
+        self._memory = ttk.Label(self, textvariable=self._memory_var)
         self._label_var = tk.StringVar()
         self._label = ttk.Label(self, textvariable=self._label_var)
-        self._label.grid(row=0, column=0, sticky="e")
-        self.columnconfigure(0, weight=1)
+        self._progress.grid(row=0, column=0, sticky="w")
+        self._watched.grid(row=0, column=1, sticky="w")
+        self._cache.grid(row=0, column=2, sticky="e")
+        self._memory.grid(row=0, column=3, sticky="e")
+        self._label.grid(row=0, column=4, sticky="e")
+        self.columnconfigure(2, weight=1)
 
         for widget in self.winfo_children():
             widget.grid_configure(padx=PADDING_MEDIUM, pady=PADDING_SMALL)
 
     def set_image_counts(self, selected: int, total: int) -> None:
         self._label_var.set(f"Selected: {selected}/{total}")
+
+    def set_progress(self, done: int, total: int) -> None:
+        self._progress_var.set(f"Processing: {done}/{total}" if total else "")
+
+    def set_watched(self, directories: Sequence[str]) -> None:
+        self._watched_var.set(
+            f"Watching: {', '.join(directories)}" if directories else ""
+        )
+
+    def set_memory(self, used: int, budget: int) -> None:
+        used_mb = used / (1024 * 1024)
+        if budget:
+            text = f"Thumbnails: {used_mb:.0f}/{budget // (1024 * 1024)} MB"
+        else:
+            text = f"Thumbnails: {used_mb:.0f} MB"
+        self._memory_var.set(text)
+
+    def set_cache_stats(self, hits: int, misses: int) -> None:
+        self._cache_var.set(f"Thumbnail cache hits: {hits}, misses: {misses}")
@@ -31,6 +31,18 @@ class RemoveMetadaForm(ttk.Frame):
             ),
         )
         self._text_tags_other = tk.Text(self, height=5, width=50)
+        self._separator = ttk.Separator(self)
+        self._label_backups = ttk.Label(self, text="Backup files (*_original):")
+        self._archive_var = tk.BooleanVar(value=False)
+        self._choice_delete = ttk.Radiobutton(
+            self, text="Delete", variable=self._archive_var, value=False
+        )
+        self._choice_archive = ttk.Radiobutton(
+            self, text="Archive", variable=self._archive_var, value=True
+        )
+        self._button_clean = ttk.Button(
+            self, text="Clean up", command=self._on_clean_backups
+        )
 
         self._layout()
         self.__configure()
@@ -46,6 +58,12 @@ class RemoveMetadaForm(ttk.Frame):
         self._label_tags_other.grid(row=3, column=0, sticky="w", columnspan=3)
         self._text_tags_other.grid(row=4, column=0, sticky="ew", columnspan=3)
 
+        self._separator.grid(row=5, column=0, sticky="ew", columnspan=3)
+        self._label_backups.grid(row=6, column=0, sticky="w", columnspan=3)
+        self._choice_delete.grid(row=7, column=0, sticky="w")
+        self._choice_archive.grid(row=7, column=1, sticky="w")
+        self._button_clean.grid(row=7, column=2, sticky="e")
+
         self.columnconfigure(2, weight=1)
         self.rowconfigure(2, weight=1)
         self._form_scrollable.container.columnconfigure(0, weight=1)
@@ -117,6 +135,17 @@ class RemoveMetadaForm(ttk.Frame):
         self._check_tree.expand_all()
         self._form_scrollable.scroll_to_top()
 
+    def _on_clean_backups(self) -> None:
+        self.event_generate("<<CleanBackups>>")
+
+    def set_busy(self, busy: bool) -> None:
+        """Disable cleaning up while another operation runs."""
+        self._button_clean.configure(state="disabled" if busy else "!disabled")
+
+    @property
+    def archive_backups(self) -> bool:
+        return self._archive_var.get()
+
     @property
     def selected_items(self) -> list[str]:
         tags = self._check_tree.get_selected_leaves()
@@ -1,35 +1,85 @@
-import json
 import re
+import threading
 import tkinter as tk
-from tkinter import messagebox, ttk
+from collections.abc import Sequence
+from concurrent.futures import Future, ThreadPoolExecutor
+from tkinter import ttk
 
-from filminfo.app.scrollable_frame import ScrollableFrame
 from filminfo.app.treeview import CustomTreeview
 from filminfo.app.types import AnyWidget
 from filminfo.configuration import (
     APP_NAME,
     DEFAULT_WIN_SIZE,
     MIN_WIN_SIZE,
-    PADDING_BIG,
     PADDING_MEDIUM,
     PADDING_SMALL,
 )
+from filminfo.models.exiftool import Metadata
+from filminfo.models.metadata_index import MetadataIndex, Row, is_plain, narrows
+
+
+# how long typing has to pause before the filter is applied, in ms
+_FILTER_DELAY = 250
+# how often a running search is checked, in ms
+_SEARCH_POLL = 50
+# files are opened after filtering while they show no more rows than this
+_OPEN_LIMIT = 2_000
+
+Found = tuple[list[int], dict[str, list[int]]]  # rows, and by file node
 
 
 class MetadataView(ttk.Frame):
-    def __init__(self, parent: AnyWidget, *args, **kwargs):
+    """Tags of the files, a node per file.
+
+    The rows of the tags are kept here and only inserted into the tree
+    while their file node is open, closing it deletes them again. The
+    filter is applied while typing, searching a MetadataIndex of the rows
+    on a thread of its own; files without matching rows are hidden. A
+    query that narrows the previous one only checks the rows found before.
+    """
+
+    def __init__(self, parent: AnyWidget, *args, token_index: bool = False, **kwargs):
         super().__init__(parent, *args, **kwargs)
 
-        self._metadata: str = "[]"
-        self._tree_items: list[tuple[str, str]] = []
-        self._filter_applied = False
+        self._metadata: list[Metadata] = []
+        self._token_index = token_index
+        self._index = MetadataIndex(tokens=token_index)
+        self._row_data: list[Row] = []
+        self._row_files: list[str] = []  # row -> its file node
+        self._rows: dict[str, range] = {}  # file node -> its rows
+        self._populated: set[str] = set()
+        # matching rows by file node, None while not filtered
+        self._matches: dict[str, list[int]] | None = None
+        # the applied query, its rows, and how many rows there were
+        self._query = ""
+        self._found: list[int] = []
+        self._found_total = 0
+
+        self._searcher = ThreadPoolExecutor(max_workers=1)
+        self._search: Future[Found | None] | None = None
+        self._search_query = ""
+        self._search_total = 0
+        self._search_cancelled = threading.Event()
+        self._search_job: str | None = None
+        self._filter_job: str | None = None
 
         # --- Elements ---
-        self._scrollable = ScrollableFrame(self)
+        self._tree_frame = ttk.Frame(self)
         self._tree = CustomTreeview(
-            self._scrollable.container,
+            self._tree_frame,
             columns=("group", "tag", "value"),
             selectmode="browse",
+            on_open=self._populate,
+            on_close=self._depopulate,
+        )
+        self._v_scroll = ttk.Scrollbar(
+            self._tree_frame, orient="vertical", command=self._tree.yview
+        )
+        self._h_scroll = ttk.Scrollbar(
+            self._tree_frame, orient="horizontal", command=self._tree.xview
+        )
+        self._tree.configure(
+            yscrollcommand=self._v_scroll.set, xscrollcommand=self._h_scroll.set
         )
         self._label_data = ttk.Label(self, text="Metadata:")
         self._button_expand = ttk.Button(
@@ -61,8 +111,12 @@ class MetadataView(ttk.Frame):
         self._entry_filter.grid(row=1, column=3, sticky="ew")
         self._button_clone.grid(row=1, column=6, sticky="e")
 
-        self._scrollable.grid(row=2, column=0, sticky="nsew", columnspan=7)
-        self._tree.grid(row=0, column=0)
+        self._tree_frame.grid(row=2, column=0, sticky="nsew", columnspan=7)
+        self._tree.grid(row=0, column=0, sticky="nsew")
+        self._v_scroll.grid(row=0, column=1, sticky="ns")
+        self._h_scroll.grid(row=1, column=0, sticky="ew")
+        self._tree_frame.columnconfigure(0, weight=1)
+        self._tree_frame.rowconfigure(0, weight=1)
 
         self.columnconfigure(2, weight=1)
         self.rowconfigure(2, weight=1)
@@ -73,7 +127,7 @@ class MetadataView(ttk.Frame):
             self._button_collapse,
             self._entry_filter,
             self._button_clone,
-            self._scrollable,
+            self._tree_frame,
         ]:
             widget.grid_configure(padx=PADDING_MEDIUM, pady=PADDING_SMALL)
 
@@ -89,12 +143,127 @@ class MetadataView(ttk.Frame):
         self._tree.bind("<Double-1>", self._on_double_click)
         self._tree.bind("<Button-1>", self._on_click_outside, add="+")
         self._entry_filter.bind("<Return>", self._on_filter_apply)
+        self._pattern_var.trace_add("write", self._on_filter_typed)
+
+    def _populate(self, item: str) -> None:
+        if item not in self._rows or item in self._populated:
+            return None
+
+        tree = self._tree
+        tree.delete(*tree.get_children(item))
+        for number in self._shown_rows(item):
+            tree.insert(item, "end", values=self._row_data[number])
+        self._populated.add(item)
+
+    def _depopulate(self, item: str) -> None:
+        if item not in self._populated:
+            return None
+
+        self._tree.delete(*self._tree.get_children(item))
+        self._populated.discard(item)
+        self._add_placeholder(item)
+
+    def _add_placeholder(self, item: str) -> None:
+        # an empty child, so that the node can be opened; files are only
+        # shown while they have matching rows
+        if self._rows[item]:
+            self._tree.insert(item, "end")
+
+    def _shown_rows(self, item: str) -> Sequence[int]:
+        if self._matches is None:
+            return self._rows[item]
+        return self._matches.get(item, ())
+
+    def _schedule_filter(self) -> None:
+        if self._filter_job:
+            self.after_cancel(self._filter_job)
+        self._filter_job = self.after(_FILTER_DELAY, self._on_filter_apply)
+
+    def _start_search(self, query: str) -> None:
+        self._search_cancelled.set()
+        self._search_cancelled = cancelled = threading.Event()
+
+        total = len(self._row_files)
+        within = None
+        if total == self._found_total and narrows(query, self._query):
+            within = self._found
+        self._search = self._searcher.submit(self._match, query, within, cancelled)
+        self._search_query = query
+        self._search_total = total
+        if not self._search_job:
+            self._search_job = self.after(_SEARCH_POLL, self._poll_search)
+
+    def _cancel_search(self) -> None:
+        self._search_cancelled.set()
+        self._search = None
+        if self._search_job:
+            self.after_cancel(self._search_job)
+            self._search_job = None
+
+    def _match(
+        self, query: str, within: Sequence[int] | None, cancelled: threading.Event
+    ) -> Found | None:
+        # runs on the search thread, Tk is only touched in _poll_search()
+        if (found := self._index.search(query, within, cancelled)) is None:
+            return None
+
+        files = self._row_files
+        matches: dict[str, list[int]] = {}
+        for number in found:
+            matches.setdefault(files[number], []).append(number)
+        return found, matches
+
+    def _poll_search(self) -> None:
+        self._search_job = None
+        if self._search is None:
+            return None
+        if not self._search.done():
+            self._search_job = self.after(_SEARCH_POLL, self._poll_search)
+            return None
+
+        search, self._search = self._search, None
+        if (result := search.result()) is None:
+            return None
+
+        self._query = self._search_query
+        self._found, matches = result
+        self._found_total = self._search_total
+        self._apply_matches(matches)
 
-    def _reattach_all(self) -> None:
-        if self._filter_applied:
-            self._filter_applied = False
-            for child, parent in self._tree_items:
-                self._tree.reattach(child, parent, "end")  # type: ignore[arg-type]
+    def _apply_matches(self, matches: dict[str, list[int]] | None) -> None:
+        """Show the files with matching rows, in one go.
+
+        All files are opened if few rows match. Otherwise the opened ones
+        stay so if they show few rows, else they are closed as well.
+        """
+        tree = self._tree
+        populated = [item for item in self._rows if item in self._populated]
+        tree.delete(*(child for item in populated for child in tree.get_children(item)))
+        self._populated.clear()
+        self._matches = matches
+
+        shown = list(self._rows if matches is None else matches)
+        tree.set_children("", *shown)
+
+        if matches is not None and len(self._found) <= _OPEN_LIMIT:
+            opened = shown
+        else:
+            opened = [item for item in populated if self._shown_rows(item)]
+            if sum(len(self._shown_rows(item)) for item in opened) > _OPEN_LIMIT:
+                opened = []
+
+        for item in opened:
+            self._populate(item)
+            tree.item(item, open=True)
+        for item in populated:
+            if item not in self._populated:
+                self._add_placeholder(item)
+                tree.item(item, open=False)
+        self._scroll_to_top()
+
+    def _scroll_to_top(self) -> None:
+        self._tree.yview_moveto(0)
+        self._tree.xview_moveto(0)
 
     def _copy_item(self, item_id: str, column_id: str) -> None:
         if not item_id or not column_id:
@@ -116,14 +285,16 @@ class MetadataView(ttk.Frame):
         self.clipboard_append(value)
 
     def _on_expand_all(self) -> None:
-        self._tree.expand_all()
-        self._scrollable.scroll_to_top()
-        self._scrollable.scroll_to_left()
+        for item in self._rows:
+            self._populate(item)
+            self._tree.item(item, open=True)
+        self._scroll_to_top()
 
     def _on_collapse_all(self) -> None:
-        self._tree.collapse_all()
-        self._scrollable.scroll_to_top()
-        self._scrollable.scroll_to_left()
+        for item in self._rows:
+            self._depopulate(item)
+            self._tree.item(item, open=False)
+        self._scroll_to_top()
 
     def _on_double_click(self, event: tk.Event) -> None:
         self._copy_item(
@@ -139,7 +310,7 @@ class MetadataView(ttk.Frame):
         window = tk.Toplevel()
         window.title(f"{APP_NAME.capitalize()} - Metadata view")
 
-        frame = MetadataView(window)
+        frame = MetadataView(window, token_index=self._token_index)
         frame.grid(
             column=0, row=0, sticky="nsew", padx=PADDING_MEDIUM, pady=PADDING_MEDIUM
         )
@@ -156,88 +327,97 @@ class MetadataView(ttk.Frame):
         ]:
             widget.grid_configure(padx=PADDING_MEDIUM, pady=PADDING_SMALL)
 
-        frame.display_metadata(self._metadata or "")
+        frame.add_metadata(self._metadata)
 
         window.columnconfigure(0, weight=1)
         window.rowconfigure(0, weight=1)
-        window.maxsize(
-            self._tree.winfo_reqwidth() + PADDING_BIG,
-            self._tree.winfo_reqheight() + PADDING_BIG,
-        )
         window.minsize(*MIN_WIN_SIZE)
         window.geometry(f"{DEFAULT_WIN_SIZE[0]}x{DEFAULT_WIN_SIZE[1]}")
 
+        def close() -> None:
+            frame.close()
+            window.destroy()
+
+        window.protocol("WM_DELETE_WINDOW", close)
+
+    def _on_filter_typed(self, *args) -> None:
+        self._schedule_filter()
+
     def _on_filter_apply(self, event: tk.Event | None = None) -> None:
-        self._scrollable.scroll_to_top()
-        self._scrollable.scroll_to_left()
+        if self._filter_job:
+            self.after_cancel(self._filter_job)
+            self._filter_job = None
+
         text = self._pattern_var.get().strip()
-        if not text:
-            self._reattach_all()
-            return None
+        if not is_plain(text):
+            try:
+                re.compile(text)
+            except re.error:
+                self._entry_filter.configure(style="Invalid.TEntry")
+                return None
+        self._entry_filter.configure(style="TEntry")
 
-        try:
-            pattern = re.compile(text, re.IGNORECASE)
-        except re.error:
-            self._entry_filter.configure(style="Invalid.TEntry")
+        if not text:
+            self._cancel_search()
+            self._query = ""
+            self._found = []
+            self._found_total = 0
+            if self._matches is not None:
+                self._apply_matches(None)
             return None
 
-        self._entry_filter.configure(style="TEntry")
-
-        def filter() -> None:
-            for child, parent in self._tree_items:
-                values = self._tree.item(child, "values")
-                if not values:
-                    self._tree.reattach(child, parent, "end")  # type: ignore[arg-type]
-                else:
-                    for value in values:
-                        if pattern.search(value):
-                            self._tree.reattach(
-                                child,
-                                parent,
-                                "end",  # type: ignore[arg-type]
-                            )
-                            break
-                    else:
-                        self._tree.detach(child)
-
-        self._tree.expand_all()
-        filter()
-        self._filter_applied = True
+        self._start_search(text)
 
     def _on_filter_clear(self, event: tk.Event | None = None) -> None:
-        self._scrollable.scroll_to_top()
-        self._scrollable.scroll_to_left()
         self._pattern_var.set("")
-        self._reattach_all()
-
-    def display_metadata(self, metadata: str) -> None:
-        self._metadata = metadata
-        try:
-            data = json.loads(metadata)
-        except json.JSONDecodeError:
-            messagebox.showerror("Error", "Couldn't parse ExifTool metadata report.")
-            return None
-
-        self._tree.delete(*self._tree.get_children())
-        self._tree_items.clear()
-        self._filter_applied = False
+        self._on_filter_apply()
 
-        self._scrollable.scroll_to_top()
-        self._scrollable.scroll_to_left()
-        total_items = 0
+    def set_cache_stats(self, hits: int, misses: int) -> None:
+        self._label_data.configure(
+            text=f"Metadata (cache hits: {hits}, misses: {misses}):"
+        )
 
-        for file_data in data:
-            parent = self._tree.insert(
+    def clear(self) -> None:
+        self._cancel_search()
+        self._metadata = []
+        self._tree.delete(*self._tree.get_children())
+        self._index.clear()
+        self._row_data = []
+        self._row_files = []
+        self._rows.clear()
+        self._populated.clear()
+        self._matches = None
+        self._query = ""
+        self._found = []
+        self._found_total = 0
+        self._scroll_to_top()
+
+    def close(self) -> None:
+        self._cancel_search()
+        self._searcher.shutdown(wait=False, cancel_futures=True)
+
+    def add_metadata(self, metadata: Sequence[Metadata]) -> None:
+        self._metadata.extend(metadata)
+
+        items = []
+        for file_data in metadata:
+            item = self._tree.insert(
                 "", "end", text=file_data["System:FileName"], open=False
             )
-            self._tree_items.append((parent, ""))
-            total_items += 1
+            rows = []
             for key, value in file_data.items():
-                group, *tag = key.split(":", maxsplit=1)
-                child = self._tree.insert(
-                    parent, "end", values=(group, tag, str(value).replace("\n", " | "))
-                )
-                self._tree_items.append((child, parent))
-                total_items += 1
-
-        self._tree.configure(height=total_items + 1)
+                group, _, tag = key.partition(":")
+                rows.append((group, tag, str(value).replace("\n", " | ")))
+            # the search thread looks up the files of the rows it finds
+            self._row_data.extend(rows)
+            self._row_files.extend([item] * len(rows))
+            self._rows[item] = self._index.add(rows)
+            items.append(item)
+
+        for item in items:
+            self._add_placeholder(item)
+        if self._matches is not None and items:
+            # hidden until the filter has been searched for them too
+            self._tree.detach(*items)
+        if self._pattern_var.get().strip():
+            self._schedule_filter()
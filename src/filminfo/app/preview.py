@@ -0,0 +1,442 @@
+import math
+import queue
+import tkinter as tk
+from collections import OrderedDict
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from PIL import Image, ImageTk
+
+from filminfo.models.image_pyramid import ImagePyramid, TileKey
+from filminfo.models.images import Quality, decode_thumbnail
+from filminfo.models.thumbnail_cache import ThumbnailCache
+
+
+# how often decoded tiles are collected, in ms
+_POLL_INTERVAL = 30
+
+_ZOOM_STEP = 1.25
+_MAX_ZOOM = 8.0  # display pixels per image pixel
+
+# previews decoded ahead on either side of the one shown
+_PREFETCH_DISTANCE = 2
+
+Navigator = Callable[[str, int], str | None]
+ThumbnailSource = Callable[[str], Image.Image | None]
+
+
+class PreviewWindow(tk.Toplevel):
+    """Zoomable view of an image.
+
+    Opens fitted into `size` x `size` with the gallery's thumbnail from
+    `thumbnail`, if it has one at hand, until the cached preview or one
+    decoded in the background arrives. Zooming in beyond that preview
+    shows tiles of an `ImagePyramid` at the resolution needed; only the
+    tiles in view are decoded, in the background, and until they arrive
+    the view is drawn scaled up from the preview. The pyramid keeps up to
+    `tile_cache` bytes of decoded tiles.
+
+    Wheel or +/- zooms, dragging pans, 0 fits the image, 1 shows it at
+    full size. With `navigate`, which gives the image some steps away from
+    another one, arrow keys go to the next or previous image. Previews of
+    the images around the one shown are decoded ahead in the background
+    and only those are kept.
+    """
+
+    def __init__(
+        self,
+        image_path: str,
+        size: int,
+        cache: ThumbnailCache | None = None,
+        quality: Quality = Quality.BALANCED,
+        on_close: Callable[[], None] | None = None,
+        navigate: Navigator | None = None,
+        thumbnail: ThumbnailSource | None = None,
+        tile_cache: int = 64 * 1024 * 1024,
+    ):
+        super().__init__()
+        self._image_path = image_path
+        self._size = size
+        self._cache = cache
+        self._quality = quality
+        self._on_close = on_close
+        self._navigate = navigate
+        self._thumbnail = thumbnail
+        self._tile_cache = tile_cache
+        self._pyramid: ImagePyramid | None = None
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._prefetcher = ThreadPoolExecutor(max_workers=1)
+        self._prefetching: dict[str, Future[Image.Image]] = {}
+        self._prefetched: OrderedDict[str, Image.Image] = OrderedDict()
+        self._decoded: queue.Queue[Future] = queue.Queue()
+        self._requested: dict[TileKey, Future[list[Image.Image]]] = {}
+        self._poll_job: str | None = None
+        self._render_job: str | None = None
+
+        self._base: Image.Image | None = None  # the preview, sharpened by tiles
+        self._interim = False  # whether the base is the thumbnail, not the preview
+        self._backdrop: ImageTk.PhotoImage | None = None
+        self._shown: dict[TileKey, tuple[ImageTk.PhotoImage, int]] = {}
+        self._shown_level = -1
+        self._shown_scale = 0.0
+        self._scale = 1.0  # display pixels per image pixel
+        self._origin = (0.0, 0.0)  # image point at the top left corner
+        self._fitted = True
+        self._drag_from = (0, 0)
+
+        self._canvas = tk.Canvas(
+            self, width=size, height=size, highlightthickness=0, background="black"
+        )
+        self._placeholder = self._canvas.create_text(
+            size / 2, size / 2, fill="white", anchor="center"
+        )
+
+        self._canvas.grid(sticky="nsew")
+        self.columnconfigure(0, weight=1)
+        self.rowconfigure(0, weight=1)
+        self.__configure()
+
+        self.show(image_path)
+        if self._pyramid:
+            # fit the window to the image
+            width, height = self._pyramid.size
+            fit = min(size / width, size / height)
+            self._canvas.configure(
+                width=max(1, round(width * fit)), height=max(1, round(height * fit))
+            )
+
+    def __configure(self) -> None:
+        canvas = self._canvas
+        canvas.bind("<Configure>", self._on_resize)
+        canvas.bind("<ButtonPress-1>", self._on_drag_start)
+        canvas.bind("<B1-Motion>", self._on_drag)
+        for button in ["<MouseWheel>", "<Button-4>", "<Button-5>"]:
+            canvas.bind(button, self._on_wheel)
+        self.bind("<plus>", lambda e: self._zoom_at_center(_ZOOM_STEP))
+        self.bind("<KP_Add>", lambda e: self._zoom_at_center(_ZOOM_STEP))
+        self.bind("<minus>", lambda e: self._zoom_at_center(1 / _ZOOM_STEP))
+        self.bind("<KP_Subtract>", lambda e: self._zoom_at_center(1 / _ZOOM_STEP))
+        self.bind("<Key-0>", lambda e: self._fit())
+        self.bind("<Key-1>", lambda e: self._zoom_at_center(1 / self._scale))
+        for key in ["<Right>", "<Down>", "<Next>", "<space>"]:
+            self.bind(key, lambda e: self._go(1))
+        for key in ["<Left>", "<Up>", "<Prior>", "<BackSpace>"]:
+            self.bind(key, lambda e: self._go(-1))
+        self.bind("<Escape>", lambda e: self.close())
+        self.bind("<Button-3>", lambda e: self.close())
+        self.protocol("WM_DELETE_WINDOW", self.close)
+
+    def _go(self, step: int) -> None:
+        if self._navigate and (path := self._navigate(self._image_path, step)):
+            self.show(path)
+
+    def _load_base(self) -> None:
+        path = self._image_path
+        if (image := self._prefetched.get(path)) is not None:
+            self._set_base(image)
+        elif self._thumbnail and (image := self._thumbnail(path)) is not None:
+            self._set_base(image, interim=True)
+        self._prefetch()
+
+    def _prefetch(self) -> None:
+        """Decode the previews around the one shown, forget all others."""
+        wanted = [self._image_path]
+        if self._navigate:
+            for distance in range(1, _PREFETCH_DISTANCE + 1):
+                for step in (distance, -distance):
+                    if path := self._navigate(self._image_path, step):
+                        wanted.append(path)
+
+        for path in [path for path in self._prefetching if path not in wanted]:
+            self._prefetching.pop(path).cancel()
+        for path in [path for path in self._prefetched if path not in wanted]:
+            del self._prefetched[path]
+
+        # the shown one goes first, the executor runs them in order
+        for path in wanted:
+            if path not in self._prefetched and path not in self._prefetching:
+                self._prefetching[path] = self._prefetcher.submit(
+                    _load_preview, path, self._size, self._cache, self._quality
+                )
+        if self._prefetching:
+            self._schedule_poll()
+
+    def _set_base(self, image: Image.Image, interim: bool = False) -> None:
+        if image.mode not in ("1", "L", "RGB", "RGBA"):
+            image = image.convert("RGB")
+        self._base = image
+        self._interim = interim
+        self._canvas.itemconfigure(self._placeholder, text="")
+        self._schedule_render()
+
+    # --- View ---
+    def _fit(self) -> None:
+        if self._pyramid is None:
+            return None
+
+        width, height = self._pyramid.size
+        canvas_width, canvas_height = self._canvas_size()
+        self._scale = min(canvas_width / width, canvas_height / height)
+        self._origin = (
+            (width - canvas_width / self._scale) / 2,
+            (height - canvas_height / self._scale) / 2,
+        )
+        self._fitted = True
+        self._schedule_render()
+
+    def _zoom(self, factor: float, x: float, y: float) -> None:
+        if self._pyramid is None:
+            return None
+
+        width, height = self._pyramid.size
+        canvas_width, canvas_height = self._canvas_size()
+        smallest = min(canvas_width / width, canvas_height / height, 1.0)
+        scale = min(max(self._scale * factor, smallest), _MAX_ZOOM)
+
+        # keep the image point under (x, y) in place
+        origin_x, origin_y = self._origin
+        point_x, point_y = origin_x + x / self._scale, origin_y + y / self._scale
+        self._origin = (point_x - x / scale, point_y - y / scale)
+        self._scale = scale
+        self._fitted = False
+        self._schedule_render()
+
+    def _zoom_at_center(self, factor: float) -> None:
+        canvas_width, canvas_height = self._canvas_size()
+        self._zoom(factor, canvas_width / 2, canvas_height / 2)
+
+    def _canvas_size(self) -> tuple[int, int]:
+        return (
+            max(1, self._canvas.winfo_width()),
+            max(1, self._canvas.winfo_height()),
+        )
+
+    def _schedule_render(self) -> None:
+        if self._render_job is None:
+            self._render_job = self.after_idle(self._render)
+
+    def _render(self) -> None:
+        self._render_job = None
+        if self._base is None or self._pyramid is None:
+            return None
+
+        canvas_width, canvas_height = self._canvas_size()
+        width, height = self._pyramid.size
+        scale = self._scale
+        origin_x, origin_y = self._origin
+
+        # part of the image in view
+        left, top = max(0.0, origin_x), max(0.0, origin_y)
+        right = min(float(width), origin_x + canvas_width / scale)
+        bottom = min(float(height), origin_y + canvas_height / scale)
+        if right <= left or bottom <= top:
+            self._canvas.delete("backdrop")
+            self._drop_tiles(set())
+            return None
+
+        self._draw_backdrop(left, top, right, bottom)
+        if scale * width > self._base.width:
+            self._draw_tiles(left, top, right, bottom)
+        else:
+            self._drop_tiles(set())
+
+    def _draw_backdrop(
+        self, left: float, top: float, right: float, bottom: float
+    ) -> None:
+        assert self._base is not None and self._pyramid is not None
+        base_scale = self._base.width / self._pyramid.size[0]
+        origin_x, origin_y = self._origin
+        size = (
+            max(1, round((right - left) * self._scale)),
+            max(1, round((bottom - top) * self._scale)),
+        )
+        box = (
+            left * base_scale,
+            top * base_scale,
+            right * base_scale,
+            bottom * base_scale,
+        )
+        self._backdrop = ImageTk.PhotoImage(
+            self._base.resize(size, Image.Resampling.BILINEAR, box=box)
+        )
+        self._canvas.delete("backdrop")
+        self._canvas.create_image(
+            (left - origin_x) * self._scale,
+            (top - origin_y) * self._scale,
+            image=self._backdrop,
+            anchor="nw",
+            tags="backdrop",
+        )
+        self._canvas.tag_lower("backdrop")
+
+    def _draw_tiles(self, left: float, top: float, right: float, bottom: float) -> None:
+        pyramid = self._pyramid
+        assert pyramid is not None
+        level = pyramid.level_for(self._scale)
+        step = pyramid.tile_size << level  # tile size in image pixels
+        if level != self._shown_level or self._scale != self._shown_scale:
+            self._drop_tiles(set())
+            self._shown_level, self._shown_scale = level, self._scale
+
+        columns, rows = pyramid.tile_grid(level)
+        wanted = {
+            (level, column, row)
+            for row in range(int(top // step), min(rows, math.ceil(bottom / step)))
+            for column in range(
+                int(left // step), min(columns, math.ceil(right / step))
+            )
+        }
+        self._drop_tiles(wanted)
+
+        origin_x, origin_y = self._origin
+        missing: list[TileKey] = []
+        for key in wanted:
+            _, column, row = key
+            x = (column * step - origin_x) * self._scale
+            y = (row * step - origin_y) * self._scale
+            if (shown := self._shown.get(key)) is not None:
+                self._canvas.coords(shown[1], x, y)
+            elif (tile := pyramid.cached_tile(*key)) is not None:
+                photo = ImageTk.PhotoImage(self._scaled_tile(tile, level))
+                item = self._canvas.create_image(
+                    x, y, image=photo, anchor="nw", tags="tile"
+                )
+                self._shown[key] = (photo, item)
+            elif key not in self._requested:
+                missing.append(key)
+
+        if missing:
+            # cut from a single decode, a level may be too big to be kept
+            future = self._executor.submit(
+                pyramid.tiles, level, [(column, row) for _, column, row in missing]
+            )
+            future.add_done_callback(self._decoded.put)
+            self._requested.update(dict.fromkeys(missing, future))
+            self._schedule_poll()
+
+        # decoding tiles no longer in view is pointless
+        still_wanted = {
+            self._requested[key] for key in wanted if key in self._requested
+        }
+        for key in [key for key in self._requested if key not in wanted]:
+            if (future := self._requested.pop(key)) not in still_wanted:
+                future.cancel()
+
+    def _scaled_tile(self, tile: Image.Image, level: int) -> Image.Image:
+        factor = self._scale * (1 << level)
+        if factor == 1:
+            return tile
+        size = (
+            max(1, round(tile.width * factor)),
+            max(1, round(tile.height * factor)),
+        )
+        resample = Image.Resampling.NEAREST if factor > 2 else Image.Resampling.BILINEAR
+        return tile.resize(size, resample)
+
+    def _drop_tiles(self, kept: set[TileKey]) -> None:
+        for key in [key for key in self._shown if key not in kept]:
+            _, item = self._shown.pop(key)
+            self._canvas.delete(item)
+
+    def _schedule_poll(self) -> None:
+        if self._poll_job is None:
+            self._poll_job = self.after(_POLL_INTERVAL, self._poll)
+
+    def _poll(self) -> None:
+        self._poll_job = None
+
+        arrived = False
+        while not self._decoded.empty():
+            future = self._decoded.get()
+            arrived = arrived or not future.cancelled() and not future.exception()
+
+        done = [key for key, future in self._requested.items() if future.done()]
+        for key in done:
+            del self._requested[key]
+
+        for path in [path for path, f in self._prefetching.items() if f.done()]:
+            future = self._prefetching.pop(path)
+            if future.exception():
+                if path == self._image_path:
+                    self._canvas.itemconfigure(self._placeholder, text="No preview")
+                continue
+            self._prefetched[path] = future.result()
+            if path == self._image_path and (self._base is None or self._interim):
+                self._set_base(future.result())
+
+        if arrived:
+            self._schedule_render()
+        if self._requested or self._prefetching:
+            self._schedule_poll()
+
+    # --- Events ---
+    def _on_resize(self, event: tk.Event) -> None:
+        self._canvas.coords(self._placeholder, event.width / 2, event.height / 2)
+        if self._fitted:
+            self._fit()
+        else:
+            self._schedule_render()
+
+    def _on_drag_start(self, event: tk.Event) -> None:
+        self._drag_from = (event.x, event.y)
+
+    def _on_drag(self, event: tk.Event) -> None:
+        dx, dy = event.x - self._drag_from[0], event.y - self._drag_from[1]
+        self._drag_from = (event.x, event.y)
+        origin_x, origin_y = self._origin
+        self._origin = (origin_x - dx / self._scale, origin_y - dy / self._scale)
+        self._fitted = False
+        self._canvas.move("backdrop", dx, dy)
+        self._canvas.move("tile", dx, dy)
+        self._schedule_render()
+
+    def _on_wheel(self, event: tk.Event) -> None:
+        zoom_in = event.num == 4 or event.delta > 0
+        self._zoom(_ZOOM_STEP if zoom_in else 1 / _ZOOM_STEP, event.x, event.y)
+
+    # --- Public methods ---
+    def show(self, image_path: str) -> None:
+        """Show another image, fitted into the window."""
+        for future in self._requested.values():
+            future.cancel()
+        self._requested.clear()
+        self._drop_tiles(set())
+        self._canvas.delete("backdrop")
+        if self._pyramid:
+            self._pyramid.clear()
+
+        self._image_path = image_path
+        self.title(image_path)
+        self._base = None
+        self._canvas.itemconfigure(self._placeholder, text="Loading...")
+        try:
+            self._pyramid = ImagePyramid(
+                image_path, max_bytes=self._tile_cache, quality=self._quality
+            )
+        except (OSError, ValueError):
+            self._pyramid = None
+            self._canvas.itemconfigure(self._placeholder, text="No preview")
+
+        self._fit()
+        self._load_base()
+        self.focus_set()
+
+    def close(self) -> None:
+        for job in (self._poll_job, self._render_job):
+            if job:
+                self.after_cancel(job)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._prefetcher.shutdown(wait=False, cancel_futures=True)
+        if self._pyramid:
+            self._pyramid.clear()
+        if self._on_close:
+            self._on_close()
+        self.destroy()
+
+
+def _load_preview(
+    path: str, size: int, cache: ThumbnailCache | None, quality: Quality
+) -> Image.Image:
+    if cache:
+        return cache.load(path, size, size, quality)
+    return decode_thumbnail(path, size, size, quality)
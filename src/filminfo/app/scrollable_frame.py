@@ -10,12 +10,19 @@ _CALLBACK = Callable[[tk.Event], None]
 
 
 class ScrollableFrame(ttk.Frame):
+    """Generates <<Scrolled>> whenever the visible part of the content moves.
+
+    Without `embed_container` the container is hidden, the content is drawn
+    onto the canvas directly then, see set_content_height().
+    """
+
     def __init__(
         self,
         parent: AnyWidget,
         *args,
         vertical: bool = True,
         horizontal: bool = True,
+        embed_container: bool = True,
         **kwargs,
     ):
         super().__init__(parent, *args, **kwargs)
@@ -24,8 +31,12 @@ class ScrollableFrame(ttk.Frame):
         self._h_scroll = ttk.Scrollbar(self, orient="horizontal")
         self._container = ttk.Frame(self._canvas, borderwidth=0)
         self._container_id = self._canvas.create_window(
-            (0, 0), window=self._container, anchor="nw"
+            (0, 0),
+            window=self._container,
+            anchor="nw",
+            state="normal" if embed_container else "hidden",
         )
+        self._embed_container = embed_container
         self._vertical_enabled = vertical
         self._horizontal_enabled = horizontal
         self._on_scroll = self._mouse_callback()
@@ -42,14 +53,15 @@ class ScrollableFrame(ttk.Frame):
 
     def __configure(self) -> None:
         self._canvas.configure(
-            yscrollcommand=self._v_scroll.set,
+            yscrollcommand=self._on_yscroll,
             xscrollcommand=self._h_scroll.set,
         )
         self._v_scroll.configure(command=self._canvas.yview)
         self._h_scroll.configure(command=self._canvas.xview)
 
-        self._container.bind("<Configure>", self._on_container_configure)
-        self._canvas.bind("<Configure>", self._on_canvas_configure)
+        if self._embed_container:
+            self._container.bind("<Configure>", self._on_container_configure)
+            self._canvas.bind("<Configure>", self._on_canvas_configure)
         self._canvas.bind("<Enter>", lambda e: self._bind_mousewheel())
         self._canvas.bind("<Leave>", lambda e: self._unbind_mousewheel())
 
@@ -61,6 +73,10 @@ class ScrollableFrame(ttk.Frame):
         for button in ["<MouseWheel>", "<Button-4>", "<Button-5>"]:
             self._canvas.unbind_all(button)
 
+    def _on_yscroll(self, first: float, last: float) -> None:
+        self._v_scroll.set(first, last)
+        self.event_generate("<<Scrolled>>")
+
     def _on_container_configure(self, event: tk.Event) -> None:
         self._canvas.configure(scrollregion=self._canvas.bbox(self._container_id))
         self._toggle_scrollbars()
@@ -88,8 +104,9 @@ class ScrollableFrame(ttk.Frame):
             self._h_scroll.grid_remove()
 
     def _content_dimensions(self) -> tuple[int, int]:
-        x0, y0, x1, y1 = self._canvas.bbox("all") or (0, 0, 0, 0)
-        return x1 - x0, y1 - y0
+        region = self._canvas.cget("scrollregion").split() or [0, 0, 0, 0]
+        x0, y0, x1, y1 = map(float, region)
+        return int(x1 - x0), int(y1 - y0)
 
     def _canvas_dimensions(self) -> tuple[int, int]:
         return self._canvas.winfo_width(), self._canvas.winfo_height()
@@ -154,6 +171,15 @@ class ScrollableFrame(ttk.Frame):
     def canvas(self) -> tk.Canvas:
         return self._canvas
 
+    def set_content_height(self, height: int) -> None:
+        """For content the canvas can't measure: placed or drawn directly."""
+        if self._embed_container:
+            self._container.configure(height=height)
+            return
+
+        self._canvas.configure(scrollregion=(0, 0, self._canvas.winfo_width(), height))
+        self._toggle_scrollbars()
+
     def scroll_to_top(self) -> None:
         self._canvas.yview_moveto(0)
 
@@ -0,0 +1,65 @@
+from collections.abc import Iterable, Iterator
+from itertools import compress
+
+
+_INVERT = bytes.maketrans(b"\x00\x01", b"\x01\x00")
+
+
+class Selection:
+    """Selected flags of the gallery images by position, with a running count.
+
+    One byte per image, so bulk changes are a single pass over a bytearray
+    and counting is free.
+    """
+
+    def __init__(self) -> None:
+        self._flags = bytearray()
+        self._count = 0
+
+    def __len__(self) -> int:
+        return len(self._flags)
+
+    def __getitem__(self, index: int) -> bool:
+        return bool(self._flags[index])
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    def extend(self, size: int) -> None:
+        self._flags.extend(bytes(size))
+
+    def reset(self, size: int) -> None:
+        self._flags = bytearray(size)
+        self._count = 0
+
+    def toggle(self, index: int) -> bool:
+        selected = not self._flags[index]
+        self._flags[index] = selected
+        self._count += 1 if selected else -1
+        return selected
+
+    def select_range(self, start: int, stop: int) -> None:
+        self._count += stop - start - self._flags.count(1, start, stop)
+        self._flags[start:stop] = b"\x01" * (stop - start)
+
+    def select_all(self) -> None:
+        self._flags = bytearray(b"\x01" * len(self._flags))
+        self._count = len(self._flags)
+
+    def clear(self) -> None:
+        self.reset(len(self._flags))
+
+    def invert(self) -> None:
+        self._flags = self._flags.translate(_INVERT)
+        self._count = len(self._flags) - self._count
+
+    def assign(self, flags: Iterable[bool]) -> None:
+        self._flags = bytearray(flags)
+        self._count = self._flags.count(1)
+
+    def selected[T](self, items: Iterable[T]) -> Iterator[T]:
+        return compress(items, self._flags)
+
+    def unselected[T](self, items: Iterable[T]) -> Iterator[T]:
+        return compress(items, self._flags.translate(_INVERT))
@@ -11,6 +11,9 @@ from filminfo.configuration import PADDING_SMALL, get_string_option
 
 ThumbnailCallback = Callable[["Thumbnail"], None]
 
+HIGHLIGHT_THICKNESS = 3
+LABEL_HEIGHT = 40  # kind of works on my macbook air
+
 
 class Thumbnail(tk.Frame):
     TAG = "Thumbnail"
@@ -20,22 +23,18 @@ class Thumbnail(tk.Frame):
         parent: AnyWidget,
         image_path: str,
         size: int,
-        preview_size: int,
         **kwargs,
     ):
         super().__init__(parent, width=size, height=size, **kwargs)
         self._image_path = image_path
         self._image_name = os.path.basename(image_path)
         self._size = size
-        self._highlightthickness = 3
+        self._highlightthickness = HIGHLIGHT_THICKNESS
         self._highlight_color = (
             get_string_option("thumbnail_highlight_color") or "SystemHighlight"
         )
-        self._label_height = 40  # kind of works on my macbook air
         self._padx = PADDING_SMALL
         self._pady = PADDING_SMALL
-        self._preview_size = preview_size
-        self._preview: ImageTk.PhotoImage | None = None
         self._selected = False
         self._click_job: str | None = None
 
@@ -44,15 +43,14 @@ class Thumbnail(tk.Frame):
         self.__configure()
 
     def _create_widgets(self) -> None:
-        width = self._size - 2 * self._padx - 2 * self._highlightthickness
-        photo = self._create_photo_image(width, width - self._label_height)
-        self._image_label = tk.Label(self, image=photo)
+        # placeholder until the decoded image arrives, see set_image()
+        self._image_label = tk.Label(self, text="...")
         self._default_highlight_color = self.cget("highlightbackground")
-        self._thumbnail: ImageTk.PhotoImage = photo
+        self._thumbnail: ImageTk.PhotoImage | None = None
         self._name_label = tk.Label(
             self,
-            text=self._process_label_text(),
-            wraplength=self._size - 2 * self._padx - 2 * self._highlightthickness,
+            text=thumbnail_label(self._image_path),
+            wraplength=self.image_size[0],
             anchor="center",
         )
 
@@ -69,24 +67,6 @@ class Thumbnail(tk.Frame):
         for widget in [self, self._image_label, self._name_label]:
             add_bindtag(widget, Thumbnail.TAG)
 
-    def _create_photo_image(self, width: int, height) -> ImageTk.PhotoImage:
-        image = Image.open(self._image_path)
-        if image.width > width or image.height > height:
-            size = height if image.width < image.height else width
-            image.thumbnail((size, size))
-
-        return ImageTk.PhotoImage(image)
-
-    def _process_label_text(self) -> str:
-        limit = 36  # seems to fit OK in self._label_height
-        name, ext = os.path.splitext(self._image_name)
-        if len(name) + len(ext) > limit:
-            limit -= len(ext) + 3  # for ...
-            left = name[: limit // 2]
-            right = name[-limit // 2 :]
-            return left + "..." + right + ext
-        return self._image_name
-
     def _select(self) -> None:
         self._selected = True
         self.configure(highlightbackground=self._highlight_color)
@@ -108,6 +88,36 @@ class Thumbnail(tk.Frame):
     def selected(self) -> bool:
         return self._selected
 
+    @property
+    def image_size(self) -> tuple[int, int]:
+        return thumbnail_image_size(self._size)
+
+    def rebind(self, image_path: str, label: str, selected: bool) -> None:
+        """Show another image in this tile, the gallery recycles them."""
+        self._image_path = image_path
+        self._image_name = os.path.basename(image_path)
+        self._thumbnail = None
+        self._image_label.configure(image="", text="...")
+        self._name_label.configure(text=label)
+        self.select() if selected else self.deselect()
+
+    def set_image(self, image: Image.Image | None) -> None:
+        if not self.winfo_exists():
+            return
+
+        if image is None:
+            self._image_label.configure(text="No preview")
+            return
+
+        self._thumbnail = ImageTk.PhotoImage(image)
+        self._image_label.configure(image=self._thumbnail, text="")
+
+    def drop_image(self) -> ImageTk.PhotoImage | None:
+        """Stop showing the image until it is set again, returns its photo."""
+        photo, self._thumbnail = self._thumbnail, None
+        self._image_label.configure(image="", text="...")
+        return photo
+
     def select(self) -> None:
         self._select()
 
@@ -117,23 +127,20 @@ class Thumbnail(tk.Frame):
     def toggle(self) -> None:
         self.deselect() if self.selected else self.select()
 
-    def show_preview(self) -> None:
-        if self._preview:
-            return
 
-        window = tk.Toplevel()
-        window.title(self._image_path)
-        photo = self._create_photo_image(self._preview_size, self._preview_size)
-        label = tk.Label(window, image=photo)
-        self._preview = photo
-        label.grid()
-        window.columnconfigure(0, weight=1)
-        window.rowconfigure(0, weight=1)
-
-        def on_preview_close():
-            self._preview = None
-            window.destroy()
-
-        window.bind("<Escape>", lambda e: on_preview_close())
-        window.bind("<Button-3>", lambda e: on_preview_close())
-        window.protocol("WM_DELETE_WINDOW", on_preview_close)
+def thumbnail_image_size(size: int) -> tuple[int, int]:
+    """Room for the image in a thumbnail of `size`, above its label."""
+    width = size - 2 * PADDING_SMALL - 2 * HIGHLIGHT_THICKNESS
+    return width, width - LABEL_HEIGHT
+
+
+def thumbnail_label(image_path: str) -> str:
+    image_name = os.path.basename(image_path)
+    limit = 36  # seems to fit OK in LABEL_HEIGHT
+    name, ext = os.path.splitext(image_name)
+    if len(name) + len(ext) > limit:
+        limit -= len(ext) + 3  # for ...
+        left = name[: limit // 2]
+        right = name[-limit // 2 :]
+        return left + "..." + right + ext
+    return image_name
@@ -0,0 +1,190 @@
+import os
+import queue
+import tkinter as tk
+from collections.abc import Callable, Collection, Iterator, Sequence
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from itertools import chain, islice
+
+from PIL import Image
+
+from filminfo.models.images import Quality, decode_preview, decode_thumbnail
+from filminfo.models.thumbnail_cache import ThumbnailCache
+
+
+LoadedCallback = Callable[[Image.Image | None], None]
+VisibleProvider = Callable[[], Collection[str]]
+PreviewProvider = Callable[[Sequence[str]], dict[str, list[bytes]]]
+
+# how often finished thumbnails are collected, in ms
+_POLL_INTERVAL = 20
+
+# images per embedded preview extraction
+_PREVIEW_BATCH = 100
+
+
+class ThumbnailLoader:
+    """Decodes thumbnails on a worker pool, hands them over on the Tk thread.
+
+    Only a few images per worker are in flight at once. Whenever a worker
+    frees up, images reported by `visible` go first, the rest in the order
+    they were requested. With `processes` the decoding itself runs in worker
+    processes, the cache is only used from this one.
+
+    With `previews`, embedded previews of not yet cached images are fetched
+    in batches first; an image is only decoded in full if none of its
+    previews is big enough.
+    """
+
+    def __init__(
+        self,
+        widget: tk.Misc,
+        visible: VisibleProvider,
+        workers: int = 0,
+        processes: bool = False,
+        cache: ThumbnailCache | None = None,
+        quality: Quality = Quality.BALANCED,
+        previews: PreviewProvider | None = None,
+    ):
+        if workers <= 0:
+            workers = os.cpu_count() or 1
+
+        self._widget = widget
+        self._visible = visible
+        self._workers = workers
+        self._cache = cache
+        self._quality = quality
+        self._executor = ThreadPoolExecutor(workers)
+        self._processes = ProcessPoolExecutor(workers) if processes else None
+        self._pending: dict[str, tuple[int, int, LoadedCallback]] = {}
+        self._running: dict[str, LoadedCallback] = {}
+        self._finished: queue.Queue[tuple[str, Future[Image.Image]]] = queue.Queue()
+        self._poll_job: str | None = None
+        self._preview_provider = previews
+        self._unfetched: dict[str, None] = {}  # ordered set
+        self._fetching: set[str] = set()
+        self._fetch: Future[None] | None = None
+        self._previews: dict[str, list[bytes]] = {}
+
+    def request(
+        self, path: str, width: int, height: int, on_loaded: LoadedCallback
+    ) -> None:
+        self._pending[path] = (width, height, on_loaded)
+        if self._preview_provider:
+            self._unfetched[path] = None
+        self._schedule()
+
+    def cancel(self, path: str) -> None:
+        self._pending.pop(path, None)
+        self._running.pop(path, None)
+        self._unfetched.pop(path, None)
+        self._previews.pop(path, None)
+
+    def close(self) -> None:
+        if self._poll_job:
+            self._widget.after_cancel(self._poll_job)
+            self._poll_job = None
+        self._pending.clear()
+        self._running.clear()
+        self._unfetched.clear()
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        if self._processes:
+            self._processes.shutdown(wait=True, cancel_futures=True)
+
+    def _schedule(self) -> None:
+        if self._poll_job is None:
+            self._poll_job = self._widget.after(_POLL_INTERVAL, self._poll)
+
+    def _poll(self) -> None:
+        self._poll_job = None
+
+        while not self._finished.empty():
+            path, future = self._finished.get()
+            if (on_loaded := self._running.pop(path, None)) is None:
+                continue  # cancelled meanwhile
+            on_loaded(None if future.exception() else future.result())
+
+        if self._fetch and self._fetch.done():
+            self._fetch = None
+            self._fetching.clear()
+
+        self._submit()
+        if self._pending or self._running:
+            self._schedule()
+
+    def _submit(self) -> None:
+        if self._unfetched and self._fetch is None:
+            self._fetch_previews()
+
+        free = 2 * self._workers - len(self._running)
+        if free <= 0 or not self._pending:
+            return
+
+        # images waiting for their previews are held back
+        queued = (
+            path
+            for path in self._by_priority(self._pending)
+            if path not in self._unfetched and path not in self._fetching
+        )
+        for path in list(islice(queued, free)):
+            width, height, on_loaded = self._pending.pop(path)
+            self._running[path] = on_loaded
+            future = self._executor.submit(self._load, path, width, height)
+            future.add_done_callback(partial(self._on_finished, path))
+
+    def _fetch_previews(self) -> None:
+        paths = list(islice(self._by_priority(self._unfetched), _PREVIEW_BATCH))
+        sizes = {}
+        for path in paths:
+            del self._unfetched[path]
+            if path in self._pending:
+                sizes[path] = self._pending[path][:2]
+
+        self._fetching.update(sizes)
+        self._fetch = self._executor.submit(self._extract_previews, sizes)
+
+    def _extract_previews(self, sizes: dict[str, tuple[int, int]]) -> None:
+        assert self._preview_provider is not None
+        paths = [
+            path
+            for path, (width, height) in sizes.items()
+            if not (
+                self._cache and self._cache.contains(path, width, height, self._quality)
+            )
+        ]
+        if paths:
+            self._previews.update(self._preview_provider(paths))
+
+    def _by_priority(self, paths: Collection[str]) -> Iterator[str]:
+        visible = [path for path in self._visible() if path in paths]
+        shown = set(visible)
+        return chain(visible, (path for path in paths if path not in shown))
+
+    def _load(self, path: str, width: int, height: int) -> Image.Image:
+        quality = self._quality
+        if self._cache:
+            if (cached := self._cache.get(path, width, height, quality)) is not None:
+                return cached
+
+        image = None
+        if previews := self._previews.pop(path, None):
+            image = decode_preview(path, previews, width, height, quality)
+        if image is None:
+            image = self._decode(path, width, height)
+
+        if self._cache:
+            self._cache.put(path, width, height, image, quality)
+        return image
+
+    def _decode(self, path: str, width: int, height: int) -> Image.Image:
+        if self._processes:
+            decoding = self._processes.submit(
+                decode_thumbnail, path, width, height, self._quality
+            )
+            return decoding.result()
+
+        return decode_thumbnail(path, width, height, self._quality)
+
+    def _on_finished(self, path: str, future: Future[Image.Image]) -> None:
+        # called from a worker thread, Tk is only touched in _poll()
+        self._finished.put((path, future))
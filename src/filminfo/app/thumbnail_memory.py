@@ -0,0 +1,121 @@
+from collections import OrderedDict
+from collections.abc import Mapping
+from io import BytesIO
+
+from PIL import Image
+
+
+# Tk keeps photo images at 32 bits per pixel, whatever their mode
+_PHOTO_PIXEL_BYTES = 4
+
+
+class ThumbnailMemory:
+    """Pixel memory of the gallery's thumbnails, against a budget.
+
+    Counts the photo images shown by tiles and the decoded images kept
+    for rebinding tiles, with the gallery positions of their records. Images
+    whose photo was dropped can be stashed as
+    compressed bytes, for when there is no thumbnail cache to reload them
+    from. A budget of 0 is unlimited.
+    """
+
+    def __init__(self, max_bytes: int = 0):
+        self._max_bytes = max_bytes
+        self._shown: dict[str, int] = {}
+        self._shown_bytes = 0
+        self._kept: OrderedDict[str, Image.Image] = OrderedDict()
+        self._kept_bytes = 0
+        self._positions: dict[str, int] = {}  # of the kept images
+        self._stashed: dict[str, bytes] = {}
+
+    @property
+    def max_bytes(self) -> int:
+        return self._max_bytes
+
+    @property
+    def used(self) -> int:
+        return self._shown_bytes + self._kept_bytes
+
+    @property
+    def over(self) -> bool:
+        return bool(self._max_bytes) and self.used > self._max_bytes
+
+    def fits(self, image: Image.Image) -> bool:
+        if not self._max_bytes:
+            return True
+        return self.used + _photo_bytes(image) <= self._max_bytes
+
+    # --- Shown ---
+    def show(self, path: str, image: Image.Image) -> None:
+        self.hide(path)
+        self._shown[path] = _photo_bytes(image)
+        self._shown_bytes += self._shown[path]
+
+    def hide(self, path: str) -> None:
+        self._shown_bytes -= self._shown.pop(path, 0)
+
+    def is_shown(self, path: str) -> bool:
+        return path in self._shown
+
+    # --- Kept ---
+    def keep(self, path: str, image: Image.Image, limit: int, position: int) -> None:
+        """Keep the image of the record at `position`, at most `limit` images."""
+        if path in self._kept:
+            self._drop(path)
+        self._kept[path] = image
+        self._kept_bytes += _image_bytes(image)
+        self._positions[path] = position
+        while len(self._kept) > limit:
+            self._drop(next(iter(self._kept)))
+
+    def kept(self, path: str) -> Image.Image | None:
+        if (image := self._kept.get(path)) is not None:
+            self._kept.move_to_end(path)
+        return image
+
+    def trim(self, middle: int) -> None:
+        """Drop the kept images farthest from `middle` while over budget."""
+        if not self.over:
+            return None
+
+        far = sorted(self._kept, key=lambda path: abs(self._positions[path] - middle))
+        while self.over and far:
+            self._drop(far.pop())
+
+    def reposition(self, positions: Mapping[str, int]) -> None:
+        """Take the positions of the kept images' records after they moved."""
+        self._positions = {path: positions[path] for path in self._kept}
+
+    # --- Stashed ---
+    def stash(self, path: str, image: Image.Image) -> None:
+        buffer = BytesIO()
+        if image.mode in ("RGB", "L"):
+            image.save(buffer, format="JPEG", quality=90)
+        else:
+            image.save(buffer, format="PNG", compress_level=1)
+        self._stashed[path] = buffer.getvalue()
+
+    def unstash(self, path: str) -> Image.Image | None:
+        if (data := self._stashed.pop(path, None)) is None:
+            return None
+        image = Image.open(BytesIO(data))
+        image.load()
+        return image
+
+    def forget(self, path: str) -> None:
+        self.hide(path)
+        if path in self._kept:
+            self._drop(path)
+        self._stashed.pop(path, None)
+
+    def _drop(self, path: str) -> None:
+        self._kept_bytes -= _image_bytes(self._kept.pop(path))
+        del self._positions[path]
+
+
+def _photo_bytes(image: Image.Image) -> int:
+    return image.width * image.height * _PHOTO_PIXEL_BYTES
+
+
+def _image_bytes(image: Image.Image) -> int:
+    return image.width * image.height * len(image.getbands())
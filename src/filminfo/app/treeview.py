@@ -1,12 +1,32 @@
 import tkinter as tk
+from collections.abc import Callable
 from tkinter import ttk
 
 from filminfo.app.types import AnyWidget
 
 
+ItemCallback = Callable[[str], None]
+
+
 class CustomTreeview(ttk.Treeview):
-    def __init__(self, parent: AnyWidget, *args, **kwargs):
+    """Treeview with recursive expanding and collapsing.
+
+    `on_open` and `on_close` are called with an item before it is opened
+    or closed, whether by the user or by expand_all() and collapse_all(),
+    e.g. to fill in its children only when they are shown.
+    """
+
+    def __init__(
+        self,
+        parent: AnyWidget,
+        *args,
+        on_open: ItemCallback | None = None,
+        on_close: ItemCallback | None = None,
+        **kwargs,
+    ):
         super().__init__(parent, *args, **kwargs)
+        self._on_open = on_open
+        self._on_close = on_close
 
         def _on_shift_click(event: tk.Event) -> str | None:
             region = self.identify("element", event.x, event.y)
@@ -27,15 +47,23 @@ class CustomTreeview(ttk.Treeview):
             return None
 
         self.bind("<Button-1>", _on_shift_click, add="+")
+        if on_open:
+            self.bind("<<TreeviewOpen>>", lambda e: on_open(self.focus()))
+        if on_close:
+            self.bind("<<TreeviewClose>>", lambda e: on_close(self.focus()))
 
     def expand_all(self, item: str | int | None = None) -> None:
         if item:
+            if self._on_open:
+                self._on_open(str(item))
             self.item(item, open=True)
         for child in self.get_children(item):
             self.expand_all(child)
 
     def collapse_all(self, item: str | int | None = None) -> None:
         if item:
+            if self._on_close:
+                self._on_close(str(item))
             self.item(item, open=False)
         for child in self.get_children(item):
             self.collapse_all(child)
@@ -13,6 +13,9 @@ __ALL__ = [
     "APP_NAME",
     "CONFIG_NAME",
     "DB_NAME",
+    "METADATA_CACHE_NAME",
+    "BACKUP_DIR_NAME",
+    "THUMBNAIL_CACHE_DIR_NAME",
     "DEFAULT_WIN_SIZE",
     "MIN_WIN_SIZE",
     "PADDING_SMALL",
@@ -21,17 +24,24 @@ __ALL__ = [
     "get_app_dir",
     "get_config_file",
     "get_database_file",
+    "get_metadata_cache_file",
+    "get_backup_dir",
+    "get_thumbnail_cache_dir",
     "ensure_database",
     "load_config",
     "get_int_option",
     "get_string_option",
     "get_float_option",
+    "get_bool_option",
     "get_exiftool",
 ]
 
 APP_NAME = "filminfo"
 CONFIG_NAME = "config.json"
 DB_NAME = "database.json"
+METADATA_CACHE_NAME = "metadata_cache.sqlite"
+BACKUP_DIR_NAME = "backups"
+THUMBNAIL_CACHE_DIR_NAME = "thumbnail_cache"
 
 DEFAULT_WIN_SIZE = (1200, 800)
 MIN_WIN_SIZE = (1050, 700)
@@ -40,7 +50,7 @@ PADDING_SMALL = 2
 PADDING_MEDIUM = 5
 PADDING_BIG = 10
 
-ConfigOption = str | int | float | None
+ConfigOption = str | int | float | bool | None
 _config_options_provider: Callable[[str], ConfigOption] | None = None
 
 
@@ -48,9 +58,28 @@ _DEFAULT_CONFIG: dict[str, ConfigOption] = {
     "author": None,
     "country": None,
     "exiftool": "exiftool",
+    "exiftool_workers": 0,
+    "exiftool_chunk_size": 500,
+    "metadata_cache_mb": 64,
+    "metadata_token_index": False,
+    "write_changes_only": False,
+    "sidecar_mode": "off",
+    "backup_policy": "default",
+    "backup_dir": None,
     "thumbnail_size": 150,
+    "virtual_gallery": True,
+    "gallery_renderer": "widgets",
+    "thumbnail_workers": 0,
+    "thumbnail_processes": False,
+    "thumbnail_quality": "balanced",
+    "embedded_previews": True,
+    "thumbnail_cache_mb": 256,
+    "thumbnail_memory_mb": 256,
+    "watch_settle_time": 2.0,
+    "watch_polling": False,
     "thumbnail_highlight_color": "#2b90fd",
     "preview_size": 900,
+    "preview_tile_cache_mb": 64,
     "error_text_color": "#e63946",
     "tree_highlight_color": "#2b90fd",
     "theme": None,
@@ -79,6 +108,24 @@ def get_database_file() -> Path:
     return file_path.expanduser().resolve()
 
 
+def get_metadata_cache_file() -> Path:
+    file_path = get_app_dir() / METADATA_CACHE_NAME
+    return file_path.expanduser().resolve()
+
+
+def get_backup_dir() -> Path:
+    if configured := get_string_option("backup_dir"):
+        return Path(configured).expanduser().resolve()
+
+    dir_path = get_app_dir() / BACKUP_DIR_NAME
+    return dir_path.expanduser().resolve()
+
+
+def get_thumbnail_cache_dir() -> Path:
+    dir_path = get_app_dir() / THUMBNAIL_CACHE_DIR_NAME
+    return dir_path.expanduser().resolve()
+
+
 def _create_empty_database(database_path: Path) -> None:
     database_path.parent.mkdir(parents=True, exist_ok=True)
 
@@ -164,6 +211,14 @@ def get_float_option(option: str) -> float:
     return float(value)
 
 
+def get_bool_option(option: str) -> bool:
+    value = _get_config(option)
+    if value is None:
+        value = _DEFAULT_CONFIG[option]
+
+    return bool(value)
+
+
 def get_exiftool() -> Path:
     path = Path(get_string_option("exiftool")).expanduser()
 
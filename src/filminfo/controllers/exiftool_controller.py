@@ -1,30 +1,110 @@
-from collections.abc import Sequence
+from collections.abc import Iterator, Sequence
 from pathlib import Path
 
-from filminfo.models.exiftool import ExifTool, ExifToolReply
+from filminfo.models.exiftool import (
+    BackupPolicy,
+    ExifTool,
+    ExifToolReply,
+    MetadataReply,
+    PreviewReply,
+    SidecarMode,
+    failed_images,
+)
+from filminfo.models.exiftool_session import Batch, ExifToolPool, FileResult
+from filminfo.models.metadata_cache import CacheStats, MetadataCache
 
 
 class ExifToolController:
-    def __init__(self, exiftool: Path) -> None:
-        self._exiftool = ExifTool(exiftool)
+    def __init__(
+        self,
+        exiftool: Path,
+        workers: int = 0,
+        chunk_size: int = 500,
+        metadata_cache: Path | None = None,
+        metadata_cache_size: int = 0,
+        changes_only: bool = False,
+        sidecar_mode: SidecarMode = SidecarMode.OFF,
+        backup_policy: BackupPolicy = BackupPolicy.DEFAULT,
+        backup_dir: Path | None = None,
+    ) -> None:
+        self._pool = ExifToolPool(exiftool, workers)
+        # previews for thumbnails are read while long writes keep the pool busy
+        self._preview_pool = ExifToolPool(exiftool, workers=1)
+        self._cache = (
+            MetadataCache(metadata_cache, metadata_cache_size)
+            if metadata_cache and metadata_cache_size > 0
+            else None
+        )
+        self._exiftool = ExifTool(
+            self._pool,
+            chunk_size,
+            self._cache,
+            changes_only,
+            sidecar_mode,
+            backup_policy,
+            backup_dir,
+            self._preview_pool,
+        )
 
     def add_metadata(
-        self, images: Sequence[str], metadata: dict[str, str]
+        self,
+        images: Sequence[str],
+        metadata: dict[str, str],
+        batch: Batch | None = None,
     ) -> ExifToolReply:
-        return self._exiftool.add_metadata(images, metadata)
+        return self._exiftool.add_metadata(images, metadata, batch)
 
     def remove_metadata(
-        self, images: Sequence[str], tags: Sequence[str]
+        self,
+        images: Sequence[str],
+        tags: Sequence[str],
+        batch: Batch | None = None,
     ) -> ExifToolReply:
-        return self._exiftool.remove_metadata(images, tags)
+        return self._exiftool.remove_metadata(images, tags, batch)
 
     def get_metadata(self, images: Sequence[str]) -> ExifToolReply:
         return self._exiftool.get_metadata(images)
 
+    def stream_metadata(
+        self, images: Sequence[str], batch: Batch | None = None
+    ) -> Iterator[MetadataReply]:
+        return self._exiftool.stream_metadata(images, batch=batch)
+
+    def get_previews(self, images: Sequence[str]) -> PreviewReply:
+        return self._exiftool.get_previews(images)
+
     def export_metadata(
-        self, images: Sequence[str], output_file: Path
+        self,
+        images: Sequence[str],
+        output_file: Path,
+        batch: Batch | None = None,
     ) -> ExifToolReply:
-        return self._exiftool.export_metadata(images, output_file)
+        return self._exiftool.export_metadata(images, output_file, batch)
+
+    def import_metadata(
+        self,
+        images: Sequence[str],
+        input_file: Path,
+        batch: Batch | None = None,
+    ) -> ExifToolReply:
+        return self._exiftool.import_metadata(images, input_file, batch)
+
+    def clean_backups(
+        self, images: Sequence[str], archive: bool, batch: Batch | None = None
+    ) -> ExifToolReply:
+        return self._exiftool.clean_backups(images, archive, batch)
+
+    def file_results(self, batch: Batch) -> list[FileResult]:
+        return batch.results
+
+    def failed_images(self, images: Sequence[str], batch: Batch) -> list[str]:
+        return failed_images(images, batch.results)
+
+    def metadata_cache_stats(self) -> CacheStats | None:
+        return self._exiftool.cache_stats
 
-    def import_metadata(self, images: Sequence[str], input_file: Path) -> ExifToolReply:
-        return self._exiftool.import_metadata(images, input_file)
+    def close(self) -> None:
+        self._pool.close()
+        self._preview_pool.close()
+        if self._cache:
+            self._cache.close()
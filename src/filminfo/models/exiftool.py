@@ -1,10 +1,15 @@
+import base64
+import heapq
 import json
 import os
-import subprocess
+import re
+import shutil
 import tempfile
-from collections.abc import Callable, Sequence
-from dataclasses import dataclass
+from collections.abc import Callable, Iterator, Sequence
+from dataclasses import dataclass, field
+from enum import Enum
 from pathlib import Path
+from typing import Any
 
 from filminfo.models.convertes import (
     exif_date_time_to_iptc,
@@ -13,6 +18,20 @@ from filminfo.models.convertes import (
     to_ascii,
 )
 from filminfo.models.entities import COUNTRIES, FLASH_VALUES
+from filminfo.models.exiftool_session import (
+    ArgumentBlock,
+    Batch,
+    ExifToolPool,
+    FileResult,
+    FileStatus,
+    SessionResult,
+)
+from filminfo.models.metadata_cache import (
+    CacheStats,
+    FileIdentity,
+    Metadata,
+    MetadataCache,
+)
 from filminfo.models.validators import (
     aperture_valid,
     date_taken_valid,
@@ -26,6 +45,23 @@ from filminfo.models.validators import (
 
 
 ExifToolReply = tuple[Exception | None, str]
+MetadataReply = tuple[Exception | None, list[Metadata]]
+PreviewReply = tuple[Exception | None, dict[str, list[bytes]]]
+
+# smallest first, see get_previews()
+_PREVIEW_TAGS = ["ThumbnailImage", "PreviewImage"]
+_GET_PREVIEWS_ARGUMENTS = ["-json", "-b", "-q", *(f"-{tag}" for tag in _PREVIEW_TAGS)]
+_BINARY_PREFIX = "base64:"
+
+_GET_METADATA_ARGUMENTS = [
+    "-G1",
+    "-json",
+    "-api",
+    "structformat=jsonq",
+    "-a",
+    "-s",
+    "-q",
+]
 
 
 @dataclass
@@ -34,29 +70,148 @@ class RunResult:
     stdout: str
     stderr: str
     info: str
+    files: list[FileResult] = field(default_factory=list)
+
+
+class SidecarMode(Enum):
+    OFF = "off"  # everything is written to the images
+    XMP = "xmp"  # XMP tags go to <image>.xmp, other tags are skipped
+    XMP_AND_FILE = "xmp+file"  # XMP tags to <image>.xmp, other tags to the image
+
+
+class BackupPolicy(Enum):
+    DEFAULT = "default"  # ExifTool keeps <file>_original next to the file
+    NONE = "none"  # -overwrite_original
+    IN_PLACE = "in_place"  # -overwrite_original_in_place, keeps file identity
+    DIRECTORY = "directory"  # <file>_original is moved into the backup directory
+
+
+_BACKUP_ARGUMENTS = {
+    BackupPolicy.DEFAULT: [],
+    BackupPolicy.NONE: ["-overwrite_original"],
+    BackupPolicy.IN_PLACE: ["-overwrite_original_in_place"],
+    BackupPolicy.DIRECTORY: [],
+}
+
+_BACKUP_SUFFIX = "_original"
+
+
+# Written along with the tags, but never a reason to rewrite a file.
+_WRITE_SETTINGS = ["-iptc:CodedCharacterSet=UTF8"]
+
+
+@dataclass(frozen=True)
+class _Assignment:
+    """A simple `-GROUP:Tag=value` argument which can be compared to a file."""
+
+    argument: str
+    tag: str
+    value: str
+
+    @classmethod
+    def parse(cls, argument: str) -> "_Assignment | None":
+        match = re.fullmatch(r"-((?:[\w-]+:)?[\w-]*\w)#?=(.*)", argument, re.DOTALL)
+        if not match:
+            return None
+
+        tag, value = match.groups()
+        return cls(argument, tag, value)
+
+    def satisfied_by(self, metadata: Metadata) -> bool:
+        group, _, name = self.tag.rpartition(":")
+        values = [
+            value for key, value in metadata.items() if _key_matches(key, group, name)
+        ]
+        if not values:
+            return self.value == ""
+
+        expected = self.value
+        if name in ("GPSLatitude", "GPSLongitude"):
+            # the sign is stored in the reference tag
+            expected = expected.removeprefix("-")
+
+        return any(_values_equal(expected, value) for value in values)
+
+
+def _key_matches(key: str, group: str, name: str) -> bool:
+    *groups, key_name = key.split(":")
+    if key_name.removesuffix("#").lower() != name.lower():
+        return False
+
+    return not group or group.lower() in (g.lower() for g in groups)
+
+
+def _values_equal(expected: str, actual: Any) -> bool:
+    """Whether the file holds exactly the value, as converted or raw.
+
+    Anything less certain, e.g. a rounded number, a date in another format
+    or a list of several items, counts as different and is written.
+    """
+    if isinstance(actual, list):
+        if len(actual) != 1:
+            return False
+        (actual,) = actual
+    if isinstance(actual, bool) or not isinstance(actual, (str, int, float)):
+        return False
+
+    return expected == str(actual)
+
+
+ResponseParser = Callable[[SessionResult], RunResult]
+ResultsMerger = Callable[[Sequence[RunResult]], RunResult]
 
 
 class ExifTool:
-    def __init__(self, exiftool_binary: Path):
-        self._binary = str(exiftool_binary)
+    def __init__(
+        self,
+        pool: ExifToolPool,
+        chunk_size: int = 500,
+        cache: MetadataCache | None = None,
+        changes_only: bool = False,
+        sidecar_mode: SidecarMode = SidecarMode.OFF,
+        backup_policy: BackupPolicy = BackupPolicy.DEFAULT,
+        backup_dir: Path | None = None,
+        preview_pool: ExifToolPool | None = None,
+    ):
+        if backup_policy is BackupPolicy.DIRECTORY and backup_dir is None:
+            raise ValueError("Backup directory required by the backup policy")
+
+        self._pool = pool
+        self._chunk_size = chunk_size
+        self._cache = cache
+        self._changes_only = changes_only
+        self._sidecar_mode = sidecar_mode
+        self._backup_policy = backup_policy
+        self._backup_dir = backup_dir
+        self._preview_pool = preview_pool
 
     def add_metadata(
-        self, images: Sequence[str], metadata: dict[str, str]
+        self,
+        images: Sequence[str],
+        metadata: dict[str, str],
+        batch: Batch | None = None,
     ) -> ExifToolReply:
         try:
-            result = self._add_metadata(images, metadata)
+            result = self._add_metadata(images, metadata, batch)
             return None, result
         except Exception as err:
             return err, "Metadata writing not successful"
+        finally:
+            self._invalidate_cache(images)
 
     def remove_metadata(
-        self, images: Sequence[str], tags: Sequence[str]
+        self,
+        images: Sequence[str],
+        tags: Sequence[str],
+        batch: Batch | None = None,
     ) -> ExifToolReply:
         try:
-            result = self._remove_metadata(images, tags)
+            result = self._remove_metadata(images, tags, batch)
             return None, result
         except Exception as err:
             return err, "Metadata removal not successful"
+        finally:
+            self._invalidate_cache(images)
 
     def get_metadata(self, images: Sequence[str]) -> ExifToolReply:
         try:
@@ -65,11 +220,28 @@ class ExifTool:
         except Exception as err:
             return err, "Metadata retrieval not successful"
 
+    def stream_metadata(
+        self, images: Sequence[str], chunk_size: int = 25, batch: Batch | None = None
+    ) -> Iterator[MetadataReply]:
+        """Metadata of the images in their order, chunk by chunk.
+
+        Files ExifTool returns no record for are left out and recorded in
+        the batch as failed.
+        """
+        try:
+            for metadata in self._stream_metadata(images, chunk_size, batch):
+                yield None, metadata
+        except Exception as err:
+            yield err, []
+
     def export_metadata(
-        self, images: Sequence[str], output_file: Path
+        self,
+        images: Sequence[str],
+        output_file: Path,
+        batch: Batch | None = None,
     ) -> ExifToolReply:
         try:
-            result = self._export_metadata(images)
+            result = self._export_metadata(images, batch)
             metadata = json.loads(result.stdout)
             for obj in metadata:
                 source_file = Path(obj["SourceFile"])
@@ -82,17 +254,68 @@ class ExifTool:
         except Exception as err:
             return err, "Metadata export not successful"
 
-    def import_metadata(self, images: Sequence[str], input_file: Path) -> ExifToolReply:
+    def import_metadata(
+        self,
+        images: Sequence[str],
+        input_file: Path,
+        batch: Batch | None = None,
+    ) -> ExifToolReply:
         try:
-            result = self._import_metadata(images, input_file)
+            result = self._import_metadata(images, input_file, batch)
             return None, result
         except Exception as err:
             return err, "Metadata import not successful"
+        finally:
+            self._invalidate_cache(images)
+
+    def clean_backups(
+        self, images: Sequence[str], archive: bool, batch: Batch | None = None
+    ) -> ExifToolReply:
+        try:
+            result = self._clean_backups(images, archive, batch)
+            return None, result
+        except Exception as err:
+            return err, "Backup cleanup not successful"
 
-    def _add_metadata(self, images: Sequence[str], medatada: dict[str, str]) -> str:
+    def get_previews(self, images: Sequence[str]) -> PreviewReply:
+        """Embedded preview images of the files, smallest first.
+
+        One ExifTool command per worker for all of the images, on the preview
+        pool if there is one, so that they don't wait behind long writes.
+        Files without any preview are left out.
+        """
+        try:
+            return None, self._read_previews(images)
+        except Exception as err:
+            return err, {}
+
+    @property
+    def cache_stats(self) -> CacheStats | None:
+        return self._cache.stats if self._cache else None
+
+    def _add_metadata(
+        self, images: Sequence[str], medatada: dict[str, str], batch: Batch | None
+    ) -> str:
         if not images:
             raise ValueError("No files provided for metadata writing.")
 
+        args = self._get_add_arguments(medatada)
+        if self._sidecar_mode is SidecarMode.OFF:
+            return self._write_tags(images, args, batch)
+
+        xmp_args = [arg for arg in args if _is_xmp_argument(arg)]
+        file_args = [arg for arg in args if not _is_xmp_argument(arg)]
+        summaries = []
+
+        if xmp_args:
+            sidecars = self._ensure_sidecars(images, batch)
+            summaries.append(self._write_tags(sidecars, xmp_args, batch))
+        if any(arg not in _WRITE_SETTINGS for arg in file_args):
+            summaries.append(self._write_in_file(images, file_args, batch))
+
+        return _merge_summaries(summaries)
+
+    def _get_add_arguments(self, medatada: dict[str, str]) -> list[str]:
         film_make = medatada.get("film_make")
         film_name = medatada.get("film_name")
         film_iso = medatada.get("film_iso")
@@ -157,10 +380,7 @@ class ExifTool:
         ):
             raise ValueError("No metadata to write.")
 
-        args = [
-            self._binary,
-            "-iptc:CodedCharacterSet=UTF8",
-        ]
+        args = list(_WRITE_SETTINGS)
 
         # https://exiftool.org/TagNames/MWG.html
         if origin_author:
@@ -311,47 +531,317 @@ class ExifTool:
             for tag in tags:
                 args.append(tag)
 
-        args.extend(images)
+        return args
+
+    def _write_tags(
+        self, images: Sequence[str], arguments: Sequence[str], batch: Batch | None
+    ) -> str:
+        if self._changes_only:
+            return self._write_changes(images, arguments, batch)
+
+        return self._run_write(arguments, images, batch).info
+
+    def _write_in_file(
+        self, images: Sequence[str], arguments: Sequence[str], batch: Batch | None
+    ) -> str:
+        """Write tags which cannot go to a sidecar, if the sidecar mode allows it."""
+        if self._sidecar_mode is SidecarMode.XMP:
+            skipped = [arg for arg in arguments if arg not in _WRITE_SETTINGS]
+            return f"{len(skipped)} non-XMP tags skipped in sidecar mode"
+
+        return self._write_tags(images, arguments, batch)
+
+    def _ensure_sidecars(
+        self, images: Sequence[str], batch: Batch | None = None
+    ) -> list[str]:
+        missing = [image for image in images if not os.path.exists(sidecar_path(image))]
+        if missing:
+            self._run_sharded(
+                ["-o", "%d%f.%e.xmp"], missing, _parse_result_standard, batch=batch
+            )
+
+        return [sidecar_path(image) for image in images]
+
+    def _existing_sidecars(self, images: Sequence[str]) -> list[str]:
+        return [path for image in images if os.path.exists(path := sidecar_path(image))]
+
+    def _write_changes(
+        self, images: Sequence[str], arguments: Sequence[str], batch: Batch | None
+    ) -> str:
+        """Write only the tags whose values differ, skip up-to-date files."""
+        settings: list[str] = []
+        assignments: list[_Assignment] = []
+        opaque: list[str] = []
+
+        for argument in arguments:
+            if argument in _WRITE_SETTINGS:
+                settings.append(argument)
+            elif assignment := _Assignment.parse(argument):
+                assignments.append(assignment)
+            else:
+                opaque.append(argument)
+
+        current = self._read_tags(images, assignments, batch)
+        changes: dict[tuple[str, ...], list[str]] = {}
+        skipped = 0
+
+        for image in images:
+            values = current.get(image)
+            delta = tuple(
+                assignment.argument
+                for assignment in assignments
+                if values is None or not assignment.satisfied_by(values)
+            )
+            # Arguments we cannot compare (e.g. `+=`) always cause a write.
+            if delta or opaque:
+                changes.setdefault(delta, []).append(image)
+            else:
+                skipped += 1
+
+        summaries = [
+            self._run_write([*settings, *delta, *opaque], group, batch).info
+            for delta, group in changes.items()
+        ]
+        if skipped:
+            summaries.append(f"{skipped} image files skipped, already up to date")
+
+        return _merge_summaries(summaries)
+
+    def _read_tags(
+        self,
+        images: Sequence[str],
+        assignments: Sequence["_Assignment"],
+        batch: Batch | None,
+    ) -> dict[str, Metadata]:
+        if not assignments:
+            return {}
+
+        args = ["-json", "-G0:1"]
+        for assignment in assignments:
+            # both the converted and the raw value, either may match
+            args.append(f"-{assignment.tag}")
+            args.append(f"-{assignment.tag}#")
+
+        # Files which cannot be read are simply written, ExifTool will
+        # report the error then.
+        result = self._run_sharded(
+            args,
+            images,
+            _parse_result_standard,
+            lambda results: _merge_results_json(results, images),
+            check=False,
+            read_only=True,
+            batch=batch,
+        )
+        try:
+            metadata = json.loads(result.stdout or "[]")
+        except json.JSONDecodeError:
+            return {}
 
-        return self._run_exiftool(args, _parse_result_standard).info
+        return {obj["SourceFile"]: obj for obj in metadata if "SourceFile" in obj}
 
-    def _remove_metadata(self, images: Sequence[str], tags: Sequence[str]) -> str:
+    def _remove_metadata(
+        self, images: Sequence[str], tags: Sequence[str], batch: Batch | None
+    ) -> str:
         if not images:
             raise ValueError("No files provided for metadata removal.")
 
         if not tags:
             raise ValueError("No metadata tags specified for removal.")
 
-        args = [
-            self._binary,
-        ]
-
+        args = []
         for tag in tags:
             args.append(f"-{tag}=")
 
-        args.extend(images)
+        if self._sidecar_mode is SidecarMode.OFF:
+            return self._run_write(args, images, batch).info
+
+        # Tags without a group may live in both the sidecar and the image.
+        xmp_args = [arg for arg in args if not _is_exif_argument(arg)]
+        file_args = [arg for arg in args if not _is_xmp_argument(arg)]
+        summaries = []
 
-        return self._run_exiftool(args, _parse_result_standard).info
+        if xmp_args and (sidecars := self._existing_sidecars(images)):
+            summaries.append(self._run_write(xmp_args, sidecars, batch).info)
+        if file_args:
+            if self._sidecar_mode is SidecarMode.XMP:
+                summaries.append(
+                    f"{len(file_args)} non-XMP tags skipped in sidecar mode"
+                )
+            else:
+                summaries.append(self._run_write(file_args, images, batch).info)
+
+        return _merge_summaries(summaries)
 
     def _get_metadata(self, images: Sequence[str]) -> str:
         if not images:
             raise ValueError("No files provided for metadata viewing.")
 
-        args = [
-            self._binary,
-            "-G1",
-            "-json",
-            "-api",
-            "structformat=jsonq",
-            "-a",
-            "-s",
-            "-q",
+        records = self._read_metadata(images)
+        metadata = [records[image] for image in images if image in records]
+        return json.dumps(self._merge_sidecars(metadata), ensure_ascii=False)
+
+    def _read_metadata(self, images: Sequence[str]) -> dict[str, Metadata]:
+        cached, missing = self._lookup_cache(images)
+        if missing:
+            result = self._run_sharded(
+                _GET_METADATA_ARGUMENTS,
+                list(missing),
+                _parse_result_standard,
+                lambda results: _merge_results_json(results, list(missing)),
+                read_only=True,
+            )
+            for obj in self._store_cache(json.loads(result.stdout or "[]"), missing):
+                cached[obj["SourceFile"]] = obj
+
+        return cached
+
+    def _read_previews(self, images: Sequence[str]) -> dict[str, list[bytes]]:
+        if not images:
+            return {}
+
+        # Unreadable files simply have no preview, the caller decodes them.
+        result = self._run_sharded(
+            _GET_PREVIEWS_ARGUMENTS,
+            images,
+            _parse_result_standard,
+            lambda results: _merge_results_json(results, images),
+            check=False,
+            read_only=True,
+            pool=self._preview_pool,
+        )
+        previews = {}
+        for obj in json.loads(result.stdout or "[]"):
+            data = [
+                base64.b64decode(value.removeprefix(_BINARY_PREFIX))
+                for tag in _PREVIEW_TAGS
+                if isinstance(value := obj.get(tag), str)
+                and value.startswith(_BINARY_PREFIX)
+            ]
+            if data and "SourceFile" in obj:
+                previews[obj["SourceFile"]] = data
+
+        return previews
+
+    def _merge_sidecars(self, metadata: list[Metadata]) -> list[Metadata]:
+        """Overlay XMP values from sidecars onto the metadata of their images."""
+        if self._sidecar_mode is SidecarMode.OFF:
+            return metadata
+
+        by_sidecar = {sidecar_path(obj["SourceFile"]): obj for obj in metadata}
+        sidecars = [path for path in by_sidecar if os.path.exists(path)]
+        if sidecars:
+            for path, obj in self._read_metadata(sidecars).items():
+                by_sidecar[path].update(
+                    (key, value) for key, value in obj.items() if key.startswith("XMP")
+                )
+
+        return metadata
+
+    def _stream_metadata(
+        self, images: Sequence[str], chunk_size: int, batch: Batch | None = None
+    ) -> Iterator[list[Metadata]]:
+        if not images:
+            raise ValueError("No files provided for metadata viewing.")
+
+        # Small chunks, each its own -execute, so the records of the first
+        # files can be shown while ExifTool still works on the rest. A chunk
+        # is only taken once the images before it were yielded.
+        chunk_size = max(1, chunk_size)
+        cached, missing = self._lookup_cache(images)
+        to_read = list(missing)
+        chunks = [
+            to_read[start : start + chunk_size]
+            for start in range(0, len(to_read), chunk_size)
         ]
-        args.extend(images)
+        chunk_of = {image: idx for idx, chunk in enumerate(chunks) for image in chunk}
+        replies = self._pool.imap(
+            ArgumentBlock.build(_GET_METADATA_ARGUMENTS), chunks, read_only=True
+        )
+        taken = 0
+        records: list[Metadata] = []
+
+        try:
+            for image in images:
+                while chunk_of.get(image, -1) >= taken:
+                    cached.update(self._read_chunk(next(replies), missing, batch))
+                    taken += 1
+
+                if image in cached:
+                    records.append(cached.pop(image))
+                if len(records) >= chunk_size:
+                    yield self._merge_sidecars(records)
+                    records = []
+        except FileNotFoundError:
+            raise RuntimeError(f"ExifTool not found: {self._pool.binary}")
 
-        return self._run_exiftool(args, _parse_result_standard).stdout
+        if records:
+            yield self._merge_sidecars(records)
 
-    def _export_metadata(self, images: Sequence[str]) -> RunResult:
+    def _read_chunk(
+        self,
+        reply: SessionResult,
+        identities: dict[str, FileIdentity | None],
+        batch: Batch | None,
+    ) -> dict[str, Metadata]:
+        """Records of the files a chunk was sent with, the others are reported."""
+        try:
+            records = json.loads(reply.stdout) if reply.stdout.strip() else []
+        except json.JSONDecodeError:
+            records = []
+
+        # ExifTool may write the paths differently, e.g. with "/" on Windows
+        requested = {_path_key(path): path for path in reply.files}
+        for obj in records:
+            if (
+                path := requested.get(_path_key(obj.get("SourceFile", "")))
+            ) is not None:
+                obj["SourceFile"] = path
+        read = {
+            obj["SourceFile"]: obj
+            for obj in self._store_cache(records, identities)
+            if obj.get("SourceFile") in reply.files
+        }
+
+        if batch and len(read) < len(reply.files):
+            results = {result.path: result for result in _parse_file_results(reply)}
+            batch.add_results(
+                FileResult(
+                    path,
+                    FileStatus.ERROR,
+                    results[path].message or "No metadata returned",
+                )
+                for path in reply.files
+                if path not in read
+            )
+
+        return read
+
+    def _lookup_cache(
+        self, images: Sequence[str]
+    ) -> tuple[dict[str, Metadata], dict[str, FileIdentity | None]]:
+        if self._cache is None:
+            return {}, dict.fromkeys(images)
+
+        return self._cache.lookup(images)
+
+    def _store_cache(
+        self, metadata: list[Metadata], identities: dict[str, FileIdentity | None]
+    ) -> list[Metadata]:
+        if self._cache is not None:
+            self._cache.store(
+                (obj["SourceFile"], identity, obj)
+                for obj in metadata
+                if (identity := identities.get(obj.get("SourceFile", "")))
+            )
+
+        return metadata
+
+    def _invalidate_cache(self, images: Sequence[str]) -> None:
+        if self._cache is not None:
+            self._cache.invalidate([*images, *map(sidecar_path, images)])
+
+    def _export_metadata(self, images: Sequence[str], batch: Batch | None) -> RunResult:
         if not images:
             raise ValueError("No files provided for metadata export.")
 
@@ -402,7 +892,6 @@ class ExifTool:
         ]
 
         args = [
-            self._binary,
             "-G",
             "-json",
             "-api",
@@ -410,41 +899,239 @@ class ExifTool:
             "-n",
         ]
         args.extend(tags_to_export)
-        args.extend(images)
 
-        return self._run_exiftool(args, _parse_result_export)
+        result = self._run_exiftool(
+            args,
+            images,
+            _parse_result_export,
+            lambda results: _merge_results_json(results, images),
+            batch,
+        )
+
+        if self._sidecar_mode is not SidecarMode.OFF and (
+            sidecars := self._existing_sidecars(images)
+        ):
+            sidecar_result = self._run_exiftool(
+                args,
+                sidecars,
+                _parse_result_export,
+                lambda results: _merge_results_json(results, sidecars),
+                batch,
+            )
+            metadata = json.loads(result.stdout or "[]")
+            by_sidecar = {sidecar_path(obj["SourceFile"]): obj for obj in metadata}
+            for obj in json.loads(sidecar_result.stdout or "[]"):
+                if image_data := by_sidecar.get(obj["SourceFile"]):
+                    image_data.update(
+                        (key, value)
+                        for key, value in obj.items()
+                        if key.startswith("XMP")
+                    )
+            result.stdout = json.dumps(metadata, ensure_ascii=False)
+
+        return result
 
-    def _import_metadata(self, images: Sequence[str], input_file: Path) -> str:
+    def _import_metadata(
+        self, images: Sequence[str], input_file: Path, batch: Batch | None
+    ) -> str:
         if not images:
             raise ValueError("No files provided for metadata import.")
 
-        import_json = _create_import_json(input_file)
+        if self._sidecar_mode is SidecarMode.OFF:
+            return self._import_json(images, input_file, batch)
+
+        summaries = [
+            self._import_json(
+                self._ensure_sidecars(images, batch),
+                input_file,
+                batch,
+                lambda tag: tag.startswith("XMP"),
+                ".xmp",
+            )
+        ]
+        if self._sidecar_mode is SidecarMode.XMP_AND_FILE:
+            summaries.append(
+                self._import_json(
+                    images, input_file, batch, lambda tag: not tag.startswith("XMP")
+                )
+            )
+
+        return _merge_summaries(summaries)
+
+    def _import_json(
+        self,
+        targets: Sequence[str],
+        input_file: Path,
+        batch: Batch | None,
+        tag_filter: Callable[[str], bool] | None = None,
+        suffix: str = "",
+    ) -> str:
+        import_json = _create_import_json(input_file, tag_filter, suffix)
         args = [
-            self._binary,
             "-n",
             f"-json={import_json}",
         ]
-        args.extend(images)
 
         try:
-            return self._run_exiftool(args, _parse_result_import).info
+            return self._run_write(
+                args, targets, batch, _parse_result_import, sharded=False
+            ).info
         finally:
-            print(import_json)
             os.unlink(import_json)
 
+    def _clean_backups(
+        self, images: Sequence[str], archive: bool, batch: Batch | None
+    ) -> str:
+        if not images:
+            raise ValueError("No files provided for backup cleanup.")
+
+        if archive and self._backup_dir is None:
+            raise ValueError("No backup directory configured.")
+
+        targets = [*images, *map(sidecar_path, images)]
+        backups = [
+            backup
+            for target in targets
+            if os.path.exists(backup := target + _BACKUP_SUFFIX)
+        ]
+        if batch:
+            batch.add_total(len(backups))
+        for backup in backups:
+            if batch:
+                batch.check()
+            if archive:
+                self._archive_backup(backup)
+            else:
+                os.unlink(backup)
+            if batch:
+                batch.advance()
+
+        action = "archived" if archive else "deleted"
+        return f"{len(backups)} backup files {action}"
+
+    def _archive_backup(self, backup: str) -> None:
+        assert self._backup_dir is not None
+        destination = _backup_destination(self._backup_dir, backup)
+        if destination.exists():
+            # The archive already holds an older backup, which is closer to
+            # the original file, keep that one.
+            os.unlink(backup)
+            return
+
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        shutil.move(backup, destination)
+
+    def _run_write(
+        self,
+        arguments: Sequence[str],
+        targets: Sequence[str],
+        batch: Batch | None,
+        response_parser: ResponseParser | None = None,
+        sharded: bool = True,
+    ) -> RunResult:
+        """Run a writing command under the configured backup policy.
+
+        Files ExifTool fails to write don't fail the whole command, they are
+        recorded in the batch instead.
+        """
+        arguments = [*_BACKUP_ARGUMENTS[self._backup_policy], *arguments]
+        parser = response_parser or _parse_result_standard
+        try:
+            if sharded:
+                result = self._run_sharded(
+                    arguments, targets, parser, check=False, progress=True, batch=batch
+                )
+            else:
+                shards = [targets]
+                result = self._run_batch(
+                    arguments, shards, parser, None, batch, check=False, progress=True
+                )
+        finally:
+            if self._backup_policy is BackupPolicy.DIRECTORY:
+                for target in targets:
+                    if os.path.exists(backup := target + _BACKUP_SUFFIX):
+                        self._archive_backup(backup)
+
+        if batch:
+            batch.add_results(result.files)
+        failed = any(file.status is FileStatus.ERROR for file in result.files)
+        if result.returncode != 0 and not failed:
+            raise RuntimeError(f"ExifTool error: {result.stderr}")
+
+        return result
+
     def _run_exiftool(
         self,
         arguments: Sequence[str],
-        response_parser: Callable[[subprocess.CompletedProcess[str]], RunResult],
+        images: Sequence[str],
+        response_parser: ResponseParser,
+        results_merger: ResultsMerger | None = None,
+        batch: Batch | None = None,
+    ) -> RunResult:
+        """Run a reading command for all images on one session."""
+        return self._run_batch(
+            arguments, [images], response_parser, results_merger, batch, read_only=True
+        )
+
+    def _run_sharded(
+        self,
+        arguments: Sequence[str],
+        images: Sequence[str],
+        response_parser: ResponseParser,
+        results_merger: ResultsMerger | None = None,
+        batch: Batch | None = None,
+        check: bool = True,
+        progress: bool = False,
+        read_only: bool = False,
+        pool: ExifToolPool | None = None,
     ) -> RunResult:
+        shards = _shard_by_size(images, (pool or self._pool).size)
+        return self._run_batch(
+            arguments,
+            shards,
+            response_parser,
+            results_merger,
+            batch,
+            check,
+            progress,
+            read_only,
+            pool,
+        )
+
+    def _run_batch(
+        self,
+        arguments: Sequence[str],
+        shards: Sequence[Sequence[str]],
+        response_parser: ResponseParser,
+        results_merger: ResultsMerger | None,
+        batch: Batch | None = None,
+        check: bool = True,
+        progress: bool = False,
+        read_only: bool = False,
+        pool: ExifToolPool | None = None,
+    ) -> RunResult:
+        """Run the arguments for every shard of images.
+
+        The `batch` of the calling operation gets the progress and can cancel
+        it. Only `read_only` commands are run again if ExifTool crashes. Runs
+        on `pool` instead of the main pool if given.
+        """
+        pool = pool or self._pool
+        # Images are streamed to ExifTool in chunks through its argfile, the
+        # arguments common to all chunks are encoded just once.
+        block = ArgumentBlock.build(arguments)
+        merger = results_merger or _merge_results_standard
+        if batch:
+            batch.check()
         try:
-            result = response_parser(
-                subprocess.run(arguments, capture_output=True, text=True)
+            replies = pool.map(
+                block, shards, self._chunk_size, batch, progress, read_only
             )
-            if result.returncode != 0:
+            result = merger([response_parser(reply) for reply in replies])
+            if check and result.returncode != 0:
                 raise RuntimeError(f"ExifTool error: {result.stderr}")
         except FileNotFoundError:
-            raise RuntimeError(f"ExifTool not found: {self._binary}")
+            raise RuntimeError(f"ExifTool not found: {pool.binary}")
 
         return result
 
@@ -456,51 +1143,226 @@ class ExifTool:
         return country, "", ""
 
 
-def _parse_result_standard(result: subprocess.CompletedProcess[str]) -> RunResult:
+def _parse_result_standard(result: SessionResult) -> RunResult:
     return RunResult(
         result.returncode,
         result.stdout.strip(),
         result.stderr.strip(),
         result.stdout.strip(),
+        _parse_file_results(result),
     )
 
 
-def _parse_result_export(result: subprocess.CompletedProcess[str]) -> RunResult:
+def _parse_result_export(result: SessionResult) -> RunResult:
     return RunResult(
         result.returncode,
         result.stdout.strip(),
         result.stderr.strip(),
         result.stderr.strip(),
+        _parse_file_results(result),
     )
 
 
-def _parse_result_import(result: subprocess.CompletedProcess[str]) -> RunResult:
+def _parse_result_import(result: SessionResult) -> RunResult:
+    files = _parse_file_results(result)
     if result.returncode != 0:
         return RunResult(
             result.returncode,
             result.stdout.strip(),
             result.stderr.strip(),
             result.stdout.strip(),
+            files,
         )
 
+    # Per-file errors and warnings are reported in `files`, anything else
+    # besides the summary line means the import went wrong.
     stderr = [
-        part for part in [part.strip() for part in result.stderr.split("\n")] if part
+        part
+        for part in [part.strip() for part in result.stderr.split("\n")]
+        if part and not _FILE_MESSAGE.match(part)
     ]
     if len(stderr) > 1:
-        return RunResult(1, "", result.stderr.strip(), "")
+        return RunResult(1, "", result.stderr.strip(), "", files)
     else:
         info = stderr[-1] if stderr else ""
-        return RunResult(result.returncode, info, "", info)
+        return RunResult(result.returncode, info, "", info, files)
+
+
+_FILE_MESSAGE = re.compile(r"(Error|Warning): (.*)")
+
+
+def _path_key(path: str) -> str:
+    return os.path.normcase(os.path.normpath(path))
+
+
+def _parse_file_results(result: SessionResult) -> list[FileResult]:
+    """Status of every file of a command, from its `Error:` and `Warning:` lines.
+
+    Messages end with ` - <file>`; errors not naming a file of the command
+    fail all of its files when ExifTool exits with an error.
+    """
+    results = {path: FileResult(path, FileStatus.OK) for path in result.files}
+    general = []
+
+    for line in result.stderr.splitlines():
+        if not (match := _FILE_MESSAGE.match(line.strip())):
+            continue
+
+        kind, text = match.groups()
+        status = FileStatus.ERROR if kind == "Error" else FileStatus.WARNING
+        message, path = _split_file_message(text, results)
+        if path is None:
+            if status is FileStatus.ERROR:
+                general.append(text)
+        elif status.severity > results[path].status.severity:
+            results[path] = FileResult(path, status, message)
+
+    if general and result.returncode != 0:
+        message = "; ".join(general)
+        for path, file_result in results.items():
+            if file_result.status is not FileStatus.ERROR:
+                results[path] = FileResult(path, FileStatus.ERROR, message)
+
+    return list(results.values())
+
+
+def _split_file_message(
+    text: str, files: dict[str, FileResult]
+) -> tuple[str, str | None]:
+    # file names may contain " - " too, try every split point
+    start = 0
+    while (index := text.find(" - ", start)) >= 0:
+        if (path := text[index + 3 :]) in files:
+            return text[:index], path
+        start = index + 1
+
+    return text, None
+
+
+def failed_images(images: Sequence[str], results: Sequence[FileResult]) -> list[str]:
+    """Images whose own write, or the write of their sidecar, failed."""
+    failed = {result.path for result in results if result.status is FileStatus.ERROR}
+    return [
+        image for image in images if image in failed or sidecar_path(image) in failed
+    ]
+
+
+def sidecar_path(image: str) -> str:
+    return f"{image}.xmp"
+
+
+def _backup_destination(backup_dir: Path, backup: str) -> Path:
+    """Place a backup under `backup_dir`, mirroring its absolute path."""
+    path = Path(backup).resolve()
+    drive = path.drive.replace(":", "").strip("\\/")
+    return backup_dir.joinpath(drive, *path.parts[1:])
+
+
+def _is_xmp_argument(argument: str) -> bool:
+    return re.match(r"-XMP[\w-]*:", argument, re.IGNORECASE) is not None
+
+
+def _is_exif_argument(argument: str) -> bool:
+    return re.match(r"-(EXIF|IPTC)[\w-]*:", argument, re.IGNORECASE) is not None
+
+
+def _shard_by_size(images: Sequence[str], shards: int) -> list[list[str]]:
+    """Split images into shards of roughly the same total file size.
+
+    Largest files are placed first, each into the currently lightest shard.
+    Images keep their original order within a shard.
+    """
+    shards = max(1, min(shards, len(images)))
+    if shards == 1:
+        return [list(images)]
+
+    def file_size(image: str) -> int:
+        try:
+            return os.path.getsize(image)
+        except OSError:
+            return 0
+
+    sizes = [file_size(image) for image in images]
+    loads = [(0, shard) for shard in range(shards)]
+    assigned: list[list[int]] = [[] for _ in range(shards)]
+
+    for idx in sorted(range(len(images)), key=lambda i: sizes[i], reverse=True):
+        load, shard = heapq.heappop(loads)
+        assigned[shard].append(idx)
+        heapq.heappush(loads, (load + sizes[idx], shard))
+
+    return [[images[idx] for idx in sorted(shard)] for shard in assigned]
+
+
+def _merge_results_standard(results: Sequence[RunResult]) -> RunResult:
+    if len(results) == 1:
+        return results[0]
+
+    return RunResult(
+        max(result.returncode for result in results),
+        _merge_summaries([result.stdout for result in results]),
+        "\n".join(result.stderr for result in results if result.stderr),
+        _merge_summaries([result.info for result in results]),
+        [file for result in results for file in result.files],
+    )
+
+
+def _merge_results_json(
+    results: Sequence[RunResult], images: Sequence[str]
+) -> RunResult:
+    if len(results) == 1:
+        return results[0]
+
+    metadata = []
+    for result in results:
+        if result.stdout:
+            metadata.extend(json.loads(result.stdout))
+
+    position = {image: idx for idx, image in enumerate(images)}
+    metadata.sort(key=lambda obj: position.get(obj.get("SourceFile"), len(position)))
+
+    return RunResult(
+        max(result.returncode for result in results),
+        json.dumps(metadata, ensure_ascii=False),
+        "\n".join(result.stderr for result in results if result.stderr),
+        _merge_summaries([result.info for result in results]),
+        [file for result in results for file in result.files],
+    )
+
+
+def _merge_summaries(summaries: Sequence[str]) -> str:
+    """Add up ExifTool summary lines such as `2 image files updated`."""
+    counts: dict[str, int] = {}
+    other: list[str] = []
+
+    for summary in summaries:
+        for line in summary.splitlines():
+            if match := re.fullmatch(r"\s*(\d+) (.+?)\s*", line):
+                count, message = match.groups()
+                counts[message] = counts.get(message, 0) + int(count)
+            elif line.strip():
+                other.append(line.strip())
+
+    lines = [f"{count:5d} {message}" for message, count in counts.items()]
+    return "\n".join(other + lines).strip()
 
 
-def _create_import_json(original: Path) -> str:
+def _create_import_json(
+    original: Path,
+    tag_filter: Callable[[str], bool] | None = None,
+    suffix: str = "",
+) -> str:
     with open(original, "r", encoding="utf-8") as ifh:
         data = json.load(ifh)
 
     dir = original.parent
     for image_data in data:
         image_name = Path(image_data["SourceFile"])
-        image_data["SourceFile"] = str(dir / image_name)
+        image_data["SourceFile"] = str(dir / image_name) + suffix
+        if tag_filter:
+            for tag in [tag for tag in image_data if tag != "SourceFile"]:
+                if not tag_filter(tag):
+                    del image_data[tag]
 
     with tempfile.NamedTemporaryFile(mode="w+", suffix=".json", delete=False) as tmp:
         json.dump(data, tmp, ensure_ascii=False, indent=4)
@@ -0,0 +1,527 @@
+import os
+import queue
+import subprocess
+import threading
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from concurrent.futures import Future, wait
+from dataclasses import dataclass, field
+from enum import Enum
+from pathlib import Path
+from typing import IO
+
+
+class SessionResult(subprocess.CompletedProcess[str]):
+    """Output of one ExifTool command and the files it was run for."""
+
+    def __init__(
+        self,
+        args: Sequence[str],
+        returncode: int,
+        stdout: str,
+        stderr: str,
+        files: Sequence[str] = (),
+    ):
+        super().__init__(args, returncode, stdout, stderr)
+        self.files = files
+
+
+class FileStatus(Enum):
+    OK = "ok"
+    WARNING = "warning"
+    ERROR = "error"
+
+    @property
+    def severity(self) -> int:
+        return list(FileStatus).index(self)
+
+
+@dataclass(frozen=True)
+class FileResult:
+    path: str
+    status: FileStatus
+    message: str = ""
+
+
+ProgressCallback = Callable[[str], None]
+
+_PROGRESS_PREFIX = b"======== "
+
+
+class ExifToolSessionError(RuntimeError):
+    pass
+
+
+class BatchCancelled(Exception):
+    pass
+
+
+class Batch:
+    """Progress and cancellation of one long running operation.
+
+    Shared by the thread running the operation and the thread showing it.
+    """
+
+    def __init__(self) -> None:
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self._done = 0
+        self._total = 0
+        self._results: dict[str, FileResult] = {}
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def check(self) -> None:
+        if self.cancelled:
+            done, total = self.progress
+            raise BatchCancelled(f"Cancelled after {done} of {total} files")
+
+    def add_total(self, count: int) -> None:
+        with self._lock:
+            self._total += count
+
+    def advance(self, count: int = 1) -> None:
+        with self._lock:
+            self._done += count
+
+    def file_started(self, name: str) -> None:
+        self.advance()
+
+    @property
+    def progress(self) -> tuple[int, int]:
+        with self._lock:
+            return min(self._done, self._total), self._total
+
+    def add_results(self, results: Iterable[FileResult]) -> None:
+        """Record per-file results, a file keeps the worst status it got."""
+        with self._lock:
+            for result in results:
+                current = self._results.get(result.path)
+                if current is None or result.status.severity > current.status.severity:
+                    self._results[result.path] = result
+
+    @property
+    def results(self) -> list[FileResult]:
+        with self._lock:
+            return list(self._results.values())
+
+
+@dataclass(frozen=True)
+class ArgumentBlock:
+    """Arguments encoded for the argfile once and reused by many commands."""
+
+    arguments: tuple[str, ...]
+    encoded: bytes
+
+    @classmethod
+    def build(cls, arguments: Sequence[str]) -> "ArgumentBlock":
+        return cls(tuple(arguments), _encode_arguments(arguments))
+
+
+Arguments = Sequence[str] | ArgumentBlock
+
+
+@dataclass
+class _Request:
+    arguments: ArgumentBlock
+    files: Sequence[str]
+    on_progress: ProgressCallback | None = None
+    read_only: bool = False
+    future: Future[SessionResult] = field(default_factory=Future)
+
+
+class ExifToolSession:
+    """Long-lived `exiftool -stay_open True -@ -` process.
+
+    Commands are put on a request queue and executed one by one by a worker
+    thread which owns the process. The end of every response is found using
+    the `{ready<seq>}` marker on stdout and an `-echo4` marker on stderr.
+    If the process dies, a fresh one is started; only `read_only` commands
+    are run again on it, a write may already have been partly applied.
+    """
+
+    def __init__(self, exiftool_binary: Path):
+        self._binary = str(exiftool_binary)
+        self._process: subprocess.Popen[bytes] | None = None
+        self._stdout: _PipeReader | None = None
+        self._stderr: _PipeReader | None = None
+        self._sequence = 0
+        self._requests: queue.Queue[_Request | None] = queue.Queue()
+        self._worker: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._closed = False
+
+    @property
+    def binary(self) -> str:
+        return self._binary
+
+    def execute(
+        self, arguments: Arguments, files: Sequence[str] = (), read_only: bool = False
+    ) -> SessionResult:
+        return self.submit(arguments, files, read_only=read_only).result()
+
+    def submit(
+        self,
+        arguments: Arguments,
+        files: Sequence[str] = (),
+        on_progress: ProgressCallback | None = None,
+        read_only: bool = False,
+    ) -> Future[SessionResult]:
+        """Queue a command.
+
+        With `on_progress` the command runs with `-progress` and the callback
+        gets the name of every file as ExifTool starts processing it.
+        """
+        if not isinstance(arguments, ArgumentBlock):
+            arguments = ArgumentBlock.build(arguments)
+
+        with self._lock:
+            if self._closed:
+                raise ExifToolSessionError("ExifTool session is closed")
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._work, daemon=True)
+                self._worker.start()
+
+            request = _Request(arguments, files, on_progress, read_only)
+            self._requests.put(request)
+
+        return request.future
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            worker = self._worker
+
+        if worker is None:
+            return
+
+        self._requests.put(None)
+        worker.join()
+
+    def _work(self) -> None:
+        while (request := self._requests.get()) is not None:
+            if not request.future.set_running_or_notify_cancel():
+                continue
+
+            try:
+                result = self._execute(request)
+            except (ExifToolSessionError, OSError) as err:
+                # The process crashed or its pipes broke, start a fresh one.
+                # Only reads get one more chance, arguments like `+=` must
+                # not be applied twice to a file written before the crash.
+                self._stop()
+                if isinstance(err, FileNotFoundError) or not request.read_only:
+                    request.future.set_exception(err)
+                    continue
+                try:
+                    result = self._execute(request)
+                except BaseException as err:
+                    self._stop()
+                    request.future.set_exception(err)
+                    continue
+            except BaseException as err:
+                request.future.set_exception(err)
+                continue
+
+            request.future.set_result(result)
+
+        self._stop()
+
+    def _execute(self, request: _Request) -> SessionResult:
+        self._ensure_running()
+        assert self._process and self._process.stdin
+        assert self._stdout and self._stderr
+
+        self._sequence += 1
+        sequence = self._sequence
+        trailer = ["-echo4", f"=${{status}}=post{sequence}", f"-execute{sequence}"]
+        on_line: Callable[[bytes], None] | None = None
+        if on_progress := request.on_progress:
+            trailer.insert(0, "-progress")
+
+            def report_progress(line: bytes) -> None:
+                if line.startswith(_PROGRESS_PREFIX):
+                    on_progress(line[len(_PROGRESS_PREFIX) :].decode(errors="replace"))
+
+            on_line = report_progress
+
+        self._process.stdin.write(request.arguments.encoded)
+        self._process.stdin.write(_encode_arguments(request.files))
+        self._process.stdin.write(_encode_arguments(trailer))
+        self._process.stdin.flush()
+
+        stdout = self._stdout.read_until(f"{{ready{sequence}}}".encode(), on_line)
+        if on_line:
+            # -progress implies -v0, which lists the files among the output
+            stdout = b"\n".join(
+                line
+                for line in stdout.split(b"\n")
+                if not line.startswith(_PROGRESS_PREFIX)
+            )
+        stderr = self._stderr.read_until(f"=post{sequence}".encode())
+        stderr, _, status = stderr.rpartition(b"=")
+
+        try:
+            returncode = int(status)
+        except ValueError:
+            returncode = 1
+
+        return SessionResult(
+            request.arguments.arguments,
+            returncode,
+            stdout.decode("utf-8", errors="replace"),
+            stderr.decode("utf-8", errors="replace"),
+            request.files,
+        )
+
+    def _ensure_running(self) -> None:
+        if self._process is not None and self._process.poll() is None:
+            return
+
+        self._stop()
+        self._process = subprocess.Popen(
+            [self._binary, "-stay_open", "True", "-@", "-"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        assert self._process.stdout and self._process.stderr
+        self._stdout = _PipeReader(self._process.stdout)
+        self._stderr = _PipeReader(self._process.stderr)
+        self._stdout.start()
+        self._stderr.start()
+
+    def _stop(self) -> None:
+        process = self._process
+        self._process = None
+        self._stdout = None
+        self._stderr = None
+
+        if process is None:
+            return
+
+        try:
+            if process.poll() is None and process.stdin:
+                process.stdin.write(b"-stay_open\nFalse\n")
+                process.stdin.flush()
+                process.stdin.close()
+            process.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            process.kill()
+            process.wait()
+
+
+class ExifToolPool:
+    """Fixed set of ExifTool sessions, each running its own process.
+
+    Processes are started lazily, so unused workers cost nothing.
+    """
+
+    def __init__(self, exiftool_binary: Path, workers: int = 0):
+        if workers <= 0:
+            workers = min(4, os.cpu_count() or 1)
+
+        self._binary = str(exiftool_binary)
+        self._sessions = [ExifToolSession(exiftool_binary) for _ in range(workers)]
+
+    @property
+    def binary(self) -> str:
+        return self._binary
+
+    @property
+    def size(self) -> int:
+        return len(self._sessions)
+
+    def execute(
+        self, arguments: Arguments, files: Sequence[str] = (), read_only: bool = False
+    ) -> SessionResult:
+        return self._sessions[0].execute(arguments, files, read_only)
+
+    def map(
+        self,
+        arguments: Arguments,
+        shards: Sequence[Sequence[str]],
+        chunk_size: int,
+        batch: Batch | None = None,
+        progress: bool = False,
+        read_only: bool = False,
+    ) -> list[SessionResult]:
+        """Run the same arguments for every shard of files.
+
+        Each shard goes to its own session and is sent in chunks of at most
+        `chunk_size` files. Results are returned shard by shard, chunk by chunk.
+
+        A `batch` is advanced file by file with `progress`, otherwise chunk by
+        chunk. Cancelling it drops the chunks not started yet; the running
+        ones are waited for, so no file is left half processed.
+        """
+        if not isinstance(arguments, ArgumentBlock):
+            arguments = ArgumentBlock.build(arguments)
+
+        chunk_size = max(1, chunk_size)
+        chunks = [
+            (idx, shard[start : start + chunk_size])
+            for idx, shard in enumerate(shards)
+            for start in range(0, len(shard), chunk_size)
+        ]
+        on_progress = None
+        if batch:
+            batch.add_total(sum(len(files) for _, files in chunks))
+            if progress:
+                on_progress = batch.file_started
+
+        futures = [
+            self._sessions[idx % len(self._sessions)].submit(
+                arguments, files, on_progress, read_only
+            )
+            for idx, files in chunks
+        ]
+
+        results = []
+        for future, (_, files) in zip(futures, chunks):
+            if batch and batch.cancelled:
+                for pending in futures:
+                    pending.cancel()
+                wait(futures)
+                batch.check()
+            results.append(future.result())
+            if batch and not progress:
+                batch.advance(len(files))
+
+        return results
+
+    def imap(
+        self,
+        arguments: Arguments,
+        chunks: Sequence[Sequence[str]],
+        read_only: bool = False,
+    ) -> Iterator[SessionResult]:
+        """Run the same arguments for every chunk of files, yield results in order.
+
+        Chunks are spread over all sessions, but only a couple of commands per
+        session are queued ahead, so results can be consumed as they arrive.
+        """
+        if not isinstance(arguments, ArgumentBlock):
+            arguments = ArgumentBlock.build(arguments)
+
+        window = 2 * len(self._sessions)
+        pending: deque[Future[SessionResult]] = deque()
+
+        try:
+            for idx, files in enumerate(chunks):
+                session = self._sessions[idx % len(self._sessions)]
+                pending.append(session.submit(arguments, files, read_only=read_only))
+                if len(pending) >= window:
+                    yield pending.popleft().result()
+
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            # the consumer stopped early, drop what it won't read
+            for future in pending:
+                future.cancel()
+
+    def close(self) -> None:
+        for session in self._sessions:
+            session.close()
+
+
+class _PipeReader(threading.Thread):
+    """Keeps draining a pipe so ExifTool never blocks on a full buffer."""
+
+    def __init__(self, pipe: IO[bytes]):
+        super().__init__(daemon=True)
+        self._pipe = pipe
+        self._buffer = bytearray()
+        self._eof = False
+        self._condition = threading.Condition()
+
+    def run(self) -> None:
+        fd = self._pipe.fileno()
+        while True:
+            try:
+                chunk = os.read(fd, 65_536)
+            except OSError:
+                chunk = b""
+
+            with self._condition:
+                if chunk:
+                    self._buffer.extend(chunk)
+                else:
+                    self._eof = True
+                self._condition.notify_all()
+
+            if not chunk:
+                return
+
+    def read_until(
+        self, marker: bytes, on_line: Callable[[bytes], None] | None = None
+    ) -> bytes:
+        """Wait for `marker`, return what came before it.
+
+        `on_line` is called for every complete line as soon as it arrives.
+        """
+        with self._condition:
+            start = 0
+            reported = 0
+            while (index := self._buffer.find(marker, start)) < 0:
+                if on_line:
+                    reported = self._report_lines(reported, len(self._buffer), on_line)
+                if self._eof:
+                    raise ExifToolSessionError(
+                        "ExifTool process terminated unexpectedly"
+                    )
+                start = max(0, len(self._buffer) - len(marker) + 1)
+                self._condition.wait()
+
+            if on_line:
+                self._report_lines(reported, index, on_line)
+            data = bytes(self._buffer[:index])
+            del self._buffer[: index + len(marker)]
+
+        # Line ending left over from the previous marker.
+        return data.lstrip(b"\r\n")
+
+    def _report_lines(
+        self, start: int, end: int, on_line: Callable[[bytes], None]
+    ) -> int:
+        while (newline := self._buffer.find(b"\n", start, end)) >= 0:
+            on_line(bytes(self._buffer[start:newline]).rstrip(b"\r"))
+            start = newline + 1
+
+        return start
+
+
+def _encode_arguments(arguments: Sequence[str]) -> bytes:
+    if not arguments:
+        return b""
+
+    lines = "\n".join(_encode_argument(argument) for argument in arguments)
+    return (lines + "\n").encode("utf-8")
+
+
+def _encode_argument(argument: str) -> str:
+    # Every argfile line is one argument. Arguments which wouldn't survive that
+    # (newlines, surrounding whitespace, leading #) are sent as C strings.
+    if (
+        "\n" in argument
+        or "\r" in argument
+        or argument != argument.strip()
+        or argument.startswith("#")
+    ):
+        escaped = (
+            argument.replace("\\", "\\\\")
+            .replace("\n", "\\n")
+            .replace("\r", "\\r")
+            .replace("\t", "\\t")
+        )
+        return f"#[CSTR]{escaped}"
+
+    return argument
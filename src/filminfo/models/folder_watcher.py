@@ -0,0 +1,206 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from collections.abc import Callable, Iterator, Sequence
+
+from filminfo.models.image_files import is_image_file, scan_images
+
+
+AddedCallback = Callable[[list[str]], None]
+
+# inotify(7)
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ONLYDIR = 0x01000000
+_IN_ISDIR = 0x40000000
+_IN_MASK = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+_IN_EVENT = struct.Struct("iIII")  # wd, mask, cookie, length of the name
+
+# how often a polled folder is scanned again, in seconds
+_POLL_INTERVAL = 2.0
+
+
+class FolderWatcher:
+    """Reports image files that appear below the watched folders.
+
+    Runs on a thread of its own. Changes are picked up with inotify on
+    Linux and by scanning the folders again elsewhere, or with `polling`.
+    A new file is only reported once its size stayed the same for
+    `settle_time` seconds, so files still being written are held back.
+    Files that settled at about the same time are reported together,
+    `on_added` is called on the watcher thread.
+    """
+
+    def __init__(
+        self,
+        directories: Sequence[str],
+        on_added: AddedCallback,
+        settle_time: float = 2.0,
+        polling: bool = False,
+        interval: float = 0.5,
+    ):
+        self._directories = list(directories)
+        self._on_added = on_added
+        self._settle_time = settle_time
+        self._polling = polling
+        self._interval = interval
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        # path -> last seen size and since when (monotonic)
+        self._pending: dict[str, tuple[int, float]] = {}
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    @property
+    def directories(self) -> Sequence[str]:
+        return self._directories
+
+    def _run(self) -> None:
+        source = self._open_source()
+        try:
+            while not self._stopped.is_set():
+                now = time.monotonic()
+                for path in source.changes(self._interval):
+                    self._pending.setdefault(path, (-1, now))
+                if settled := self._settled():
+                    self._on_added(settled)
+        finally:
+            source.close()
+
+    def _open_source(self) -> "_Inotify | _Polling":
+        if not self._polling and sys.platform.startswith("linux"):
+            try:
+                return _Inotify(self._directories)
+            except (OSError, AttributeError):
+                pass  # e.g. out of watches, or no inotify in the C library
+        return _Polling(self._directories, self._stopped)
+
+    def _settled(self) -> list[str]:
+        now = time.monotonic()
+        settled = []
+        for path, (size, since) in list(self._pending.items()):
+            try:
+                current = os.stat(path).st_size
+            except OSError:
+                del self._pending[path]  # removed or renamed meanwhile
+                continue
+
+            if current != size:
+                self._pending[path] = (current, now)
+            elif current and now - since >= self._settle_time:
+                del self._pending[path]
+                settled.append(path)
+        return sorted(settled)
+
+
+class _Inotify:
+    def __init__(self, directories: Sequence[str]):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        self._directories = directories
+        self._watches: dict[int, str] = {}  # watch descriptor -> folder
+        try:
+            for directory in directories:
+                self._watch_tree(directory)
+        except OSError:
+            os.close(self._fd)
+            raise
+
+    def changes(self, timeout: float) -> Iterator[str]:
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return
+
+        data = os.read(self._fd, 64 * 1024)
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _IN_EVENT.unpack_from(data, offset)
+            offset += _IN_EVENT.size
+            name = os.fsdecode(data[offset : offset + length].rstrip(b"\0"))
+            offset += length
+
+            if mask & _IN_Q_OVERFLOW:
+                # events were lost, so anything could be new
+                for root in self._directories:
+                    yield from scan_images(root)
+            elif mask & _IN_IGNORED:
+                self._watches.pop(wd, None)
+            elif (directory := self._watches.get(wd)) is None:
+                continue
+            elif mask & _IN_ISDIR:
+                if mask & (_IN_CREATE | _IN_MOVED_TO):
+                    path = os.path.join(directory, name)
+                    try:
+                        self._watch_tree(path)
+                    except OSError:
+                        pass  # gone already or out of watches
+                    # files may have been put in before the watch was added
+                    yield from scan_images(path)
+            elif is_image_file(name):
+                yield os.path.join(directory, name)
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+    def _watch_tree(self, directory: str) -> None:
+        pending = [directory]
+        while pending:
+            folder = pending.pop()
+            wd = self._add_watch(self._fd, os.fsencode(folder), _IN_MASK | _IN_ONLYDIR)
+            if wd < 0:
+                errno = ctypes.get_errno()
+                raise OSError(errno, os.strerror(errno), folder)
+            self._watches[wd] = folder
+
+            with os.scandir(folder) as entries:
+                pending.extend(
+                    entry.path
+                    for entry in entries
+                    if entry.is_dir(follow_symlinks=False)
+                )
+
+
+class _Polling:
+    def __init__(self, directories: Sequence[str], stopped: threading.Event):
+        self._directories = directories
+        self._stopped = stopped
+        self._known = self._scan()
+        self._scanned = time.monotonic()
+
+    def changes(self, timeout: float) -> Iterator[str]:
+        self._stopped.wait(timeout)
+        if time.monotonic() - self._scanned < _POLL_INTERVAL:
+            return
+
+        found = self._scan()
+        self._scanned = time.monotonic()
+        yield from found - self._known
+        self._known = found
+
+    def close(self) -> None:
+        pass
+
+    def _scan(self) -> set[str]:
+        return {
+            path for directory in self._directories for path in scan_images(directory)
+        }
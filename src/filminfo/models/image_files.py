@@ -0,0 +1,77 @@
+import csv
+import os
+from collections.abc import Iterator
+from itertools import chain
+
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".bmp", ".tif", ".tiff")
+
+# column holding the paths in a CSV manifest, e.g. one exported by ExifTool
+_MANIFEST_COLUMNS = ("SourceFile", "path", "Path")
+
+
+def is_image_file(path: str) -> bool:
+    return path.lower().endswith(IMAGE_EXTENSIONS)
+
+
+def scan_images(directory: str) -> Iterator[str]:
+    """Image files below the directory, recursively, folder by folder.
+
+    Entries of a folder are sorted, its subfolders follow its files.
+    Symbolic links to folders are not followed and unreadable folders are
+    skipped.
+    """
+    pending = [directory]
+    while pending:
+        try:
+            with os.scandir(pending.pop()) as entries:
+                files = []
+                folders = []
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            folders.append(entry.path)
+                        elif is_image_file(entry.name) and entry.is_file():
+                            files.append(entry.path)
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+
+        files.sort()
+        yield from files
+        folders.sort(reverse=True)  # popped in order
+        pending.extend(folders)
+
+
+def read_manifest(path: str) -> Iterator[str]:
+    """Image paths listed in a text file, one per line, or in a CSV file.
+
+    A CSV file has the paths in a "SourceFile" or "path" column, or in its
+    first column. Relative paths are relative to the manifest,
+    blank lines and lines starting with "#" are skipped.
+    """
+    base = os.path.dirname(os.path.abspath(path))
+    with open(path, newline="", encoding="utf-8-sig") as file:
+        if path.lower().endswith(".csv"):
+            lines = _csv_paths(csv.reader(file))
+        else:
+            lines = (line.strip() for line in file)
+
+        for line in lines:
+            if line and not line.startswith("#") and is_image_file(line):
+                yield os.path.join(base, os.path.expanduser(line))
+
+
+def _csv_paths(rows: Iterator[list[str]]) -> Iterator[str]:
+    if (header := next(rows, None)) is None:
+        return
+
+    named = [header.index(name) for name in _MANIFEST_COLUMNS if name in header]
+    if not named:
+        rows = chain([header], rows)  # no header, just paths
+    column = named[0] if named else 0
+
+    for row in rows:
+        if len(row) > column:
+            yield row[column].strip()
@@ -0,0 +1,187 @@
+import threading
+from collections import OrderedDict
+from collections.abc import Sequence
+
+from PIL import Image
+
+from filminfo.models.images import Quality, decode_thumbnail
+
+
+TileKey = tuple[int, int, int]  # level, column, row
+
+
+class ImagePyramid:
+    """Tiles of an image at halving resolutions, decoded on demand.
+
+    Level 0 is the full image, each further level halves it, down to one
+    that fits into a single tile. A level is only decoded once one of its
+    tiles is asked for, with the same shortcuts as thumbnails (JPEG DCT
+    scaling, reduced TIFF subfiles). Up to `kept_levels` decoded levels and
+    the most recently used tiles are kept in memory, together within
+    `max_bytes`; levels are let go first. A level too big for the budget
+    isn't kept at all, the tiles nearest to those asked for are cut from
+    it as well, as many as fit, so that panning on doesn't decode it again
+    right away. Safe to use from several threads.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        tile_size: int = 256,
+        max_bytes: int = 64 * 1024 * 1024,
+        quality: Quality = Quality.BALANCED,
+        kept_levels: int = 2,
+    ):
+        with Image.open(path) as image:
+            self._size = image.size
+
+        self._path = path
+        self._tile_size = tile_size
+        self._max_bytes = max_bytes
+        self._quality = quality
+        self._kept_levels = kept_levels
+        self._lock = threading.Lock()
+        self._level_images: OrderedDict[int, Image.Image] = OrderedDict()
+        self._tiles: OrderedDict[TileKey, Image.Image] = OrderedDict()
+        self._bytes = 0  # of the kept levels and tiles
+
+        levels = 1
+        while max(self.level_size(levels - 1)) > tile_size:
+            levels += 1
+        self._levels = levels
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def size(self) -> tuple[int, int]:
+        return self._size
+
+    @property
+    def levels(self) -> int:
+        return self._levels
+
+    @property
+    def tile_size(self) -> int:
+        return self._tile_size
+
+    def level_size(self, level: int) -> tuple[int, int]:
+        width, height = self._size
+        scale = 1 << level
+        return max(1, -(-width // scale)), max(1, -(-height // scale))
+
+    def level_for(self, scale: float) -> int:
+        """Coarsest level with at least `scale` times the original pixels."""
+        level = 0
+        while level + 1 < self._levels and scale * (2 << level) <= 1:
+            level += 1
+        return level
+
+    def tile_grid(self, level: int) -> tuple[int, int]:
+        width, height = self.level_size(level)
+        return -(-width // self._tile_size), -(-height // self._tile_size)
+
+    def cached_tile(self, level: int, column: int, row: int) -> Image.Image | None:
+        with self._lock:
+            if (tile := self._tiles.get((level, column, row))) is not None:
+                self._tiles.move_to_end((level, column, row))
+            return tile
+
+    def tile(self, level: int, column: int, row: int) -> Image.Image:
+        """The tile, decoding its level first if it isn't kept."""
+        return self.tiles(level, [(column, row)])[0]
+
+    def tiles(self, level: int, places: Sequence[tuple[int, int]]) -> list[Image.Image]:
+        """The tiles at the columns and rows, decoding their level at most once."""
+        tiles: dict[TileKey, Image.Image] = {}
+        missing: list[TileKey] = []
+        for column, row in places:
+            if (tile := self.cached_tile(level, column, row)) is not None:
+                tiles[(level, column, row)] = tile
+            else:
+                missing.append((level, column, row))
+
+        if missing:
+            image, decoded = self._level_image(level)
+            cut = {key: self._cut(image, key) for key in missing}
+            tiles.update(cut)
+            if decoded and _image_bytes(image) > self._max_bytes:
+                room = self._max_bytes - sum(map(_image_bytes, cut.values()))
+                # the farthest first, so that they are evicted first
+                around = self._around(image, level, missing, room)
+                cut = {key: self._cut(image, key) for key in reversed(around)} | cut
+            with self._lock:
+                for key, tile in cut.items():
+                    if key not in self._tiles:
+                        self._tiles[key] = tile
+                        self._bytes += _image_bytes(tile)
+                if decoded and level not in self._level_images:
+                    self._level_images[level] = image
+                    self._bytes += _image_bytes(image)
+                self._evict()
+        return [tiles[(level, column, row)] for column, row in places]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._level_images.clear()
+            self._tiles.clear()
+            self._bytes = 0
+
+    def _level_image(self, level: int) -> tuple[Image.Image, bool]:
+        """The level's image, and whether it had to be decoded."""
+        with self._lock:
+            if (image := self._level_images.get(level)) is not None:
+                self._level_images.move_to_end(level)
+                return image, False
+
+        image = decode_thumbnail(self._path, *self.level_size(level), self._quality)
+        if image.mode not in ("1", "L", "RGB", "RGBA"):
+            image = image.convert("RGB")
+        return image, True
+
+    def _cut(self, image: Image.Image, key: TileKey) -> Image.Image:
+        _, column, row = key
+        left, top = column * self._tile_size, row * self._tile_size
+        return image.crop(
+            (
+                left,
+                top,
+                min(left + self._tile_size, image.width),
+                min(top + self._tile_size, image.height),
+            )
+        )
+
+    def _around(
+        self, image: Image.Image, level: int, keys: list[TileKey], room: int
+    ) -> list[TileKey]:
+        """Other tiles of the level nearest to `keys`, as many as fit in `room`."""
+        column = sum(column for _, column, _ in keys) / len(keys)
+        row = sum(row for _, _, row in keys) / len(keys)
+        columns, rows = self.tile_grid(level)
+        others = sorted(
+            (
+                (level, other_column, other_row)
+                for other_column in range(columns)
+                for other_row in range(rows)
+                if (level, other_column, other_row) not in keys
+            ),
+            key=lambda key: max(abs(key[1] - column), abs(key[2] - row)),
+        )
+        tile_bytes = self._tile_size**2 * len(image.getbands())
+        return others[: max(0, room // tile_bytes)]
+
+    def _evict(self) -> None:
+        # levels go first, the tiles just cut from one are still wanted
+        while self._level_images and (
+            self._bytes > self._max_bytes or len(self._level_images) > self._kept_levels
+        ):
+            _, evicted = self._level_images.popitem(last=False)
+            self._bytes -= _image_bytes(evicted)
+        while self._bytes > self._max_bytes and len(self._tiles) > 1:
+            _, evicted = self._tiles.popitem(last=False)
+            self._bytes -= _image_bytes(evicted)
+
+
+def _image_bytes(image: Image.Image) -> int:
+    return image.width * image.height * len(image.getbands())
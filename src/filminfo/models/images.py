@@ -0,0 +1,185 @@
+from collections.abc import Sequence
+from enum import Enum
+from io import BytesIO
+
+from PIL import Image, ImageFile, TiffImagePlugin
+
+
+class Quality(Enum):
+    FAST = "fast"
+    BALANCED = "balanced"
+    BEST = "best"
+
+
+# Resampling filter, and how much larger than the target the image is left
+# by the cheap steps (JPEG DCT scaling, integer reduce()) before resampling.
+_RESAMPLING = {
+    Quality.FAST: (Image.Resampling.BILINEAR, 1.0),
+    Quality.BALANCED: (Image.Resampling.BICUBIC, 2.0),
+    Quality.BEST: (Image.Resampling.LANCZOS, 3.0),
+}
+
+# NewSubfileType flag of a reduced resolution version of the image
+_NEW_SUBFILE_TYPE = 254
+_REDUCED_RESOLUTION = 1
+
+# EXIF thumbnails are sometimes letterboxed to 4:3, those are not used
+_ASPECT_TOLERANCE = 0.02
+
+
+def decode_thumbnail(
+    path: str, width: int, height: int, quality: Quality = Quality.BALANCED
+) -> Image.Image:
+    """Open an image and scale it down to fit into width x height.
+
+    Decodes as few pixels as possible: JPEGs are DCT scaled while decoding,
+    TIFFs use an embedded thumbnail or reduced resolution subfile when one
+    is big enough, anything else is shrunk with reduce() first. The image
+    is fully loaded and its file closed, so the result can be passed
+    between threads or processes.
+    """
+    with Image.open(path) as image:
+        size = _target_size(image.size, width, height)
+        if size == image.size:
+            image.load()
+            return image
+
+        resample, reducing_gap = _RESAMPLING[quality]
+        source: Image.Image = image
+        _draft(image, size, reducing_gap)
+        if isinstance(image, TiffImagePlugin.TiffImageFile):
+            source = _reduced_source(image, size)
+
+        return _resize(source, size, resample, reducing_gap)
+
+
+def decode_preview(
+    path: str,
+    previews: Sequence[bytes],
+    width: int,
+    height: int,
+    quality: Quality = Quality.BALANCED,
+) -> Image.Image | None:
+    """Thumbnail from the first embedded preview that is big enough.
+
+    `previews` are the encoded preview images of the file, smallest first.
+    Returns None if none of them can stand in for the image itself.
+    """
+    try:
+        with Image.open(path) as image:
+            image_size: tuple[int, int] | None = image.size
+    except OSError:
+        image_size = None  # e.g. raw files, the previews are all there is
+
+    resample, reducing_gap = _RESAMPLING[quality]
+    chosen: tuple[Image.Image, tuple[int, int]] | None = None
+    for data in previews:
+        try:
+            preview = Image.open(BytesIO(data))
+        except OSError:
+            continue
+
+        if image_size is None:
+            # nothing to compare with, the first one that has to be scaled
+            # down will do, otherwise the biggest
+            size = _target_size(preview.size, width, height)
+            chosen = preview, size
+            if size != preview.size:
+                break
+            continue
+
+        size = _target_size(image_size, width, height)
+        aspect = image_size[0] / image_size[1]
+        if (
+            preview.width >= size[0]
+            and preview.height >= size[1]
+            and abs(preview.width / preview.height - aspect) < _ASPECT_TOLERANCE
+        ):
+            chosen = preview, size
+            break
+
+    if chosen is None:
+        return None
+
+    source, size = chosen
+    try:
+        _draft(source, size, reducing_gap)
+        return _resize(source, size, resample, reducing_gap)
+    except (OSError, ValueError):
+        return None  # truncated preview
+
+
+def _target_size(size: tuple[int, int], width: int, height: int) -> tuple[int, int]:
+    image_width, image_height = size
+    if image_width <= width and image_height <= height:
+        return size
+
+    # fit into a square of the box side matching the image orientation
+    box = height if image_width < image_height else width
+    scale = min(box / image_width, box / image_height)
+    return max(1, round(image_width * scale)), max(1, round(image_height * scale))
+
+
+def _draft(image: Image.Image, size: tuple[int, int], reducing_gap: float) -> None:
+    if image.format == "JPEG":
+        image.draft(None, (int(size[0] * reducing_gap), int(size[1] * reducing_gap)))
+
+
+def _reduced_source(
+    image: TiffImagePlugin.TiffImageFile, size: tuple[int, int]
+) -> Image.Image:
+    """Smallest embedded version of a TIFF that is still big enough."""
+
+    def usable(candidate: tuple[int, int]) -> bool:
+        candidate_width, candidate_height = candidate
+        return (
+            candidate_width >= size[0]
+            and candidate_height >= size[1]
+            and abs(candidate_width / candidate_height - aspect) < _ASPECT_TOLERANCE
+        )
+
+    aspect = image.width / image.height
+    children: list[ImageFile.ImageFile] = []
+    try:
+        children = ImageFile.ImageFile.get_child_images(image)
+    except (OSError, ValueError):
+        pass  # broken sub-IFDs, use the main image
+
+    source: Image.Image = min(
+        (child for child in children if usable(child.size)),
+        key=lambda child: child.width,
+        default=image,
+    )
+
+    # only the frame headers are read here, pixels are decoded for the pick
+    frame = None
+    smallest = source.width
+    for index in range(1, getattr(image, "n_frames", 1)):
+        image.seek(index)
+        reduced = image.tag_v2.get(_NEW_SUBFILE_TYPE, 0) & _REDUCED_RESOLUTION
+        if reduced and usable(image.size) and image.width < smallest:
+            frame, smallest = index, image.width
+
+    if frame is not None:
+        image.seek(frame)
+        source = image.copy()
+    image.seek(0)
+
+    return source
+
+
+def _resize(
+    image: Image.Image,
+    size: tuple[int, int],
+    resample: Image.Resampling,
+    reducing_gap: float,
+) -> Image.Image:
+    factor_x = max(1, int(image.width / size[0] / reducing_gap))
+    factor_y = max(1, int(image.height / size[1] / reducing_gap))
+    if factor_x > 1 or factor_y > 1:
+        try:
+            image = image.reduce((factor_x, factor_y))
+        except ValueError:
+            pass  # mode without reduce() support, e.g. some 16-bit TIFFs
+
+    return image.resize(size, resample)
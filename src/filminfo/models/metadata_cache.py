@@ -0,0 +1,159 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+
+Metadata = dict[str, Any]
+FileIdentity = tuple[int, int, int]
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+
+
+class MetadataCache:
+    """On-disk cache of parsed ExifTool metadata.
+
+    Entries are keyed by path and only valid while the file keeps the same
+    size, mtime_ns and inode. The least recently used entries are evicted
+    once the stored metadata exceeds `max_bytes`.
+    """
+
+    def __init__(self, database: Path, max_bytes: int):
+        self._database = database
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._stats = CacheStats()
+
+        try:
+            self._connection = self._connect()
+        except sqlite3.DatabaseError:
+            database.unlink(missing_ok=True)
+            self._connection = self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        self._database.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self._database, check_same_thread=False)
+        connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS metadata (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                inode INTEGER NOT NULL,
+                data TEXT NOT NULL,
+                bytes INTEGER NOT NULL,
+                accessed REAL NOT NULL
+            )
+            """
+        )
+        connection.execute(
+            "CREATE INDEX IF NOT EXISTS metadata_accessed ON metadata (accessed)"
+        )
+        connection.commit()
+        return connection
+
+    def lookup(
+        self, paths: Sequence[str]
+    ) -> tuple[dict[str, Metadata], dict[str, FileIdentity | None]]:
+        """Split paths into cached metadata and identities of the files to read."""
+        hits: dict[str, Metadata] = {}
+        misses: dict[str, FileIdentity | None] = {}
+        identities = {path: file_identity(path) for path in paths}
+
+        with self._lock:
+            for batch in _batches(list(identities)):
+                rows = self._connection.execute(
+                    "SELECT path, size, mtime_ns, inode, data FROM metadata "
+                    f"WHERE path IN ({','.join('?' * len(batch))})",
+                    batch,
+                ).fetchall()
+                for path, size, mtime_ns, inode, data in rows:
+                    if identities[path] == (size, mtime_ns, inode):
+                        hits[path] = json.loads(data)
+
+            now = time.time()
+            with self._connection:
+                self._connection.executemany(
+                    "UPDATE metadata SET accessed = ? WHERE path = ?",
+                    [(now, path) for path in hits],
+                )
+
+            for path, identity in identities.items():
+                if path not in hits:
+                    misses[path] = identity
+
+            self._stats.hits += len(hits)
+            self._stats.misses += len(paths) - len(hits)
+
+        return hits, misses
+
+    def store(self, entries: Iterable[tuple[str, FileIdentity, Metadata]]) -> None:
+        now = time.time()
+        rows = []
+        for path, identity, metadata in entries:
+            data = json.dumps(metadata, ensure_ascii=False)
+            rows.append((path, *identity, data, len(data.encode()), now))
+
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO metadata VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            self._evict()
+
+    def invalidate(self, paths: Iterable[str]) -> None:
+        with self._lock, self._connection:
+            for batch in _batches(list(paths)):
+                self._connection.execute(
+                    "DELETE FROM metadata "
+                    f"WHERE path IN ({','.join('?' * len(batch))})",
+                    batch,
+                )
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    @property
+    def stats(self) -> CacheStats:
+        return CacheStats(self._stats.hits, self._stats.misses)
+
+    def _evict(self) -> None:
+        (total,) = self._connection.execute(
+            "SELECT COALESCE(SUM(bytes), 0) FROM metadata"
+        ).fetchone()
+        if total <= self._max_bytes:
+            return
+
+        evicted = []
+        for path, size in self._connection.execute(
+            "SELECT path, bytes FROM metadata ORDER BY accessed"
+        ):
+            if total <= self._max_bytes:
+                break
+            evicted.append((path,))
+            total -= size
+
+        self._connection.executemany("DELETE FROM metadata WHERE path = ?", evicted)
+
+
+def file_identity(path: str) -> FileIdentity | None:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+
+    return stat.st_size, stat.st_mtime_ns, stat.st_ino
+
+
+def _batches(items: list[str], size: int = 500) -> Iterable[list[str]]:
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
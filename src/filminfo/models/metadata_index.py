@@ -0,0 +1,133 @@
+import re
+import threading
+from collections.abc import Iterable, Sequence
+
+
+Row = tuple[str, str, str]  # group, tag, value
+
+# characters that make a query a regular expression rather than plain text
+_REGEX_CHARS = frozenset(r".^$*+?{}[]\|()")
+_WORD = re.compile(r"\w+")
+# between the columns of a row's text, not part of any metadata
+_SEPARATOR = "\0"
+# rows checked between looking whether the search was cancelled
+_CHUNK = 10_000
+
+
+def is_plain(query: str) -> bool:
+    return _REGEX_CHARS.isdisjoint(query)
+
+
+def narrows(query: str, previous: str) -> bool:
+    """Whether every row matching `query` also matches `previous`."""
+    return (
+        bool(previous)
+        and is_plain(query)
+        and is_plain(previous)
+        and previous.lower() in query.lower()
+    )
+
+
+class MetadataIndex:
+    """Lower-cased text of metadata rows, to filter them by a query.
+
+    Rows are numbered in the order they are added. A plain query matches
+    the rows with a group, tag or value containing it, anything else is a
+    case insensitive regular expression searched in each of them. With
+    `tokens`, an inverted index of the words in the rows narrows plain
+    queries down to the rows with fitting words before they are checked,
+    at the cost of memory. Rows may be added while another thread searches.
+    """
+
+    def __init__(self, tokens: bool = False):
+        self._texts: list[str] = []
+        # word -> numbers of the rows containing it
+        self._tokens: dict[str, list[int]] | None = {} if tokens else None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def add(self, rows: Iterable[Row]) -> range:
+        """Index the rows, returns their numbers."""
+        texts = [_SEPARATOR.join(row).lower() for row in rows]
+        with self._lock:
+            start = len(self._texts)
+            self._texts.extend(texts)
+            if self._tokens is not None:
+                for number, text in enumerate(texts, start):
+                    for word in set(_WORD.findall(text)):
+                        self._tokens.setdefault(word, []).append(number)
+        return range(start, start + len(texts))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._texts = []
+            if self._tokens is not None:
+                self._tokens = {}
+
+    def search(
+        self,
+        query: str,
+        within: Sequence[int] | None = None,
+        cancelled: threading.Event | None = None,
+    ) -> list[int] | None:
+        """Numbers of the rows matching the query, in order.
+
+        Only the rows `within` are checked if given, e.g. those found for
+        a query this one narrows. None if `cancelled` was set meanwhile.
+        """
+        texts = self._texts
+        plain = is_plain(query)
+        needle = query.lower()
+        if within is None:
+            candidates = self._candidates(needle) if plain else None
+            within = range(len(texts)) if candidates is None else candidates
+
+        search = re.compile(query, re.IGNORECASE).search
+        found: list[int] = []
+        for start in range(0, len(within), _CHUNK):
+            if cancelled is not None and cancelled.is_set():
+                return None
+            chunk = within[start : start + _CHUNK]
+            if plain:
+                found.extend(number for number in chunk if needle in texts[number])
+            else:
+                found.extend(
+                    number
+                    for number in chunk
+                    if any(map(search, texts[number].split(_SEPARATOR)))
+                )
+        return found
+
+    def _candidates(self, needle: str) -> list[int] | None:
+        # a row containing the needle has, for each of its words, a word
+        # that equals it, or starts or ends with it at the needle's edges
+        if self._tokens is None or not (words := list(_WORD.finditer(needle))):
+            return None
+
+        with self._lock:
+            tokens = list(self._tokens.items())
+
+        found: set[int] | None = None
+        for word in words:
+            text = word.group()
+            starts = word.start() > 0
+            ends = word.end() < len(needle)
+            if starts and ends:
+                fitting = (token == text for token, _ in tokens)
+            elif starts:
+                fitting = (token.startswith(text) for token, _ in tokens)
+            elif ends:
+                fitting = (token.endswith(text) for token, _ in tokens)
+            else:
+                fitting = (text in token for token, _ in tokens)
+
+            rows: set[int] = set()
+            for fits, (_, numbers) in zip(fitting, tokens):
+                if fits:
+                    rows.update(numbers)
+            found = rows if found is None else found & rows
+            if not found:
+                break
+        return sorted(found or ())
@@ -0,0 +1,242 @@
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+from io import BytesIO
+from pathlib import Path
+
+from PIL import Image
+
+from filminfo.models.images import Quality, decode_thumbnail
+from filminfo.models.metadata_cache import CacheStats
+
+
+# key, offset in the pack, length, flags, last access (ns)
+_RECORD = struct.Struct("<16sQIIQ")
+_KEY_SIZE = 16
+_LIVE = 0
+
+# Compacting keeps the most recent entries up to this share of the budget,
+# so that the pack isn't rewritten on every new entry once it is full.
+_COMPACT_RATIO = 0.75
+
+_PNG_MODES = {"1", "L", "LA", "I", "I;16", "P", "RGB", "RGBA"}
+
+
+class ThumbnailCache:
+    """Downscaled images stored on disk.
+
+    Images are appended as PNG to a pack file. The index file has a fixed
+    size record per image pointing into the pack; it is memory mapped, so a
+    lookup only touches one record. Entries are keyed by the path, size and
+    mtime of the file and the requested thumbnail size and quality. Once the
+    pack grows over `max_bytes` the least recently used entries are dropped
+    and the pack is rewritten.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int):
+        directory.mkdir(parents=True, exist_ok=True)
+        self._pack_path = directory / "thumbnails.pack"
+        self._index_path = directory / "thumbnails.idx"
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._stats = CacheStats()
+        self._map: mmap.mmap | None = None
+        self._slots: dict[bytes, int] = {}
+
+        self._open()
+        if not self._load_index():
+            self._close_files()
+            self._pack_path.unlink(missing_ok=True)
+            self._index_path.unlink(missing_ok=True)
+            self._open()
+
+    def get(
+        self, path: str, width: int, height: int, quality: Quality = Quality.BALANCED
+    ) -> Image.Image | None:
+        if (key := _cache_key(path, width, height, quality)) is None:
+            return None
+
+        with self._lock:
+            if (slot := self._slots.get(key)) is None:
+                self._stats.misses += 1
+                return None
+
+            _, offset, length, _, _ = self._record(slot)
+            self._pack.seek(offset)
+            data = self._pack.read(length)
+            self._touch(slot)
+            self._stats.hits += 1
+
+        try:
+            if data[:_KEY_SIZE] != key:
+                raise ValueError("Thumbnail cache entry doesn't match its index")
+            image = Image.open(BytesIO(data[_KEY_SIZE:]))
+            image.load()
+            return image
+        except (OSError, ValueError):
+            with self._lock:
+                self._slots.pop(key, None)
+                self._stats.hits -= 1
+                self._stats.misses += 1
+            return None
+
+    def put(
+        self,
+        path: str,
+        width: int,
+        height: int,
+        image: Image.Image,
+        quality: Quality = Quality.BALANCED,
+    ) -> None:
+        if (key := _cache_key(path, width, height, quality)) is None:
+            return
+
+        buffer = BytesIO()
+        buffer.write(key)
+        if image.mode not in _PNG_MODES:
+            image = image.convert("RGB")
+        image.save(buffer, format="PNG", compress_level=1)
+        data = buffer.getvalue()
+        if len(data) > self._max_bytes * _COMPACT_RATIO:
+            return
+
+        with self._lock:
+            if key in self._slots:
+                return
+
+            offset = self._pack.seek(0, os.SEEK_END)
+            if offset + len(data) > self._max_bytes:
+                self._compact(int(self._max_bytes * _COMPACT_RATIO) - len(data))
+                offset = self._pack.seek(0, os.SEEK_END)
+
+            self._pack.write(data)
+            self._pack.flush()
+            slot = self._index.seek(0, os.SEEK_END) // _RECORD.size
+            self._index.write(
+                _RECORD.pack(key, offset, len(data), _LIVE, time.time_ns())
+            )
+            self._index.flush()
+            self._remap()
+            self._slots[key] = slot
+
+    def contains(
+        self, path: str, width: int, height: int, quality: Quality = Quality.BALANCED
+    ) -> bool:
+        if (key := _cache_key(path, width, height, quality)) is None:
+            return False
+
+        with self._lock:
+            return key in self._slots
+
+    def load(
+        self, path: str, width: int, height: int, quality: Quality = Quality.BALANCED
+    ) -> Image.Image:
+        """Cached thumbnail of the image, decoded and stored on a miss."""
+        if (image := self.get(path, width, height, quality)) is not None:
+            return image
+
+        image = decode_thumbnail(path, width, height, quality)
+        self.put(path, width, height, image, quality)
+        return image
+
+    def close(self) -> None:
+        with self._lock:
+            self._close_files()
+
+    @property
+    def stats(self) -> CacheStats:
+        return CacheStats(self._stats.hits, self._stats.misses)
+
+    def _open(self) -> None:
+        self._pack_path.touch(exist_ok=True)
+        self._index_path.touch(exist_ok=True)
+        # kept open for the cache's lifetime, close() releases them
+        self._pack = open(self._pack_path, "r+b")  # noqa: SIM115
+        self._index = open(self._index_path, "r+b")  # noqa: SIM115
+        self._remap()
+
+    def _close_files(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._pack.close()
+        self._index.close()
+
+    def _remap(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+        if os.fstat(self._index.fileno()).st_size:
+            self._map = mmap.mmap(self._index.fileno(), 0, access=mmap.ACCESS_WRITE)
+
+    def _load_index(self) -> bool:
+        index_size = os.fstat(self._index.fileno()).st_size
+        pack_size = os.fstat(self._pack.fileno()).st_size
+        if index_size % _RECORD.size:
+            return False
+
+        self._slots = {}
+        for slot in range(index_size // _RECORD.size):
+            key, offset, length, flags, _ = self._record(slot)
+            if flags != _LIVE:
+                continue
+            if offset + length > pack_size:
+                return False
+            self._slots[key] = slot
+
+        return True
+
+    def _record(self, slot: int) -> tuple[bytes, int, int, int, int]:
+        assert self._map is not None
+        return _RECORD.unpack_from(self._map, slot * _RECORD.size)
+
+    def _touch(self, slot: int) -> None:
+        assert self._map is not None
+        key, offset, length, flags, _ = self._record(slot)
+        _RECORD.pack_into(
+            self._map, slot * _RECORD.size, key, offset, length, flags, time.time_ns()
+        )
+
+    def _compact(self, budget: int) -> None:
+        """Rewrite the pack with the most recently used entries only."""
+        records = sorted(
+            (self._record(slot) for slot in self._slots.values()),
+            key=lambda record: record[4],
+            reverse=True,
+        )
+
+        pack_tmp = self._pack_path.with_suffix(".pack.tmp")
+        index_tmp = self._index_path.with_suffix(".idx.tmp")
+        slots: dict[bytes, int] = {}
+        with open(pack_tmp, "wb") as pack, open(index_tmp, "wb") as index:
+            for key, offset, length, flags, accessed in records:
+                if pack.tell() + length > budget:
+                    break
+                self._pack.seek(offset)
+                new_offset = pack.tell()
+                pack.write(self._pack.read(length))
+                index.write(_RECORD.pack(key, new_offset, length, flags, accessed))
+                slots[key] = len(slots)
+
+        # The pack goes first; a crash in between leaves an index whose
+        # entries fail the key check and are treated as misses.
+        self._close_files()
+        os.replace(pack_tmp, self._pack_path)
+        os.replace(index_tmp, self._index_path)
+        self._open()
+        self._slots = slots
+
+
+def _cache_key(path: str, width: int, height: int, quality: Quality) -> bytes | None:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+
+    identity = f"{os.path.abspath(path)}\0{stat.st_size}\0{stat.st_mtime_ns}"
+    text = f"{identity}\0{width}x{height}\0{quality.value}"
+    return hashlib.blake2b(text.encode(), digest_size=_KEY_SIZE).digest()
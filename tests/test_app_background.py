@@ -0,0 +1,127 @@
+from concurrent.futures import Future
+
+from filminfo.app.app import App
+from filminfo.models.exiftool_session import Batch
+
+
+class _Widget:
+    def configure(self, **options):
+        pass
+
+    def set_busy(self, busy):
+        pass
+
+    def set_progress(self, done, total):
+        pass
+
+    def clear_progress(self):
+        pass
+
+
+class _InlineExecutor:
+    # finishes the task before submit() returns, like a very fast one
+    def submit(self, task, *args):
+        future = Future()
+        future.set_result(task(*args))
+        return future
+
+
+class _Controller:
+    def __init__(self):
+        self.batches = []
+
+    def failed_images(self, images, batch):
+        self.batches.append(batch)
+        return []
+
+    def stream_metadata(self, images, batch):
+        yield None, [{"SourceFile": image} for image in images]
+
+    def file_results(self, batch):
+        self.batches.append(batch)
+        return []
+
+    def metadata_cache_stats(self):
+        return None
+
+
+class _MetadataView:
+    def __init__(self):
+        self.metadata = []
+
+    def clear(self):
+        self.metadata = []
+
+    def add_metadata(self, metadata):
+        self.metadata.extend(metadata)
+
+
+class _App:
+    _call_exiftool = App._call_exiftool
+    _run_in_background = App._run_in_background
+    _display_metadata = App._display_metadata
+    _file_errors = App._file_errors
+    selected_images = ["a.jpg", "b.jpg"]
+
+    def __init__(self):
+        self._batch = None
+        self._button_execute = self._button_cancel = _Widget()
+        self._form_remove_metadata = self._gallery = _Widget()
+        self._executor = _InlineExecutor()
+        self._exiftool_controller = _Controller()
+        self._metadata_view = _MetadataView()
+        self.replies = []
+        self.scheduled = []
+
+    def after(self, delay, callback):
+        self.scheduled.append(callback)
+
+    def _show_reply(self, reply, showmessage):
+        self.replies.append(reply)
+
+    def run_scheduled(self):
+        while self.scheduled:
+            self.scheduled.pop(0)()
+
+
+def test_fast_task_sees_its_batch():
+    app = _App()
+    ran = []
+
+    def action(images, batch):
+        ran.append(batch)
+        return None, "done"
+
+    app._call_exiftool(["a.jpg"], action)
+    assert app.replies == []
+    assert app._batch is ran[0]
+
+    app.run_scheduled()
+    assert app.replies == [(None, "done")]
+    assert app._exiftool_controller.batches == ran
+    assert app._batch is None
+
+
+def test_given_batch_is_used():
+    app = _App()
+    batch = Batch()
+    results = []
+
+    assert app._run_in_background(lambda b: b, results.append, batch=batch) is batch
+    app.run_scheduled()
+    assert results == [batch]
+
+
+def test_fast_metadata_read_sees_its_batch():
+    app = _App()
+
+    app._display_metadata()
+    batch = app._batch
+    app.run_scheduled()
+
+    assert app._metadata_view.metadata == [
+        {"SourceFile": "a.jpg"},
+        {"SourceFile": "b.jpg"},
+    ]
+    assert app._exiftool_controller.batches == [batch]
+    assert batch.progress == (2, 2)
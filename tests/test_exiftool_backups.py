@@ -0,0 +1,40 @@
+from filminfo.models.exiftool import ExifTool
+from filminfo.models.exiftool_session import Batch, BatchCancelled
+
+
+class _NoPool:
+    size = 1
+    binary = "exiftool"
+
+
+def _images_with_backups(tmp_path, count):
+    images = []
+    for idx in range(count):
+        image = tmp_path / f"{idx}.jpg"
+        image.write_bytes(b"image")
+        (tmp_path / f"{idx}.jpg_original").write_bytes(b"backup")
+        images.append(str(image))
+    return images
+
+
+def test_clean_backups_advances_the_batch(tmp_path):
+    images = _images_with_backups(tmp_path, 3)
+    batch = Batch()
+
+    error, message = ExifTool(_NoPool()).clean_backups(images, False, batch)
+
+    assert error is None
+    assert message == "3 backup files deleted"
+    assert batch.progress == (3, 3)
+    assert not list(tmp_path.glob("*_original"))
+
+
+def test_cancelled_clean_up_stops(tmp_path):
+    images = _images_with_backups(tmp_path, 3)
+    batch = Batch()
+    batch.cancel()
+
+    error, _ = ExifTool(_NoPool()).clean_backups(images, False, batch)
+
+    assert isinstance(error, BatchCancelled)
+    assert len(list(tmp_path.glob("*_original"))) == 3
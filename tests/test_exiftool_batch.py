@@ -0,0 +1,61 @@
+from filminfo.models.exiftool import ExifTool
+from filminfo.models.exiftool_session import Batch, SessionResult
+
+
+class _RecordingPool:
+    """Records the batch of every command, reads previews mid-write."""
+
+    size = 1
+    binary = "exiftool"
+
+    def __init__(self):
+        self.exiftool: ExifTool | None = None
+        self.batches: list[Batch | None] = []
+
+    def map(self, arguments, shards, chunk_size, batch, progress, read_only):
+        self.batches.append(batch)
+        if batch is not None and self.exiftool:
+            # a thumbnail worker asks for previews while the write runs
+            self.exiftool.get_previews(["other.jpg"])
+        files = [file for shard in shards for file in shard]
+        stdout = "[]" if read_only else "    1 image files updated"
+        return [SessionResult(list(arguments.arguments), 0, stdout, "", files)]
+
+
+def test_concurrent_reads_do_not_share_the_write_batch():
+    pool = _RecordingPool()
+    exiftool = ExifTool(pool)
+    pool.exiftool = exiftool
+    batch = Batch()
+
+    error, _ = exiftool.add_metadata(["a.jpg"], {"camera_make": "Nikon"}, batch)
+
+    assert error is None
+    write, previews = pool.batches
+    assert write is batch
+    assert previews is None
+
+
+class _PreviewPool:
+    size = 1
+    binary = "exiftool"
+
+    def __init__(self):
+        self.files: list[str] = []
+
+    def map(self, arguments, shards, chunk_size, batch, progress, read_only):
+        files = [file for shard in shards for file in shard]
+        self.files.extend(files)
+        return [SessionResult(list(arguments.arguments), 0, "[]", "", files)]
+
+
+def test_previews_are_read_on_the_preview_pool():
+    pool = _RecordingPool()
+    previews = _PreviewPool()
+    exiftool = ExifTool(pool, preview_pool=previews)
+
+    error, _ = exiftool.get_previews(["a.jpg"])
+
+    assert error is None
+    assert previews.files == ["a.jpg"]
+    assert pool.batches == []
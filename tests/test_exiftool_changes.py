@@ -0,0 +1,77 @@
+from filminfo.models.exiftool import _Assignment
+
+
+def _assignment(argument):
+    assignment = _Assignment.parse(argument)
+    assert assignment is not None
+    return assignment
+
+
+def test_parse_simple_assignments():
+    assignment = _assignment("-EXIF:Make=Nikon")
+
+    assert (assignment.tag, assignment.value) == ("EXIF:Make", "Nikon")
+    assert _assignment("-ISO=").value == ""
+    assert _assignment("-XMP-dc:Description=a\nb").value == "a\nb"
+
+
+def test_parse_rejects_arguments_which_cannot_be_compared():
+    assert _Assignment.parse("-Keywords+=film") is None
+    assert _Assignment.parse("-Keywords-=film") is None
+    assert _Assignment.parse("-overwrite_original") is None
+
+
+def test_satisfied_by_converted_or_raw_value():
+    assignment = _assignment("-EXIF:ExposureTime=0.004")
+    metadata = {
+        "EXIF:ExifIFD:ExposureTime": "1/250",
+        "EXIF:ExifIFD:ExposureTime#": 0.004,
+    }
+
+    assert assignment.satisfied_by(metadata)
+
+
+def test_satisfied_by_matches_group_and_tag_case_insensitively():
+    metadata = {"EXIF:IFD0:Make": "Nikon"}
+
+    assert _assignment("-exif:make=Nikon").satisfied_by(metadata)
+    assert _assignment("-Make=Nikon").satisfied_by(metadata)
+    assert not _assignment("-XMP:Make=Nikon").satisfied_by(metadata)
+
+
+def test_satisfied_by_requires_exact_values():
+    assert not _assignment("-EXIF:Make=Nikon").satisfied_by({"EXIF:Make": "nikon"})
+    assert not _assignment("-EXIF:Make=Nikon").satisfied_by({"EXIF:Make": "Nikon "})
+    assert not _assignment("-EXIF:FNumber=2.8").satisfied_by(
+        {"EXIF:FNumber": 2.8000001}
+    )
+    assert not _assignment("-EXIF:ISO=400").satisfied_by({"EXIF:ISO": 400.0})
+
+
+def test_satisfied_by_does_not_reformat_dates():
+    date = "-EXIF:DateTimeOriginal=2024:01:31 12:00:00"
+    metadata = {"EXIF:DateTimeOriginal": "2024:01:31 12:00:00+01:00"}
+
+    assert not _assignment(date).satisfied_by(metadata)
+    assert not _assignment("-IPTC:DateCreated=20240131").satisfied_by(
+        {"IPTC:DateCreated": "2024:01:31"}
+    )
+
+
+def test_satisfied_by_list_values():
+    assignment = _assignment("-XMP-dc:Creator=Jane Doe")
+
+    assert assignment.satisfied_by({"XMP:XMP-dc:Creator": ["Jane Doe"]})
+    assert not assignment.satisfied_by({"XMP:XMP-dc:Creator": ["Jane Doe", "Other"]})
+
+
+def test_satisfied_by_missing_tag():
+    assert _assignment("-EXIF:Make=").satisfied_by({})
+    assert not _assignment("-EXIF:Make=Nikon").satisfied_by({})
+
+
+def test_gps_sign_is_compared_through_the_reference():
+    metadata = {"EXIF:GPS:GPSLatitude#": 12.5, "EXIF:GPS:GPSLatitudeRef#": "S"}
+
+    assert _assignment("-EXIF:GPSLatitude=-12.5").satisfied_by(metadata)
+    assert _assignment("-EXIF:GPSLatitudeRef=S").satisfied_by(metadata)
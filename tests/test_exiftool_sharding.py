@@ -0,0 +1,90 @@
+import json
+
+from filminfo.models.exiftool import (
+    RunResult,
+    _merge_results_json,
+    _merge_summaries,
+    _shard_by_size,
+)
+
+
+def _write(path, size):
+    path.write_bytes(b"\0" * size)
+    return str(path)
+
+
+def test_shard_by_size_balances_total_size(tmp_path):
+    images = [
+        _write(tmp_path / f"{idx}.jpg", size)
+        for idx, size in enumerate([100, 10, 60, 40, 50, 50])
+    ]
+
+    shards = _shard_by_size(images, 2)
+
+    sizes = [
+        sum((tmp_path / name).stat().st_size for name in shard) for shard in shards
+    ]
+    assert sizes == [150, 160] or sizes == [160, 150]
+    assert sorted(image for shard in shards for image in shard) == sorted(images)
+
+
+def test_shard_by_size_keeps_order_within_shard(tmp_path):
+    images = [_write(tmp_path / f"{idx}.jpg", 10 * idx + 1) for idx in range(9)]
+
+    for shard in _shard_by_size(images, 3):
+        assert shard == sorted(shard, key=images.index)
+
+
+def test_shard_by_size_never_returns_empty_shards(tmp_path):
+    images = [_write(tmp_path / "a.jpg", 1), _write(tmp_path / "b.jpg", 1)]
+
+    assert len(_shard_by_size(images, 8)) == 2
+    assert _shard_by_size(images, 1) == [images]
+    assert _shard_by_size(images, 0) == [images]
+
+
+def test_shard_by_size_counts_missing_files_as_empty(tmp_path):
+    images = [str(tmp_path / "missing.jpg"), _write(tmp_path / "a.jpg", 5)]
+
+    shards = _shard_by_size(images, 2)
+
+    assert sorted(map(len, shards)) == [1, 1]
+
+
+def test_merge_summaries_adds_up_counts():
+    summaries = [
+        "    1 directories scanned\n    2 image files updated",
+        "    3 image files updated\n    1 image files unchanged",
+    ]
+
+    assert _merge_summaries(summaries).splitlines() == [
+        "1 directories scanned",
+        "    5 image files updated",
+        "    1 image files unchanged",
+    ]
+
+
+def test_merge_summaries_keeps_other_lines_first():
+    summaries = ["Warning: something odd\n    1 image files updated", ""]
+
+    assert _merge_summaries(summaries) == (
+        "Warning: something odd\n    1 image files updated"
+    )
+
+
+def test_merge_results_json_restores_image_order():
+    images = ["a.jpg", "b.jpg", "c.jpg"]
+    results = [
+        RunResult(0, json.dumps([{"SourceFile": "c.jpg"}]), "", ""),
+        RunResult(1, json.dumps([{"SourceFile": "a.jpg"}]), "oops", ""),
+        RunResult(0, "", "", ""),
+    ]
+
+    merged = _merge_results_json(results, images)
+
+    assert [obj["SourceFile"] for obj in json.loads(merged.stdout)] == [
+        "a.jpg",
+        "c.jpg",
+    ]
+    assert merged.returncode == 1
+    assert merged.stderr == "oops"
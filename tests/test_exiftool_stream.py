@@ -0,0 +1,85 @@
+import json
+import ntpath
+import os
+
+from filminfo.models.exiftool import ExifTool
+from filminfo.models.exiftool_session import Batch, FileStatus, SessionResult
+
+
+class _FakePool:
+    """Answers every chunk at once, leaving out the unreadable files."""
+
+    size = 1
+    binary = "exiftool"
+
+    def __init__(self, unreadable=()):
+        self.unreadable = set(unreadable)
+        self.sent: list[list[str]] = []
+
+    def imap(self, arguments, chunks, read_only=False):
+        for chunk in chunks:
+            self.sent.append(list(chunk))
+            records = [{"SourceFile": f} for f in chunk if f not in self.unreadable]
+            stderr = "".join(
+                f"Error: File not found - {f}\n" for f in chunk if f in self.unreadable
+            )
+            returncode = 1 if stderr else 0
+            yield SessionResult([], returncode, json.dumps(records), stderr, chunk)
+
+
+def _files(records):
+    return [obj["SourceFile"] for obj in records]
+
+
+def test_stream_metadata_keeps_order():
+    pool = _FakePool()
+    images = [f"{idx}.jpg" for idx in range(7)]
+
+    replies = list(ExifTool(pool).stream_metadata(images, chunk_size=3))
+
+    assert [error for error, _ in replies] == [None, None, None]
+    assert [f for _, records in replies for f in _files(records)] == images
+
+
+def test_stream_metadata_reports_missing_files_without_draining():
+    pool = _FakePool(unreadable={"1.jpg"})
+    images = [f"{idx}.jpg" for idx in range(9)]
+    batch = Batch()
+
+    replies = ExifTool(pool).stream_metadata(images, chunk_size=3, batch=batch)
+    error, records = next(replies)
+
+    assert error is None
+    assert _files(records) == ["0.jpg", "2.jpg", "3.jpg"]
+    assert len(pool.sent) == 2
+
+    rest = [f for _, records in replies for f in _files(records)]
+    assert rest == ["4.jpg", "5.jpg", "6.jpg", "7.jpg", "8.jpg"]
+    assert [(r.path, r.status) for r in batch.results] == [("1.jpg", FileStatus.ERROR)]
+    assert batch.results[0].message == "File not found"
+
+
+def test_stream_metadata_matches_paths_written_differently(monkeypatch):
+    # as on Windows, where ExifTool answers with forward slashes
+    monkeypatch.setattr(os.path, "normpath", ntpath.normpath)
+    monkeypatch.setattr(os.path, "normcase", ntpath.normcase)
+    pool = _FakePool()
+    images = ["C:\\scans\\0.jpg", "C:\\Scans\\sub\\1.jpg", "C:/scans/2.jpg"]
+    answered = {image: image.replace("\\", "/") for image in images}
+    imap = pool.imap
+
+    def answering(arguments, chunks, read_only=False):
+        for reply in imap(arguments, chunks, read_only):
+            records = json.loads(reply.stdout)
+            for obj in records:
+                obj["SourceFile"] = answered[obj["SourceFile"]]
+            reply.stdout = json.dumps(records)
+            yield reply
+
+    pool.imap = answering
+    batch = Batch()
+
+    replies = list(ExifTool(pool).stream_metadata(images, chunk_size=2, batch=batch))
+
+    assert [f for _, records in replies for f in _files(records)] == images
+    assert batch.results == []
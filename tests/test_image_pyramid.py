@@ -0,0 +1,73 @@
+from PIL import Image
+
+from filminfo.models import image_pyramid
+from filminfo.models.image_pyramid import ImagePyramid
+
+
+LEVEL_0_BYTES = 1024 * 768 * 3
+
+
+def _scan(tmp_path):
+    path = tmp_path / "scan.png"
+    Image.linear_gradient("L").resize((1024, 768)).convert("RGB").save(path)
+    return str(path)
+
+
+def _counting_decodes(monkeypatch):
+    decodes = []
+    decode = image_pyramid.decode_thumbnail
+
+    def counting(path, width, height, quality):
+        decodes.append((width, height))
+        return decode(path, width, height, quality)
+
+    monkeypatch.setattr(image_pyramid, "decode_thumbnail", counting)
+    return decodes
+
+
+def test_tiles_are_cut_from_one_decode(tmp_path, monkeypatch):
+    decodes = _counting_decodes(monkeypatch)
+    pyramid = ImagePyramid(_scan(tmp_path), max_bytes=64 * 1024 * 1024)
+    assert pyramid.levels == 3
+    assert pyramid.tile_grid(0) == (4, 3)
+
+    tiles = pyramid.tiles(0, [(0, 0), (3, 2)])
+    assert [tile.size for tile in tiles] == [(256, 256), (256, 256)]
+    assert decodes == [(1024, 768)]
+
+    # kept, and counted
+    pyramid.tile(0, 1, 1)
+    assert decodes == [(1024, 768)]
+    assert pyramid._bytes == LEVEL_0_BYTES + 3 * 256 * 256 * 3
+
+
+def test_level_over_budget_is_not_kept(tmp_path, monkeypatch):
+    decodes = _counting_decodes(monkeypatch)
+    budget = LEVEL_0_BYTES // 2
+    pyramid = ImagePyramid(_scan(tmp_path), max_bytes=budget)
+
+    pyramid.tiles(0, [(0, 0), (1, 0)])
+    assert pyramid._bytes <= budget
+    assert not pyramid._level_images
+
+    # the nearest tiles that fit were cut too
+    for column, row in [(0, 0), (1, 0), (0, 1), (1, 1), (2, 0), (2, 1)]:
+        assert pyramid.cached_tile(0, column, row) is not None
+    pyramid.tiles(0, [(1, 1), (2, 0), (2, 1)])
+    assert len(decodes) == 1
+
+    assert pyramid.cached_tile(0, 3, 2) is None
+    pyramid.tile(0, 3, 2)
+    assert len(decodes) == 2
+
+
+def test_tiles_evicted_least_recently_used(tmp_path):
+    tile_bytes = 256 * 256 * 3
+    pyramid = ImagePyramid(_scan(tmp_path), max_bytes=2 * tile_bytes)
+
+    pyramid.tiles(0, [(0, 0), (1, 0)])
+    pyramid.cached_tile(0, 0, 0)
+    pyramid.tile(0, 2, 0)
+    assert pyramid.cached_tile(0, 1, 0) is None
+    assert pyramid.cached_tile(0, 0, 0) is not None
+    assert pyramid._bytes == 2 * tile_bytes
@@ -0,0 +1,86 @@
+import json
+import os
+
+from filminfo.models.metadata_cache import MetadataCache, file_identity
+
+
+def _image(tmp_path, name, data=b"image"):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def _store(cache, path, metadata):
+    identity = file_identity(path)
+    assert identity is not None
+    cache.store([(path, identity, metadata)])
+
+
+def test_lookup_returns_stored_metadata(tmp_path):
+    cache = MetadataCache(tmp_path / "cache.sqlite", 1024 * 1024)
+    cached = _image(tmp_path, "a.jpg")
+    other = _image(tmp_path, "b.jpg")
+    _store(cache, cached, {"SourceFile": cached, "EXIF:Make": "Nikon"})
+
+    hits, misses = cache.lookup([cached, other])
+
+    assert hits == {cached: {"SourceFile": cached, "EXIF:Make": "Nikon"}}
+    assert misses == {other: file_identity(other)}
+    assert (cache.stats.hits, cache.stats.misses) == (1, 1)
+
+
+def test_changed_file_is_a_miss(tmp_path):
+    cache = MetadataCache(tmp_path / "cache.sqlite", 1024 * 1024)
+    path = _image(tmp_path, "a.jpg")
+    _store(cache, path, {"SourceFile": path})
+
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    hits, misses = cache.lookup([path])
+    assert hits == {}
+    assert list(misses) == [path]
+
+
+def test_invalidate_drops_entries(tmp_path):
+    cache = MetadataCache(tmp_path / "cache.sqlite", 1024 * 1024)
+    path = _image(tmp_path, "a.jpg")
+    _store(cache, path, {"SourceFile": path})
+
+    cache.invalidate([path, str(tmp_path / "never-cached.jpg")])
+
+    assert cache.lookup([path])[0] == {}
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    paths = [_image(tmp_path, f"{idx}.jpg") for idx in range(3)]
+    entry = len(json.dumps({"SourceFile": paths[0]}).encode())
+    cache = MetadataCache(tmp_path / "cache.sqlite", 2 * entry + entry // 2)
+    for path in paths[:2]:
+        _store(cache, path, {"SourceFile": path})
+    cache.lookup([paths[0]])  # the first one is used again
+
+    _store(cache, paths[2], {"SourceFile": paths[2]})
+
+    hits, _ = cache.lookup(paths)
+    assert sorted(hits) == sorted([paths[0], paths[2]])
+
+
+def test_budget_counts_encoded_bytes(tmp_path):
+    path = _image(tmp_path, "a.jpg")
+    # 100 characters, but 300 bytes in UTF-8
+    metadata = {"SourceFile": "", "Comment": "€" * 100}
+    cache = MetadataCache(tmp_path / "cache.sqlite", 200)
+
+    _store(cache, path, metadata)
+
+    assert cache.lookup([path])[0] == {}
+
+
+def test_corrupt_database_is_recreated(tmp_path):
+    database = tmp_path / "cache.sqlite"
+    database.write_bytes(b"not a database" * 100)
+
+    cache = MetadataCache(database, 1024)
+
+    assert cache.lookup([_image(tmp_path, "a.jpg")])[0] == {}
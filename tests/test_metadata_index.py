@@ -0,0 +1,90 @@
+import threading
+
+import pytest
+
+from filminfo.models.metadata_index import MetadataIndex, is_plain, narrows
+
+
+ROWS = [
+    ("EXIF", "Make", "Nikon"),
+    ("EXIF", "Model", "Nikon F3"),
+    ("XMP", "Description", "Ilford HP5 Plus\npushed to 1600"),
+    ("XMP", "Subject", "harbour, boats"),
+    ("IPTC", "Keywords", "boats"),
+]
+
+
+@pytest.fixture(params=[False, True], ids=["scan", "tokens"])
+def index(request):
+    index = MetadataIndex(tokens=request.param)
+    assert index.add(ROWS) == range(len(ROWS))
+    return index
+
+
+def test_plain_query_is_case_insensitive_substring(index):
+    assert index.search("nikon") == [0, 1]
+    assert index.search("NIKON F") == [1]
+    assert index.search("oat") == [3, 4]
+    assert index.search("hp5 plus") == [2]
+    assert index.search("ikon f3") == [1]
+    assert index.search("canon") == []
+
+
+def test_plain_query_does_not_span_columns(index):
+    assert index.search("modelnikon") == []
+    assert index.search("model nikon") == []
+
+
+def test_regex_matches_each_column(index):
+    assert index.search("^nik") == [0, 1]
+    assert index.search("f3$") == [1]
+    assert index.search("^model$") == [1]
+    assert index.search("make.*nikon") == []
+    assert index.search(r"make\snikon") == []
+    assert index.search(r"exif\s") == []
+
+
+def test_regex_sees_a_multiline_value_as_one(index):
+    assert index.search("^pushed") == []
+    assert index.search(r"plus\npushed") == [2]
+    assert index.search(r"plus$") == []
+
+
+def test_search_within(index):
+    assert index.search("nikon", within=[1, 2]) == [1]
+    assert index.search("boats", within=[]) == []
+
+
+def test_search_cancelled(index):
+    cancelled = threading.Event()
+    cancelled.set()
+    assert index.search("nikon", cancelled=cancelled) is None
+
+
+def test_rows_added_later(index):
+    assert index.add([("EXIF", "Make", "Canon")]) == range(5, 6)
+    assert index.search("canon") == [5]
+    assert len(index) == 6
+
+
+def test_clear(index):
+    index.clear()
+    assert len(index) == 0
+    assert index.search("nikon") == []
+    assert index.add(ROWS[:1]) == range(1)
+    assert index.search("nikon") == [0]
+
+
+def test_is_plain():
+    assert is_plain("nikon f3")
+    assert not is_plain("f3$")
+    assert not is_plain("a|b")
+
+
+def test_narrows():
+    assert narrows("nikon f", "nikon")
+    assert narrows("NIKON", "ikon")
+    assert not narrows("nikon", "nikon f")
+    assert not narrows("nikon", "")
+    assert not narrows("nikon$", "nikon")
+    assert not narrows("nikon", "nik.")
@@ -0,0 +1,71 @@
+from filminfo.app.selection import Selection
+
+
+def _selection(flags):
+    selection = Selection()
+    selection.assign(flags)
+    return selection
+
+
+def _flags(selection):
+    return [selection[index] for index in range(len(selection))]
+
+
+def test_extend_adds_unselected_positions():
+    selection = _selection([True])
+
+    selection.extend(2)
+
+    assert _flags(selection) == [True, False, False]
+    assert selection.count == 1
+
+
+def test_toggle_updates_the_count():
+    selection = Selection()
+    selection.reset(3)
+
+    assert selection.toggle(1) is True
+    assert selection.count == 1
+    assert selection.toggle(1) is False
+    assert selection.count == 0
+
+
+def test_select_range_counts_only_newly_selected():
+    selection = _selection([False, True, False, False, True])
+
+    selection.select_range(1, 4)
+
+    assert _flags(selection) == [False, True, True, True, True]
+    assert selection.count == 4
+
+
+def test_select_all_clear_and_invert():
+    selection = _selection([True, False, False])
+
+    selection.invert()
+    assert _flags(selection) == [False, True, True]
+    assert selection.count == 2
+
+    selection.select_all()
+    assert selection.count == 3
+
+    selection.clear()
+    assert _flags(selection) == [False, False, False]
+    assert selection.count == 0
+
+
+def test_selected_and_unselected_items():
+    selection = _selection([True, False, True])
+    items = ["a", "b", "c"]
+
+    assert list(selection.selected(items)) == ["a", "c"]
+    assert list(selection.unselected(items)) == ["b"]
+
+
+def test_reset_resizes_and_clears():
+    selection = _selection([True, True])
+
+    selection.reset(4)
+
+    assert len(selection) == 4
+    assert selection.count == 0
@@ -0,0 +1,110 @@
+import os
+import random
+
+from PIL import Image
+
+from filminfo.models.images import Quality
+from filminfo.models.thumbnail_cache import ThumbnailCache
+
+
+def _noise(seed, size=(64, 64)):
+    data = random.Random(seed).randbytes(size[0] * size[1] * 3)
+    return Image.frombytes("RGB", size, data)
+
+
+def _source(tmp_path, name):
+    path = tmp_path / name
+    path.write_bytes(name.encode())
+    return str(path)
+
+
+def _pack_with(directory, image):
+    # size of one entry in the pack
+    cache = ThumbnailCache(directory, 10 * 1024 * 1024)
+    cache.put(_source(directory.parent, "probe.jpg"), 64, 64, image)
+    cache.close()
+    return directory / "thumbnails.pack"
+
+
+def test_put_and_get(tmp_path):
+    cache = ThumbnailCache(tmp_path / "cache", 10 * 1024 * 1024)
+    path = _source(tmp_path, "a.jpg")
+    image = _noise(1)
+
+    cache.put(path, 64, 64, image)
+
+    cached = cache.get(path, 64, 64)
+    assert cached is not None
+    assert cached.tobytes() == image.tobytes()
+    assert (cache.stats.hits, cache.stats.misses) == (1, 0)
+
+
+def test_key_covers_size_and_quality(tmp_path):
+    cache = ThumbnailCache(tmp_path / "cache", 10 * 1024 * 1024)
+    path = _source(tmp_path, "a.jpg")
+    cache.put(path, 64, 64, _noise(1))
+
+    assert cache.get(path, 32, 32) is None
+    assert cache.get(path, 64, 64, Quality.FAST) is None
+
+
+def test_modified_file_is_a_miss(tmp_path):
+    cache = ThumbnailCache(tmp_path / "cache", 10 * 1024 * 1024)
+    path = _source(tmp_path, "a.jpg")
+    cache.put(path, 64, 64, _noise(1))
+
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    assert not cache.contains(path, 64, 64)
+    assert cache.get(path, 64, 64) is None
+
+
+def test_missing_file_is_never_cached(tmp_path):
+    cache = ThumbnailCache(tmp_path / "cache", 10 * 1024 * 1024)
+    path = str(tmp_path / "missing.jpg")
+
+    cache.put(path, 64, 64, _noise(1))
+
+    assert cache.get(path, 64, 64) is None
+
+
+def test_entries_survive_reopening(tmp_path):
+    path = _source(tmp_path, "a.jpg")
+    cache = ThumbnailCache(tmp_path / "cache", 10 * 1024 * 1024)
+    cache.put(path, 64, 64, _noise(1))
+    cache.close()
+
+    reopened = ThumbnailCache(tmp_path / "cache", 10 * 1024 * 1024)
+
+    assert reopened.contains(path, 64, 64)
+
+
+def test_compaction_keeps_recently_used_entries(tmp_path):
+    paths = [_source(tmp_path, f"{idx}.jpg") for idx in range(4)]
+    entry = os.path.getsize(_pack_with(tmp_path / "probe", _noise(0)))
+    cache = ThumbnailCache(tmp_path / "cache", int(entry * 3.5))
+    for idx, path in enumerate(paths[:3]):
+        cache.put(path, 64, 64, _noise(idx))
+    assert cache.get(paths[0], 64, 64) is not None  # the first is used again
+
+    cache.put(paths[3], 64, 64, _noise(3))
+
+    kept = [cache.contains(path, 64, 64) for path in paths]
+    assert kept == [True, False, False, True]
+    assert os.path.getsize(tmp_path / "cache" / "thumbnails.pack") <= entry * 3.5
+
+
+def test_broken_index_is_reset(tmp_path):
+    directory = tmp_path / "cache"
+    path = _source(tmp_path, "a.jpg")
+    cache = ThumbnailCache(directory, 10 * 1024 * 1024)
+    cache.put(path, 64, 64, _noise(1))
+    cache.close()
+    with open(directory / "thumbnails.idx", "ab") as index:
+        index.write(b"x")
+
+    reopened = ThumbnailCache(directory, 10 * 1024 * 1024)
+
+    assert not reopened.contains(path, 64, 64)
+    assert os.path.getsize(directory / "thumbnails.pack") == 0
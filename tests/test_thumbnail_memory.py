@@ -0,0 +1,64 @@
+from PIL import Image
+
+from filminfo.app.thumbnail_memory import ThumbnailMemory
+
+
+IMAGE_BYTES = 10 * 10 * 3
+
+
+def _image():
+    return Image.new("RGB", (10, 10))
+
+
+def _keep(memory, positions, limit=100):
+    for path, position in positions.items():
+        memory.keep(path, _image(), limit, position)
+
+
+def test_keep_drops_least_recently_used_over_limit():
+    memory = ThumbnailMemory()
+    _keep(memory, {"a": 0, "b": 1}, limit=2)
+    memory.kept("a")
+    memory.keep("c", _image(), 2, 2)
+
+    assert memory.kept("b") is None
+    assert memory.kept("a") is not None
+    assert memory.used == 2 * IMAGE_BYTES
+
+
+def test_trim_drops_farthest_from_view():
+    memory = ThumbnailMemory(3 * IMAGE_BYTES)
+    _keep(memory, {"a": 0, "b": 50, "c": 52, "d": 100, "e": 49})
+    assert memory.over
+
+    memory.trim(50)
+
+    assert not memory.over
+    assert {path for path in "abcde" if memory.kept(path)} == {"b", "c", "e"}
+
+
+def test_trim_within_budget_keeps_everything():
+    memory = ThumbnailMemory(3 * IMAGE_BYTES)
+    _keep(memory, {"a": 0, "b": 100})
+    memory.trim(50)
+    assert memory.used == 2 * IMAGE_BYTES
+
+
+def test_reposition_after_records_moved():
+    memory = ThumbnailMemory(IMAGE_BYTES)
+    _keep(memory, {"a": 0, "b": 10})
+    memory.forget("x")
+    memory.reposition({"b": 0, "a": 10})
+
+    memory.trim(0)
+
+    assert memory.kept("b") is not None
+    assert memory.kept("a") is None
+
+
+def test_shown_photos_count_four_bytes_a_pixel():
+    memory = ThumbnailMemory()
+    memory.show("a", _image())
+    assert memory.used == 10 * 10 * 4
+    memory.forget("a")
+    assert memory.used == 0